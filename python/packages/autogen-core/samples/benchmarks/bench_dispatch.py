@@ -0,0 +1,81 @@
+"""Measure the message throughput of SingleThreadedAgentRuntime for direct sends
+and publish fan-out at different dispatch batch sizes.
+
+Usage: python bench_dispatch.py [--messages 20000] [--subscribers 10] [--batch-sizes 1 16 64]
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import AgentId, MessageContext, TopicId
+from autogen_core.components import RoutedAgent, TypeSubscription, message_handler
+
+
+@dataclass
+class Ping:
+    value: int
+
+
+class CountingAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("A counting agent.")
+        self.num_calls = 0
+
+    @message_handler
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        self.num_calls += 1
+        return message
+
+
+async def bench_send(num_messages: int, batch_size: int) -> float:
+    runtime = SingleThreadedAgentRuntime(max_batch_size=batch_size)
+    await CountingAgent.register(runtime, "counter", CountingAgent)
+    runtime.start()
+    recipient = AgentId("counter", "default")
+    await runtime.send_message(Ping(0), recipient)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[runtime.send_message(Ping(i), recipient) for i in range(num_messages)])
+    elapsed = time.perf_counter() - start
+    await runtime.stop_when_idle()
+    return num_messages / elapsed
+
+
+async def bench_publish(num_messages: int, num_subscribers: int, batch_size: int) -> float:
+    runtime = SingleThreadedAgentRuntime(max_batch_size=batch_size)
+    for i in range(num_subscribers):
+        await CountingAgent.register(runtime, f"counter{i}", CountingAgent)
+        await runtime.add_subscription(TypeSubscription("bench", f"counter{i}"))
+    topic_id = TopicId("bench", "default")
+
+    start = time.perf_counter()
+    runtime.start()
+    for i in range(num_messages):
+        await runtime.publish_message(Ping(i), topic_id)
+    await runtime.stop_when_idle()
+    elapsed = time.perf_counter() - start
+    # Each publish is delivered once per subscriber.
+    return num_messages * num_subscribers / elapsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    batch_sizes: List[int] = args.batch_sizes
+    for batch_size in batch_sizes:
+        send_rate = await bench_send(args.messages, batch_size)
+        publish_rate = await bench_publish(args.messages // args.subscribers, args.subscribers, batch_size)
+        print(
+            f"batch size {batch_size:>4}: send {send_rate:>10.0f} msg/s, "
+            f"publish fan-out to {args.subscribers} {publish_rate:>10.0f} deliveries/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dispatch throughput benchmark for SingleThreadedAgentRuntime.")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of messages per run.")
+    parser.add_argument("--subscribers", type=int, default=10, help="Number of subscribers for publish fan-out.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64], help="Batch sizes to compare.")
+    asyncio.run(main(parser.parse_args()))
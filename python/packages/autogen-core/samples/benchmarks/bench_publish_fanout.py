@@ -0,0 +1,94 @@
+"""Measure the delivery rate of SingleThreadedAgentRuntime when a published message
+fans out to many subscribers, with the `autogen_core` loggers disabled or enabled.
+
+Usage: python bench_publish_fanout.py [--subscribers 1000] [--messages 50] [--payload-size 100] [--log-level WARNING] [--log-events]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import AgentId, MessageContext, TopicId
+from autogen_core.components import RoutedAgent, TypeSubscription, message_handler
+
+
+@dataclass
+class Update:
+    value: int
+    # A payload with some bulk, such as a conversation history, so that formatting it has a visible cost.
+    history: List[str] = field(default_factory=list)
+
+
+class FormattingNullHandler(logging.Handler):
+    """Formats records and discards them, to measure the cost of the logging path without I/O."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+class Subscriber(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("A subscriber.")
+        self.num_updates = 0
+
+    @message_handler
+    async def on_update(self, message: Update, ctx: MessageContext) -> None:
+        self.num_updates += 1
+
+
+async def bench_fanout(num_subscribers: int, num_messages: int, payload_size: int) -> float:
+    runtime = SingleThreadedAgentRuntime()
+    for i in range(num_subscribers):
+        await Subscriber.register(runtime, f"subscriber{i}", Subscriber)
+        await runtime.add_subscription(TypeSubscription("updates", f"subscriber{i}"))
+    await Subscriber.register(runtime, "publisher", Subscriber)
+    topic_id = TopicId("updates", "default")
+    sender = AgentId("publisher", "default")
+    history = [f"entry {i}" for i in range(payload_size)]
+
+    # Create the subscriber instances before measuring.
+    runtime.start()
+    await runtime.publish_message(Update(-1), topic_id, sender=sender)
+    await runtime.stop_when_idle()
+
+    start = time.perf_counter()
+    runtime.start()
+    for i in range(num_messages):
+        await runtime.publish_message(Update(i, history), topic_id, sender=sender)
+    await runtime.stop_when_idle()
+    elapsed = time.perf_counter() - start
+    return num_messages * num_subscribers / elapsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    logger = logging.getLogger("autogen_core")
+    logger.setLevel(args.log_level)
+    # Structured message events are only emitted when requested.
+    logging.getLogger("autogen_core.events").setLevel(args.log_level if args.log_events else "WARNING")
+    logger.addHandler(FormattingNullHandler())
+    logger.propagate = False
+
+    rates: List[float] = []
+    for _ in range(args.repeat):
+        rates.append(await bench_fanout(args.subscribers, args.messages, args.payload_size))
+    print(
+        f"log level {args.log_level}{' with events' if args.log_events else ''}: publish fan-out to {args.subscribers} subscribers, "
+        f"best {max(rates):.0f} deliveries/s, mean {sum(rates) / len(rates):.0f} deliveries/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish fan-out benchmark for SingleThreadedAgentRuntime.")
+    parser.add_argument("--subscribers", type=int, default=1000, help="Number of subscribers of the topic.")
+    parser.add_argument("--messages", type=int, default=50, help="Number of messages published per run.")
+    parser.add_argument("--payload-size", type=int, default=100, help="Number of history entries in each message.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs.")
+    parser.add_argument(
+        "--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING"], help="Level of the autogen_core logger."
+    )
+    parser.add_argument("--log-events", action="store_true", help="Also emit structured message events.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""Measure the cost of creating RoutedAgent instances and of dispatching messages to their handlers,
+without a runtime loop in between.
+
+Usage: python bench_routed_agent.py [--agents 10000] [--messages 100000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import AgentId, AgentInstantiationContext, CancellationToken, MessageContext
+from autogen_core.components import RoutedAgent, event, rpc
+
+
+@dataclass
+class Ping:
+    value: int
+
+
+@dataclass
+class Status:
+    value: int
+
+
+@dataclass
+class Other1:
+    value: int
+
+
+@dataclass
+class Other2:
+    value: int
+
+
+@dataclass
+class Other3:
+    value: int
+
+
+class ManyHandlersAgent(RoutedAgent):
+    """An agent with handlers for several message types, like agents that take part in several protocols."""
+
+    def __init__(self) -> None:
+        super().__init__("An agent with many handlers.")
+        self.count = 0
+
+    @rpc
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        return message
+
+    @event
+    async def on_status(self, message: Status, ctx: MessageContext) -> None:
+        self.count += 1
+
+    @event
+    async def on_other1(self, message: Other1, ctx: MessageContext) -> None:
+        pass
+
+    @event
+    async def on_other2(self, message: Other2, ctx: MessageContext) -> None:
+        pass
+
+    @rpc
+    async def on_other3(self, message: Other3, ctx: MessageContext) -> Other3:
+        return message
+
+    async def helper1(self) -> None:
+        pass
+
+    async def helper2(self) -> None:
+        pass
+
+
+def bench_instantiation(runtime: SingleThreadedAgentRuntime, num_agents: int) -> float:
+    start = time.perf_counter()
+    for i in range(num_agents):
+        with AgentInstantiationContext.populate_context((runtime, AgentId("agent", str(i)))):
+            ManyHandlersAgent()
+    return num_agents / (time.perf_counter() - start)
+
+
+async def bench_dispatch(runtime: SingleThreadedAgentRuntime, num_messages: int) -> float:
+    with AgentInstantiationContext.populate_context((runtime, AgentId("agent", "default"))):
+        agent = ManyHandlersAgent()
+    rpc_ctx = MessageContext(sender=None, topic_id=None, is_rpc=True, cancellation_token=CancellationToken())
+    event_ctx = MessageContext(sender=None, topic_id=None, is_rpc=False, cancellation_token=CancellationToken())
+    ping = Ping(1)
+    status = Status(1)
+    start = time.perf_counter()
+    for _ in range(num_messages // 2):
+        await agent.on_message(ping, rpc_ctx)
+        await agent.on_message(status, event_ctx)
+    return num_messages / (time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    instantiation_rates: List[float] = []
+    dispatch_rates: List[float] = []
+    for _ in range(args.repeat):
+        instantiation_rates.append(bench_instantiation(runtime, args.agents))
+        dispatch_rates.append(await bench_dispatch(runtime, args.messages))
+    print(
+        f"instantiation: best {max(instantiation_rates):.0f} agents/s, "
+        f"mean {sum(instantiation_rates) / len(instantiation_rates):.0f} agents/s"
+    )
+    print(
+        f"dispatch: best {max(dispatch_rates):.0f} messages/s, "
+        f"mean {sum(dispatch_rates) / len(dispatch_rates):.0f} messages/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Instantiation and dispatch benchmark for RoutedAgent.")
+    parser.add_argument("--agents", type=int, default=10000, help="Number of agents created per run.")
+    parser.add_argument("--messages", type=int, default=100000, help="Number of messages dispatched per run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""Measure the CPU usage of idle SingleThreadedAgentRuntime instances and the
+round-trip latency of a direct message.
+
+Usage: python bench_runtime_idle.py [--runtimes 100] [--idle-seconds 5] [--messages 2000]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import AgentId, MessageContext
+from autogen_core.components import RoutedAgent, message_handler
+
+
+@dataclass
+class Ping:
+    value: int
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        return message
+
+
+async def bench_idle_cpu(num_runtimes: int, idle_seconds: float) -> None:
+    runtimes = [SingleThreadedAgentRuntime() for _ in range(num_runtimes)]
+    for runtime in runtimes:
+        runtime.start()
+    # Let the run loops settle before measuring.
+    await asyncio.sleep(0.1)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.sleep(idle_seconds)
+    cpu_used = time.process_time() - cpu_start
+    wall_used = time.perf_counter() - wall_start
+
+    for runtime in runtimes:
+        await runtime.stop()
+    print(
+        f"idle: {num_runtimes} runtimes for {wall_used:.1f}s used {cpu_used:.3f}s CPU "
+        f"({100 * cpu_used / wall_used:.1f}% of a core)"
+    )
+
+
+async def bench_latency(num_messages: int) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await EchoAgent.register(runtime, "echo", EchoAgent)
+    runtime.start()
+    recipient = AgentId("echo", "default")
+    # Warm up, including agent instantiation.
+    await runtime.send_message(Ping(0), recipient)
+
+    latencies: list[float] = []
+    for i in range(num_messages):
+        start = time.perf_counter()
+        await runtime.send_message(Ping(i), recipient)
+        latencies.append(time.perf_counter() - start)
+    await runtime.stop()
+
+    latencies.sort()
+    print(
+        f"latency: {num_messages} send_message round trips, "
+        f"mean {1e6 * statistics.mean(latencies):.1f}us, "
+        f"p50 {1e6 * latencies[len(latencies) // 2]:.1f}us, "
+        f"p99 {1e6 * latencies[int(len(latencies) * 0.99)]:.1f}us"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    await bench_idle_cpu(args.runtimes, args.idle_seconds)
+    await bench_latency(args.messages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idle CPU and latency benchmark for SingleThreadedAgentRuntime.")
+    parser.add_argument("--runtimes", type=int, default=100, help="Number of idle runtimes.")
+    parser.add_argument("--idle-seconds", type=float, default=5.0, help="How long to measure idle CPU usage.")
+    parser.add_argument("--messages", type=int, default=2000, help="Number of round trips for the latency test.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Measure the rate at which a SerializationRegistry serializes and deserializes message payloads,
+as the WorkerAgentRuntime does for every message it sends and receives.
+
+The message types are a flat dataclass, a flat Pydantic model, and nested agentchat messages
+if `autogen-agentchat` is installed. Each is measured with JSON and, if the `msgpack` extra is installed, msgpack.
+
+Usage: python bench_serialization.py [--messages 20000] [--payload-size 10] [--repeat 3]
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Tuple
+
+from autogen_core.base import (
+    JSON_DATA_CONTENT_TYPE,
+    MSGPACK_DATA_CONTENT_TYPE,
+    try_get_known_serializers_for_type,
+)
+from autogen_core.base._serialization import SerializationRegistry
+from pydantic import BaseModel
+
+
+@dataclass
+class DataclassUpdate:
+    sender: str
+    value: int
+    history: List[str] = field(default_factory=list)
+
+
+class PydanticUpdate(BaseModel):
+    sender: str
+    value: int
+    history: List[str] = []
+
+
+def make_messages(payload_size: int) -> List[Tuple[str, Any]]:
+    history = [f"entry {i}" for i in range(payload_size)]
+    messages: List[Tuple[str, Any]] = [
+        ("dataclass", DataclassUpdate("agent", 1, history)),
+        ("pydantic", PydanticUpdate(sender="agent", value=1, history=history)),
+    ]
+    try:
+        from autogen_agentchat.messages import TextMessage, ToolCallMessage
+        from autogen_core.components import FunctionCall
+        from autogen_core.components.models import RequestUsage
+    except ImportError:
+        return messages
+    usage = RequestUsage(prompt_tokens=100, completion_tokens=20)
+    messages.append(("agentchat text", TextMessage(source="agent", models_usage=usage, content=" ".join(history))))
+    calls = [FunctionCall(id=str(i), name="tool", arguments='{"query": "value"}') for i in range(payload_size)]
+    messages.append(("agentchat tool calls", ToolCallMessage(source="agent", models_usage=usage, content=calls)))
+    return messages
+
+
+def bench_round_trip(registry: SerializationRegistry, message: Any, data_content_type: str, num_messages: int) -> float:
+    serialize: Callable[..., bytes] = registry.serialize
+    deserialize: Callable[..., Any] = registry.deserialize
+    start = time.perf_counter()
+    for _ in range(num_messages):
+        type_name = registry.type_name(message)
+        payload = serialize(message, type_name=type_name, data_content_type=data_content_type)
+        deserialize(payload, type_name=type_name, data_content_type=data_content_type)
+    return num_messages / (time.perf_counter() - start)
+
+
+def main(args: argparse.Namespace) -> None:
+    for name, message in make_messages(args.payload_size):
+        registry = SerializationRegistry()
+        registry.add_serializer(try_get_known_serializers_for_type(type(message)))
+        for data_content_type in (JSON_DATA_CONTENT_TYPE, MSGPACK_DATA_CONTENT_TYPE):
+            if not registry.is_registered(registry.type_name(message), data_content_type):
+                continue
+            rates = [bench_round_trip(registry, message, data_content_type, args.messages) for _ in range(args.repeat)]
+            print(
+                f"{name} ({data_content_type}): best {max(rates):.0f} round trips/s, "
+                f"mean {sum(rates) / len(rates):.0f} round trips/s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serialization benchmark for message payloads.")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of round trips per run.")
+    parser.add_argument(
+        "--payload-size", type=int, default=10, help="Number of history entries or tool calls in each message."
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs.")
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+"""Measure the delivery rate of published messages through a WorkerAgentRuntimeHost to agents
+spread over several WorkerAgentRuntime instances, with and without batching of the host's outgoing messages.
+
+Usage: python bench_worker_publish.py [--agents 100] [--workers 10] [--messages 200] [--max-batch-size 100] [--batch-flush-interval 0] [--num-channels 1]
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.base import MessageContext, TopicId, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, TypeSubscription, message_handler
+
+
+@dataclass
+class Update:
+    value: int
+
+
+class DeliveryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        self.expected = 0
+        self.done = asyncio.Event()
+
+    def add(self) -> None:
+        self.count += 1
+        if self.count >= self.expected:
+            self.done.set()
+
+    def expect(self, expected: int) -> None:
+        self.count = 0
+        self.expected = expected
+        self.done.clear()
+
+
+class Subscriber(RoutedAgent):
+    def __init__(self, counter: DeliveryCounter) -> None:
+        super().__init__("A subscriber.")
+        self._counter = counter
+
+    @message_handler
+    async def on_update(self, message: Update, ctx: MessageContext) -> None:
+        self._counter.add()
+
+
+async def bench_publish(args: argparse.Namespace, port: int) -> float:
+    host_address = f"localhost:{port}"
+    host = WorkerAgentRuntimeHost(
+        address=host_address, max_batch_size=args.max_batch_size, batch_flush_interval=args.batch_flush_interval
+    )
+    host.start()
+    counter = DeliveryCounter()
+    workers: List[WorkerAgentRuntime] = []
+    for _ in range(args.workers):
+        worker = WorkerAgentRuntime(
+            host_address=host_address, num_channels=args.num_channels, max_batch_size=args.max_batch_size
+        )
+        worker.start()
+        worker.add_message_serializer(try_get_known_serializers_for_type(Update))
+        workers.append(worker)
+    for i in range(args.agents):
+        worker = workers[i % args.workers]
+        await Subscriber.register(worker, f"subscriber{i}", lambda: Subscriber(counter))
+        await worker.add_subscription(TypeSubscription("updates", f"subscriber{i}"))
+    topic_id = TopicId("updates", "default")
+    publisher = workers[0]
+
+    # Create the subscriber instances before measuring.
+    counter.expect(args.agents)
+    await publisher.publish_message(Update(-1), topic_id)
+    await counter.done.wait()
+
+    counter.expect(args.agents * args.messages)
+    start = time.perf_counter()
+    for i in range(args.messages):
+        await publisher.publish_message(Update(i), topic_id)
+    await counter.done.wait()
+    elapsed = time.perf_counter() - start
+
+    for worker in workers:
+        await worker.stop()
+    await host.stop()
+    return args.agents * args.messages / elapsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    rates: List[float] = []
+    for i in range(args.repeat):
+        rates.append(await bench_publish(args, args.port + i))
+    print(
+        f"max_batch_size={args.max_batch_size} batch_flush_interval={args.batch_flush_interval} "
+        f"num_channels={args.num_channels}: "
+        f"publish to {args.agents} agents on {args.workers} workers, "
+        f"best {max(rates):.0f} deliveries/s, mean {sum(rates) / len(rates):.0f} deliveries/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish benchmark for WorkerAgentRuntimeHost.")
+    parser.add_argument("--agents", type=int, default=100, help="Number of subscriber agents.")
+    parser.add_argument("--workers", type=int, default=10, help="Number of worker runtimes hosting the agents.")
+    parser.add_argument("--messages", type=int, default=200, help="Number of messages published per run.")
+    parser.add_argument("--max-batch-size", type=int, default=100, help="Maximum number of messages per batch.")
+    parser.add_argument(
+        "--batch-flush-interval", type=float, default=0.0, help="Seconds to wait for a batch to fill up."
+    )
+    parser.add_argument("--num-channels", type=int, default=1, help="Number of streams from each worker to the host.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs.")
+    parser.add_argument("--port", type=int, default=50100, help="Port of the first host.")
+    asyncio.run(main(parser.parse_args()))
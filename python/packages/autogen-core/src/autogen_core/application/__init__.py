@@ -2,8 +2,32 @@
 The :mod:`autogen_core.application` module provides implementations of core components that are used to compose an application
 """
 
+from ._agent_lifecycle import AgentLifecycleMetrics
+from ._agent_mailbox import MailboxMetrics
+from ._agent_state_store import AgentStateStore, FileAgentStateStore, InMemoryAgentStateStore, SqliteAgentStateStore
+from ._blob_store import BlobStore, FileBlobStore, InMemoryBlobStore
+from ._consistent_hash import ConsistentHashRing
+from ._flow_control import QueueFullPolicy, QueueMetrics
+from ._intervention_pipeline import InterventionHandlerMetrics
 from ._single_threaded_agent_runtime import SingleThreadedAgentRuntime
 from ._worker_runtime import WorkerAgentRuntime
 from ._worker_runtime_host import WorkerAgentRuntimeHost
 
-__all__ = ["SingleThreadedAgentRuntime", "WorkerAgentRuntime", "WorkerAgentRuntimeHost"]
+__all__ = [
+    "AgentLifecycleMetrics",
+    "AgentStateStore",
+    "BlobStore",
+    "ConsistentHashRing",
+    "FileAgentStateStore",
+    "FileBlobStore",
+    "InMemoryAgentStateStore",
+    "InMemoryBlobStore",
+    "InterventionHandlerMetrics",
+    "MailboxMetrics",
+    "QueueFullPolicy",
+    "QueueMetrics",
+    "SingleThreadedAgentRuntime",
+    "SqliteAgentStateStore",
+    "WorkerAgentRuntime",
+    "WorkerAgentRuntimeHost",
+]
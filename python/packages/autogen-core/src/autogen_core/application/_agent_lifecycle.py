@@ -0,0 +1,222 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Mapping, Set
+
+from ..base import Agent, AgentId
+from ._agent_state_store import AgentStateStore, InMemoryAgentStateStore
+
+
+@dataclass(frozen=True)
+class AgentLifecycleMetrics:
+    """A snapshot of the agent instances managed by a runtime."""
+
+    resident: int
+    """The number of agent instances currently in memory."""
+    evicted: int
+    """The total number of agent instances that were passivated and removed from memory."""
+    rehydrated: int
+    """The total number of agent instances that were created again and loaded with their passivated state."""
+
+
+class AgentLifecycleManager:
+    """Keeps track of the agent instances of a runtime and evicts the ones that are not in use.
+
+    When the number of resident agents exceeds `max_resident_agents`, the least recently used agents are evicted.
+    Agents that have not been used for `idle_timeout` seconds are evicted as well. An evicted agent is passivated:
+    its :meth:`~autogen_core.base.Agent.save_state` is written to the state store and the instance is dropped.
+    When the agent is needed again, the runtime creates a new instance and the manager rehydrates it with
+    :meth:`~autogen_core.base.Agent.load_state`, and deletes the state from the store, as the resident instance
+    now holds it. Agents that are handling a message are never evicted. Concurrent lookups of an agent that is not resident
+    share a single creation, so the agent is created and rehydrated once.
+
+    Eviction only runs when an agent is looked up or added, so an idle runtime keeps its agents resident.
+
+    Args:
+        max_resident_agents (int | None, optional): The maximum number of agents kept in memory. If None, there is no limit. Defaults to None.
+        idle_timeout (float | None, optional): The number of seconds after which an unused agent is evicted. If None, agents are not evicted for being idle. Defaults to None.
+        state_store (AgentStateStore | None, optional): The store for the state of evicted agents.
+            Defaults to an :class:`InMemoryAgentStateStore` if eviction is enabled.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_resident_agents: int | None = None,
+        idle_timeout: float | None = None,
+        state_store: AgentStateStore | None = None,
+    ) -> None:
+        if max_resident_agents is not None and max_resident_agents < 1:
+            raise ValueError("max_resident_agents must be at least 1.")
+        self._max_resident_agents = max_resident_agents
+        self._idle_timeout = idle_timeout
+        self._eviction_enabled = max_resident_agents is not None or idle_timeout is not None
+        self._state_store = state_store if state_store is not None else InMemoryAgentStateStore()
+        # Resident agents in least recently used order.
+        self._agents: OrderedDict[AgentId, Agent] = OrderedDict()
+        self._last_used: Dict[AgentId, float] = {}
+        self._active: Dict[AgentId, int] = {}
+        # State of agents that are being passivated, so that a concurrent rehydration does not miss it.
+        self._passivating: Dict[AgentId, Mapping[str, Any]] = {}
+        # Agents whose state was written to the state store and not yet rehydrated.
+        self._passivated: Set[AgentId] = set()
+        self._creating: Dict[AgentId, asyncio.Future[None]] = {}
+        self._num_evicted = 0
+        self._num_rehydrated = 0
+
+    @property
+    def metrics(self) -> AgentLifecycleMetrics:
+        return AgentLifecycleMetrics(
+            resident=len(self._agents), evicted=self._num_evicted, rehydrated=self._num_rehydrated
+        )
+
+    def __contains__(self, agent_id: AgentId) -> bool:
+        return agent_id in self._agents
+
+    def __iter__(self) -> Iterator[AgentId]:
+        return iter(list(self._agents))
+
+    async def get(self, agent_id: AgentId) -> Agent | None:
+        """Get a resident agent and mark it as used. Returns None if the agent is not resident."""
+        agent = self._agents.get(agent_id)
+        if agent is not None and self._eviction_enabled:
+            self._touch(agent_id)
+            await self._evict(exclude=agent_id)
+        return agent
+
+    async def get_or_create(self, agent_id: AgentId, create: Callable[[], Awaitable[Agent]]) -> Agent:
+        """Get a resident agent, or create it with `create` and add it. Concurrent calls for an agent that is not resident
+        wait for the same creation, instead of each creating an instance that would replace the others."""
+        while True:
+            agent = await self.get(agent_id)
+            if agent is not None:
+                return agent
+            creation = self._creating.get(agent_id)
+            if creation is None:
+                break
+            try:
+                # A caller that is cancelled does not cancel the creation that the other callers are waiting for.
+                await asyncio.shield(creation)
+            except asyncio.CancelledError:
+                # The creation failed, so this caller tries again, unless it was cancelled itself.
+                if not creation.cancelled():
+                    raise
+        creation = asyncio.get_running_loop().create_future()
+        self._creating[agent_id] = creation
+        try:
+            agent = await create()
+            await self.add(agent_id, agent)
+        except BaseException:
+            creation.cancel()
+            raise
+        else:
+            creation.set_result(None)
+        finally:
+            del self._creating[agent_id]
+        return agent
+
+    async def add(self, agent_id: AgentId, agent: Agent) -> None:
+        """Add a newly created agent, loading its passivated state if there is any.
+
+        Raises:
+            ValueError: If the agent is already resident.
+        """
+        if agent_id in self._agents:
+            raise ValueError(f"Agent {agent_id} is already resident.")
+        if self._eviction_enabled:
+            self._passivated.discard(agent_id)
+            # A state that is still being written is deleted by the passivation once the write completes.
+            state = self._passivating.pop(agent_id, None)
+            if state is None:
+                state = await self._state_store.load_state(agent_id)
+                if state is not None:
+                    await self._state_store.delete_state(agent_id)
+            if state is not None:
+                agent.load_state(state)
+                self._num_rehydrated += 1
+        self._agents[agent_id] = agent
+        if self._eviction_enabled:
+            self._touch(agent_id)
+            await self._evict(exclude=agent_id)
+
+    async def save_states(self) -> Dict[AgentId, Mapping[str, Any]]:
+        """Get the current state of the resident and the passivated agents, without marking them as used,
+        evicting or rehydrating any agent."""
+        states: Dict[AgentId, Mapping[str, Any]] = {
+            agent_id: agent.save_state() for agent_id, agent in self._agents.items()
+        }
+        for agent_id, state in self._passivating.items():
+            states.setdefault(agent_id, state)
+        for agent_id in list(self._passivated):
+            if agent_id not in states:
+                stored = await self._state_store.load_state(agent_id)
+                if stored is not None:
+                    states[agent_id] = stored
+        return states
+
+    async def save_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        """Get the current state of an agent without marking it as used: the state of the resident instance, or the passivated state.
+        Returns None if the agent is neither resident nor passivated."""
+        agent = self._agents.get(agent_id)
+        if agent is not None:
+            return agent.save_state()
+        state = self._passivating.get(agent_id)
+        if state is None and self._eviction_enabled:
+            state = await self._state_store.load_state(agent_id)
+        return state
+
+    @contextmanager
+    def active(self, agent_id: AgentId) -> Iterator[None]:
+        """Mark an agent as in use for the duration of the context, so it is not evicted."""
+        self._active[agent_id] = self._active.get(agent_id, 0) + 1
+        try:
+            yield
+        finally:
+            count = self._active[agent_id] - 1
+            if count == 0:
+                del self._active[agent_id]
+            else:
+                self._active[agent_id] = count
+            if agent_id in self._agents:
+                self._touch(agent_id)
+
+    def _touch(self, agent_id: AgentId) -> None:
+        self._agents.move_to_end(agent_id)
+        self._last_used[agent_id] = time.monotonic()
+
+    async def _evict(self, exclude: AgentId | None = None) -> None:
+        now = time.monotonic()
+        excess = 0 if self._max_resident_agents is None else len(self._agents) - self._max_resident_agents
+        to_evict: List[AgentId] = []
+        for agent_id in self._agents:
+            idle = self._idle_timeout is not None and now - self._last_used[agent_id] >= self._idle_timeout
+            # Agents are in least recently used order, so the remaining agents are neither in excess nor idle.
+            if excess <= 0 and not idle:
+                break
+            if agent_id == exclude or agent_id in self._active:
+                continue
+            to_evict.append(agent_id)
+            excess -= 1
+        for agent_id in to_evict:
+            await self._passivate(agent_id)
+
+    async def _passivate(self, agent_id: AgentId) -> None:
+        # The agent may have been evicted or put in use while an earlier agent was being passivated.
+        if agent_id not in self._agents or agent_id in self._active:
+            return
+        agent = self._agents.pop(agent_id)
+        del self._last_used[agent_id]
+        state = agent.save_state()
+        self._passivating[agent_id] = state
+        try:
+            await self._state_store.save_state(agent_id, state)
+        finally:
+            if self._passivating.get(agent_id) is state:
+                del self._passivating[agent_id]
+                self._passivated.add(agent_id)
+            elif agent_id in self._agents:
+                # The agent was rehydrated with the state while it was being written, so the written state is stale.
+                await self._state_store.delete_state(agent_id)
+        self._num_evicted += 1
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict
+
+from ..base import AgentId
+from ..base.exceptions import MessageDroppedException
+
+
+@dataclass(frozen=True)
+class MailboxMetrics:
+    """A snapshot of the messages delivered through one or more agent mailboxes."""
+
+    queue_depth: int
+    """The number of messages waiting in the mailbox."""
+    active: int
+    """The number of messages being handled by the agent."""
+    admitted: int
+    """The total number of messages that were handed to the agent."""
+    rejected: int
+    """The total number of messages that were dropped because the mailbox was full."""
+    total_wait_time: float
+    """The total time that admitted messages waited in the mailbox, in seconds."""
+    max_wait_time: float
+    """The longest time that a message waited in the mailbox, in seconds."""
+
+
+class _Mailbox:
+    def __init__(self) -> None:
+        self.waiters: Deque[asyncio.Future[None]] = deque()
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return self.active == 0 and len(self.waiters) == 0
+
+    def metrics(self) -> MailboxMetrics:
+        return MailboxMetrics(
+            queue_depth=len(self.waiters),
+            active=self.active,
+            admitted=self.admitted,
+            rejected=self.rejected,
+            total_wait_time=self.total_wait_time,
+            max_wait_time=self.max_wait_time,
+        )
+
+
+class AgentMailboxManager:
+    """Limits the number of messages that each agent handles at the same time.
+
+    Messages for an agent that is already handling `max_concurrency` messages wait in the agent's mailbox
+    and are handed to the agent in the order in which they arrived. When `max_depth` messages are already
+    waiting, a new message is dropped with :class:`~autogen_core.base.exceptions.MessageDroppedException`.
+
+    A mailbox exists only while its agent has messages to handle. The counters of a mailbox are added to
+    the totals when it is removed.
+
+    Args:
+        max_concurrency (int | None, optional): The maximum number of messages an agent handles at the same time.
+            If None, messages are handed to agents as soon as they are delivered. Defaults to None.
+        max_depth (int, optional): The maximum number of messages waiting in a mailbox. If 0 or less, mailboxes are unbounded. Defaults to 0.
+    """
+
+    def __init__(self, *, max_concurrency: int | None = None, max_depth: int = 0) -> None:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self._max_concurrency = max_concurrency
+        self._max_depth = max_depth
+        self._mailboxes: Dict[AgentId, _Mailbox] = {}
+        # Counters of the mailboxes that were removed.
+        self._removed = _Mailbox()
+
+    @property
+    def metrics(self) -> Dict[AgentId, MailboxMetrics]:
+        return {agent_id: mailbox.metrics() for agent_id, mailbox in self._mailboxes.items()}
+
+    @property
+    def total_metrics(self) -> MailboxMetrics:
+        mailboxes = [self._removed, *self._mailboxes.values()]
+        return MailboxMetrics(
+            queue_depth=sum(len(mailbox.waiters) for mailbox in mailboxes),
+            active=sum(mailbox.active for mailbox in mailboxes),
+            admitted=sum(mailbox.admitted for mailbox in mailboxes),
+            rejected=sum(mailbox.rejected for mailbox in mailboxes),
+            total_wait_time=sum(mailbox.total_wait_time for mailbox in mailboxes),
+            max_wait_time=max(mailbox.max_wait_time for mailbox in mailboxes),
+        )
+
+    @asynccontextmanager
+    async def slot(self, agent_id: AgentId) -> AsyncIterator[None]:
+        """Wait until the agent can handle another message, and hold the slot for the duration of the context.
+
+        Raises:
+            MessageDroppedException: If the mailbox of the agent is full.
+        """
+        if self._max_concurrency is None:
+            yield
+            return
+        mailbox = self._mailboxes.get(agent_id)
+        if mailbox is None:
+            mailbox = self._mailboxes[agent_id] = _Mailbox()
+        try:
+            await self._acquire(agent_id, mailbox)
+        except BaseException:
+            self._remove_if_idle(agent_id, mailbox)
+            raise
+        try:
+            yield
+        finally:
+            self._release(mailbox)
+            self._remove_if_idle(agent_id, mailbox)
+
+    async def _acquire(self, agent_id: AgentId, mailbox: _Mailbox) -> None:
+        assert self._max_concurrency is not None
+        if mailbox.active < self._max_concurrency and len(mailbox.waiters) == 0:
+            mailbox.active += 1
+            mailbox.admitted += 1
+            return
+        if self._max_depth > 0 and len(mailbox.waiters) >= self._max_depth:
+            mailbox.rejected += 1
+            raise MessageDroppedException(f"Mailbox of agent {agent_id} is full.")
+        waiter = asyncio.get_running_loop().create_future()
+        mailbox.waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation, so pass it on.
+                self._release(mailbox)
+            elif waiter in mailbox.waiters:
+                mailbox.waiters.remove(waiter)
+            raise
+        wait_time = time.perf_counter() - start
+        mailbox.admitted += 1
+        mailbox.total_wait_time += wait_time
+        mailbox.max_wait_time = max(mailbox.max_wait_time, wait_time)
+
+    def _release(self, mailbox: _Mailbox) -> None:
+        # Hand the slot over to the next waiting message, if there is one.
+        while mailbox.waiters:
+            waiter = mailbox.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        mailbox.active -= 1
+
+    def _remove_if_idle(self, agent_id: AgentId, mailbox: _Mailbox) -> None:
+        if mailbox.idle and self._mailboxes.get(agent_id) is mailbox:
+            del self._mailboxes[agent_id]
+            self._removed.admitted += mailbox.admitted
+            self._removed.rejected += mailbox.rejected
+            self._removed.total_wait_time += mailbox.total_wait_time
+            self._removed.max_wait_time = max(self._removed.max_wait_time, mailbox.max_wait_time)
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+from asyncio import Future, Task
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Mapping, Set, Tuple
+
+from ..base import AgentId
+from ._agent_state_store import AgentStateStore
+
+DEFAULT_MAX_CACHED_ETAGS = 10000
+
+
+def state_etag(state: Mapping[str, Any]) -> str:
+    """A tag that changes whenever the content of a state changes."""
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AgentStateService:
+    """Serves the saved state of agents from a store, writing the states that are saved together in batches.
+
+    Saved states wait in memory until the write in progress completes, and are then written with one call to
+    :meth:`~autogen_core.application.AgentStateStore.save_states`. Later saves of the same agent replace the state that is
+    waiting, so an agent that is saved often is written once per batch. A save returns once its batch is written.
+
+    States are tagged with a hash of their content. A save with a tag only succeeds if the saved state of the agent has that tag,
+    so that a client does not overwrite a state that it has not seen. Saves of the same agent check the tag and replace the state
+    one at a time, so of two saves with the same tag only the first succeeds.
+
+    Args:
+        store (AgentStateStore): The store of the states.
+        flush_interval (float, optional): The number of seconds to wait for more states before writing a batch. Defaults to 0.
+        max_cached_etags (int, optional): The maximum number of agents whose state tag is kept, to skip writing their state
+            when it has not changed. The tags of the least recently used agents are dropped first. Defaults to 10000.
+    """
+
+    def __init__(
+        self, store: AgentStateStore, *, flush_interval: float = 0.0, max_cached_etags: int = DEFAULT_MAX_CACHED_ETAGS
+    ) -> None:
+        self._store = store
+        self._flush_interval = flush_interval
+        self._max_cached_etags = max_cached_etags
+        # States waiting for the next batch, and the states of the batch being written.
+        self._pending: Dict[AgentId, Mapping[str, Any]] = {}
+        self._writing: Dict[AgentId, Mapping[str, Any]] = {}
+        self._batch: Future[None] | None = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_tasks: Set[Task[None]] = set()
+        # The tags of the states that were read or written, so that unchanged states are not written again.
+        self._etags: OrderedDict[AgentId, str] = OrderedDict()
+        # The locks of the agents that are being saved, with the number of saves that hold or wait for each lock.
+        self._agent_locks: Dict[AgentId, Tuple[asyncio.Lock, int]] = {}
+
+    async def get(self, agent_id: AgentId) -> Tuple[Mapping[str, Any], str] | None:
+        """Get the saved state of an agent and its tag. Returns None if there is no saved state."""
+        state = self._pending.get(agent_id)
+        if state is None:
+            state = self._writing.get(agent_id)
+        if state is None:
+            state = await self._store.load_state(agent_id)
+            if state is None:
+                return None
+        etag = state_etag(state)
+        self._cache_etag(agent_id, etag)
+        return state, etag
+
+    async def save(self, agent_id: AgentId, state: Mapping[str, Any], etag: str | None = None) -> str:
+        """Save the state of an agent and return its tag.
+
+        Args:
+            agent_id (AgentId): ID of the agent.
+            state (Mapping[str, Any]): State of the agent.
+            etag (str | None, optional): The tag of the saved state that this state replaces. If None, the saved state is replaced
+                whatever its tag. Defaults to None.
+
+        Raises:
+            ValueError: If `etag` is not the tag of the saved state.
+        """
+        async with self._agent_lock(agent_id):
+            if etag:
+                current = await self.get(agent_id)
+                if current is None or current[1] != etag:
+                    raise ValueError(f"The saved state of {agent_id} has changed.")
+            new_etag = state_etag(state)
+            unsaved = agent_id in self._pending or agent_id in self._writing
+            if self._etags.get(agent_id) == new_etag and not unsaved:
+                return new_etag
+            self._cache_etag(agent_id, new_etag)
+            self._pending[agent_id] = state
+            if self._batch is None:
+                self._batch = asyncio.get_running_loop().create_future()
+                task = asyncio.create_task(self._flush())
+                self._flush_tasks.add(task)
+                task.add_done_callback(self._flush_tasks.discard)
+            batch = self._batch
+        # The next save of the agent checks against the state that is waiting, so it does not wait for the write.
+        await asyncio.shield(batch)
+        return new_etag
+
+    def _cache_etag(self, agent_id: AgentId, etag: str) -> None:
+        self._etags[agent_id] = etag
+        self._etags.move_to_end(agent_id)
+        while len(self._etags) > self._max_cached_etags:
+            self._etags.popitem(last=False)
+
+    @asynccontextmanager
+    async def _agent_lock(self, agent_id: AgentId) -> AsyncIterator[None]:
+        lock, users = self._agent_locks.get(agent_id, (asyncio.Lock(), 0))
+        self._agent_locks[agent_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._agent_locks[agent_id]
+            if users == 1:
+                del self._agent_locks[agent_id]
+            else:
+                self._agent_locks[agent_id] = (lock, users - 1)
+
+    async def _flush(self) -> None:
+        batch = self._batch
+        assert batch is not None
+        states: Dict[AgentId, Mapping[str, Any]] | None = None
+        try:
+            # Only one batch is written at a time. The states saved in the meantime wait for the next batch.
+            async with self._flush_lock:
+                if self._flush_interval > 0:
+                    await asyncio.sleep(self._flush_interval)
+                self._batch = None
+                states = self._writing = self._pending
+                self._pending = {}
+                await self._store.save_states(states)
+        except Exception as e:
+            self._forget_etags(states)
+            batch.set_exception(e)
+        else:
+            batch.set_result(None)
+        finally:
+            if not batch.done():
+                # The flush was cancelled, so the saves of the batch are cancelled as well.
+                if states is None:
+                    # The batch was not taken yet, so its states are those waiting.
+                    self._batch = None
+                    states, self._pending = self._pending, {}
+                self._forget_etags(states)
+                batch.cancel()
+            if self._writing is states:
+                self._writing = {}
+
+    def _forget_etags(self, states: Mapping[AgentId, Mapping[str, Any]] | None) -> None:
+        # The tags of the states that were not written are no longer known.
+        for agent_id in states or {}:
+            self._etags.pop(agent_id, None)
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Protocol, runtime_checkable
+
+from ..base import AgentId
+
+
+@runtime_checkable
+class AgentStateStore(Protocol):
+    """A store for agent state keyed by :class:`~autogen_core.base.AgentId`.
+
+    Agent runtimes use a state store to keep the state of agents that are not resident in memory.
+    The state is the mapping returned by :meth:`~autogen_core.base.Agent.save_state`."""
+
+    async def save_state(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        """Save the state of an agent, replacing any previously saved state.
+
+        Args:
+            agent_id (AgentId): ID of the agent.
+            state (Mapping[str, Any]): State of the agent. Must be JSON serializable.
+        """
+        ...
+
+    async def load_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        """Load the saved state of an agent.
+
+        Args:
+            agent_id (AgentId): ID of the agent.
+
+        Returns:
+            Mapping[str, Any] | None: The saved state, or None if there is no saved state for the agent.
+        """
+        ...
+
+    async def delete_state(self, agent_id: AgentId) -> None:
+        """Delete the saved state of an agent. Does nothing if there is no saved state.
+
+        Args:
+            agent_id (AgentId): ID of the agent.
+        """
+        ...
+
+    async def save_states(self, states: Mapping[AgentId, Mapping[str, Any]]) -> None:
+        """Save the state of several agents at once. Stores that can write a batch together, such as in one transaction,
+        override this method. By default, the states are saved one at a time.
+
+        Args:
+            states (Mapping[AgentId, Mapping[str, Any]]): State of each agent.
+        """
+        for agent_id, state in states.items():
+            await self.save_state(agent_id, state)
+
+
+class InMemoryAgentStateStore(AgentStateStore):
+    """An :class:`AgentStateStore` that keeps agent state in a dictionary."""
+
+    def __init__(self) -> None:
+        self._states: Dict[AgentId, Mapping[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    async def save_state(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        self._states[agent_id] = state
+
+    async def load_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        return self._states.get(agent_id)
+
+    async def delete_state(self, agent_id: AgentId) -> None:
+        self._states.pop(agent_id, None)
+
+
+class SqliteAgentStateStore(AgentStateStore):
+    """An :class:`AgentStateStore` that keeps agent state as JSON in a SQLite database.
+    A batch of states is written in one transaction.
+
+    Args:
+        path (str | os.PathLike[str]): The path of the database file. It is created if it does not exist.
+            Use ":memory:" for a database that is not persisted.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # The connection is used from the threads of asyncio.to_thread, one at a time.
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS agent_state ("
+                "agent_type TEXT NOT NULL, agent_key TEXT NOT NULL, state TEXT NOT NULL, "
+                "PRIMARY KEY (agent_type, agent_key))"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    async def save_state(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        await self.save_states({agent_id: state})
+
+    async def save_states(self, states: Mapping[AgentId, Mapping[str, Any]]) -> None:
+        rows = [(agent_id.type, agent_id.key, json.dumps(state)) for agent_id, state in states.items()]
+        await asyncio.to_thread(self._write, rows)
+
+    async def load_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        data = await asyncio.to_thread(self._read, agent_id)
+        return None if data is None else json.loads(data)  # type: ignore[no-any-return]
+
+    async def delete_state(self, agent_id: AgentId) -> None:
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM agent_state WHERE agent_type = ? AND agent_key = ?", agent_id
+        )
+
+    def _write(self, rows: list[tuple[str, str, str]]) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO agent_state (agent_type, agent_key, state) VALUES (?, ?, ?)", rows
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _read(self, agent_id: AgentId) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM agent_state WHERE agent_type = ? AND agent_key = ?", (agent_id.type, agent_id.key)
+            ).fetchone()
+        return None if row is None else str(row[0])
+
+    def _execute(self, sql: str, agent_id: AgentId) -> None:
+        with self._lock:
+            self._connection.execute(sql, (agent_id.type, agent_id.key))
+
+
+class FileAgentStateStore(AgentStateStore):
+    """An :class:`AgentStateStore` that keeps the state of each agent as JSON in a file named after a hash of the agent ID.
+    States are written atomically, so a crash never leaves a partially written state. A batch of states is written
+    by one background thread.
+
+    Args:
+        directory (str | os.PathLike[str]): The directory of the states. It is created if it does not exist.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    async def save_state(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        await self.save_states({agent_id: state})
+
+    async def save_states(self, states: Mapping[AgentId, Mapping[str, Any]]) -> None:
+        files = [(self._path(agent_id), json.dumps(state).encode("utf-8")) for agent_id, state in states.items()]
+        await asyncio.to_thread(self._write, files)
+
+    async def load_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        try:
+            data = await asyncio.to_thread(self._path(agent_id).read_bytes)
+        except FileNotFoundError:
+            return None
+        return json.loads(data)  # type: ignore[no-any-return]
+
+    async def delete_state(self, agent_id: AgentId) -> None:
+        await asyncio.to_thread(self._path(agent_id).unlink, missing_ok=True)
+
+    def _path(self, agent_id: AgentId) -> Path:
+        name = hashlib.sha256(f"{agent_id.type}/{agent_id.key}".encode("utf-8")).hexdigest()
+        return self._directory / f"{name}.json"
+
+    def _write(self, files: list[tuple[Path, bytes]]) -> None:
+        for path, data in files:
+            fd, tmp_path = tempfile.mkstemp(dir=self._directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
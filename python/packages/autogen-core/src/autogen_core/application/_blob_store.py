@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Protocol, Set, Tuple, runtime_checkable
+
+DEFAULT_BLOB_THRESHOLD = 1024 * 1024
+DEFAULT_BLOB_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_BLOB_TTL = 60.0
+
+
+@runtime_checkable
+class BlobStore(Protocol):
+    """A content-addressed store for large message payloads that is shared by the workers of a distributed runtime.
+
+    A worker puts a large payload in the store and sends only its reference through the host.
+    The receiving workers get the payload from the store, so the host never handles the payload itself.
+    Each put returns a new reference, which is deleted once the payload is no longer needed.
+    The data is content-addressed, so the same payload is stored only once while any of its references exists."""
+
+    async def put(self, data: bytes) -> str:
+        """Store data if it is not stored already, and add a reference to it.
+
+        Args:
+            data (bytes): The data to store.
+
+        Returns:
+            str: A new reference to the data.
+        """
+        ...
+
+    async def get(self, ref: str) -> bytes:
+        """Get stored data.
+
+        Args:
+            ref (str): The reference returned by :meth:`put`.
+
+        Returns:
+            bytes: The data.
+
+        Raises:
+            KeyError: If there is no data for the reference.
+        """
+        ...
+
+    async def delete(self, ref: str) -> None:
+        """Delete a reference. The data is deleted once no reference to it remains. Does nothing if the reference does not exist.
+
+        Args:
+            ref (str): The reference returned by :meth:`put`.
+        """
+        ...
+
+
+def blob_ref(data: bytes) -> str:
+    """Get the content address of data: the hex SHA-256 digest."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _new_ref(address: str) -> str:
+    return address + uuid.uuid4().hex
+
+
+def _ref_address(ref: str) -> str:
+    # A reference is the content address of the data followed by a unique suffix.
+    if len(ref) != 96 or not ref.isalnum():
+        raise ValueError(f"Invalid blob reference: {ref}")
+    return ref[:64]
+
+
+class InMemoryBlobStore(BlobStore):
+    """A :class:`BlobStore` that keeps blobs in a dictionary.
+    It can only be shared by workers that run in the same process."""
+
+    def __init__(self) -> None:
+        # The data by content address, with the number of its references.
+        self._blobs: Dict[str, Tuple[bytes, int]] = {}
+        self._refs: Set[str] = set()
+
+    def __len__(self) -> int:
+        """The number of stored blobs."""
+        return len(self._blobs)
+
+    async def put(self, data: bytes) -> str:
+        address = blob_ref(data)
+        stored, count = self._blobs.get(address, (data, 0))
+        self._blobs[address] = (stored, count + 1)
+        ref = _new_ref(address)
+        self._refs.add(ref)
+        return ref
+
+    async def get(self, ref: str) -> bytes:
+        if ref not in self._refs:
+            raise KeyError(ref)
+        return self._blobs[_ref_address(ref)][0]
+
+    async def delete(self, ref: str) -> None:
+        if ref not in self._refs:
+            return
+        self._refs.remove(ref)
+        address = _ref_address(ref)
+        data, count = self._blobs[address]
+        if count > 1:
+            self._blobs[address] = (data, count - 1)
+        else:
+            del self._blobs[address]
+
+
+class FileBlobStore(BlobStore):
+    """A :class:`BlobStore` that keeps each blob in a file named after its content address,
+    with a hard link to the file for each reference.
+
+    Workers on the same machine can share a directory on a memory-backed file system, such as `/dev/shm`
+    on Linux, to exchange large payloads through shared memory. Workers on different machines can share
+    a directory on a network file system that supports hard links. Blobs are written atomically, and the file
+    of a blob is removed with its last link, so concurrent writers and deleters of the same blob are safe.
+
+    Args:
+        directory (str | os.PathLike[str]): The directory of the blobs. It is created if it does not exist.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    async def put(self, data: bytes) -> str:
+        return await asyncio.to_thread(self._put, data)
+
+    async def get(self, ref: str) -> bytes:
+        _ref_address(ref)
+        try:
+            return await asyncio.to_thread((self._directory / ref).read_bytes)
+        except FileNotFoundError as e:
+            raise KeyError(ref) from e
+
+    async def delete(self, ref: str) -> None:
+        await asyncio.to_thread(self._delete, ref)
+
+    def _put(self, data: bytes) -> str:
+        address = blob_ref(data)
+        ref = _new_ref(address)
+        while True:
+            self._write(address, data)
+            try:
+                os.link(self._directory / address, self._directory / ref)
+                return ref
+            except FileNotFoundError:
+                # The last reference to the blob was deleted since it was written, so it is written again.
+                continue
+
+    def _delete(self, ref: str) -> None:
+        path = self._directory / _ref_address(ref)
+        try:
+            os.unlink(self._directory / ref)
+            # The file of the blob is removed once its own name is its only link. A reference that is linked
+            # concurrently keeps the data, as links share it, and the blob is written again for the next one.
+            if os.stat(path).st_nlink == 1:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, address: str, data: bytes) -> None:
+        path = self._directory / address
+        if path.exists():
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class BlobCache:
+    """Caches the blobs that a worker got from a :class:`BlobStore`, up to a total size, evicting the least recently used blobs.
+
+    Args:
+        store (BlobStore): The blob store.
+        max_size (int): The maximum total size of the cached blobs, in bytes.
+    """
+
+    def __init__(self, store: BlobStore, max_size: int) -> None:
+        self._store = store
+        self._max_size = max_size
+        self._size = 0
+        self._blobs: OrderedDict[str, bytes] = OrderedDict()
+
+    @property
+    def store(self) -> BlobStore:
+        return self._store
+
+    async def put(self, data: bytes) -> str:
+        ref = await self._store.put(data)
+        self._add(ref, data)
+        return ref
+
+    async def get(self, ref: str) -> bytes:
+        data = self._blobs.get(ref)
+        if data is not None:
+            self._blobs.move_to_end(ref)
+            return data
+        data = await self._store.get(ref)
+        self._add(ref, data)
+        return data
+
+    async def delete(self, ref: str) -> None:
+        data = self._blobs.pop(ref, None)
+        if data is not None:
+            self._size -= len(data)
+        await self._store.delete(ref)
+
+    def _add(self, ref: str, data: bytes) -> None:
+        if len(data) > self._max_size or ref in self._blobs:
+            return
+        self._blobs[ref] = data
+        self._size += len(data)
+        while self._size > self._max_size:
+            _, evicted = self._blobs.popitem(last=False)
+            self._size -= len(evicted)
@@ -0,0 +1,94 @@
+import bisect
+import hashlib
+from typing import Generic, Iterable, List, Tuple, TypeVar
+
+NodeT = TypeVar("NodeT")
+
+DEFAULT_VIRTUAL_NODES = 100
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing(Generic[NodeT]):
+    """Maps keys to nodes so that adding or removing a node only moves the keys of that node.
+
+    Each node is placed on the ring at `virtual_nodes` positions derived from `str(node)`, and a key belongs
+    to the first node at or after the position of the key. The mapping only depends on the string form of the
+    nodes, so rings built from the same nodes in different processes agree.
+
+    .. code-block:: python
+
+        from autogen_core.application import ConsistentHashRing
+
+        ring = ConsistentHashRing(["localhost:50051", "localhost:50052"])
+        host_address = ring.get("my_agent_type")
+
+    Args:
+        nodes (Iterable[NodeT], optional): The initial nodes. Defaults to no nodes.
+        virtual_nodes (int, optional): The number of positions of each node on the ring. More positions spread the keys more evenly. Defaults to 100.
+    """
+
+    def __init__(self, nodes: Iterable[NodeT] = (), *, virtual_nodes: int = DEFAULT_VIRTUAL_NODES) -> None:
+        if virtual_nodes < 1:
+            raise ValueError("virtual_nodes must be at least 1.")
+        self._virtual_nodes = virtual_nodes
+        self._nodes: List[NodeT] = []
+        # Positions and their nodes, sorted by position.
+        self._positions: List[int] = []
+        self._ring: List[Tuple[int, NodeT]] = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[NodeT]:
+        """The nodes in the order in which they were added."""
+        return list(self._nodes)
+
+    def copy(self) -> "ConsistentHashRing[NodeT]":
+        ring = ConsistentHashRing[NodeT](virtual_nodes=self._virtual_nodes)
+        ring._nodes = list(self._nodes)
+        ring._positions = list(self._positions)
+        ring._ring = list(self._ring)
+        return ring
+
+    def add(self, node: NodeT) -> None:
+        """Add a node. Does nothing if the node is already on the ring."""
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for i in range(self._virtual_nodes):
+            position = _hash(f"{node}#{i}")
+            index = bisect.bisect_left(self._positions, position)
+            self._positions.insert(index, position)
+            self._ring.insert(index, (position, node))
+
+    def remove(self, node: NodeT) -> None:
+        """Remove a node. Does nothing if the node is not on the ring."""
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        self._ring = [(position, n) for position, n in self._ring if n != node]
+        self._positions = [position for position, _ in self._ring]
+
+    def get(self, key: str) -> NodeT:
+        """Get the node that a key belongs to.
+
+        Raises:
+            LookupError: If the ring has no nodes.
+        """
+        if len(self._nodes) == 1:
+            return self._nodes[0]
+        if not self._nodes:
+            raise LookupError("The ring has no nodes.")
+        index = bisect.bisect_left(self._positions, _hash(key))
+        if index == len(self._positions):
+            index = 0
+        return self._ring[index][1]
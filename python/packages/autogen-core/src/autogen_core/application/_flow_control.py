@@ -0,0 +1,229 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Deque, Generic, Iterable, List, Literal, Tuple, TypeVar
+
+from ..base.exceptions import MessageDroppedException
+from .protos import agent_worker_pb2
+
+T = TypeVar("T")
+
+QueueFullPolicy = Literal["block", "drop_oldest", "reject"]
+"""What to do with a message for a queue that is full:
+
+* ``"block"``: wait until there is space in the queue, which slows down the sender.
+* ``"drop_oldest"``: drop the oldest message in the queue to make space.
+* ``"reject"``: do not queue the message.
+"""
+
+DEFAULT_MAX_QUEUE_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class QueueMetrics:
+    """A snapshot of the messages passing through a message queue."""
+
+    depth: int
+    """The number of messages waiting in the queue."""
+    blocked: int
+    """The number of senders waiting for space in the queue."""
+    dropped: int
+    """The total number of messages that were dropped to make space in the queue."""
+    rejected: int
+    """The total number of messages that were not queued because the queue was full."""
+
+
+def sum_queue_metrics(metrics: Iterable[QueueMetrics]) -> QueueMetrics:
+    """Add up the metrics of several queues."""
+    metrics = list(metrics)
+    return QueueMetrics(
+        depth=sum(m.depth for m in metrics),
+        blocked=sum(m.blocked for m in metrics),
+        dropped=sum(m.dropped for m in metrics),
+        rejected=sum(m.rejected for m in metrics),
+    )
+
+
+def is_flow_controlled(message: agent_worker_pb2.Message) -> bool:
+    """Check if a message counts towards the bound of a queue. Only requests and events do. Responses and other control messages
+    are always queued, because the messages that are waiting for them could otherwise never complete."""
+    return message.HasField("request") or message.HasField("event")
+
+
+class FlowControlQueue(Generic[T]):
+    """A first-in first-out queue of messages with a bound on the number of messages that are flow controlled.
+    Used for the gRPC streams between workers and the host. Unlike the priority queue of the single threaded runtime,
+    only the flow controlled messages count towards the bound, and a full queue can drop or reject messages.
+
+    Args:
+        max_size (int, optional): The maximum number of flow controlled messages in the queue. If 0 or less, the queue is unbounded. Defaults to 0.
+        policy (QueueFullPolicy, optional): What to do with a flow controlled message when the queue is full. Defaults to "block".
+        is_bounded (Callable[[T], bool], optional): Whether a message is flow controlled. Defaults to all messages.
+        on_drop (Callable[[T], None] | None, optional): Called with each message that is dropped to make space. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 0,
+        policy: QueueFullPolicy = "block",
+        *,
+        is_bounded: Callable[[T], bool] = lambda _: True,
+        on_drop: Callable[[T], None] | None = None,
+    ) -> None:
+        self._max_size = max_size
+        self._policy = policy
+        self._is_bounded = is_bounded
+        self._on_drop = on_drop
+        # Messages, with whether each is flow controlled.
+        self._items: Deque[Tuple[T, bool]] = deque()
+        self._bounded_size = 0
+        self._getters: Deque[asyncio.Future[None]] = deque()
+        self._putters: Deque[asyncio.Future[None]] = deque()
+        self._dropped = 0
+        self._rejected = 0
+
+    @property
+    def metrics(self) -> QueueMetrics:
+        return QueueMetrics(
+            depth=len(self._items),
+            blocked=len(self._putters),
+            dropped=self._dropped,
+            rejected=self._rejected,
+        )
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    async def put(self, item: T) -> None:
+        """Add a message, applying the policy if the queue is full.
+
+        Raises:
+            MessageDroppedException: If the queue is full and the policy is "reject".
+        """
+        bounded = self._is_bounded(item)
+        if bounded and self._max_size > 0:
+            while self._bounded_size >= self._max_size:
+                if self._policy == "reject":
+                    self._rejected += 1
+                    raise MessageDroppedException("The message queue is full.")
+                if self._policy == "drop_oldest":
+                    self._drop_oldest()
+                    break
+                putter = asyncio.get_running_loop().create_future()
+                self._putters.append(putter)
+                try:
+                    await putter
+                except asyncio.CancelledError:
+                    if putter in self._putters:
+                        self._putters.remove(putter)
+                    elif self._bounded_size < self._max_size:
+                        # Pass on the space that was made for this sender.
+                        self._wake(self._putters)
+                    raise
+        self._append(item, bounded)
+
+    def put_nowait(self, item: T) -> None:
+        """Add a message without waiting, even if the queue is full. For messages that must be neither delayed nor dropped,
+        such as messages that are sent again after reconnecting."""
+        self._append(item, self._is_bounded(item))
+
+    def put_back(self, item: T) -> None:
+        """Return a message that was taken from the queue but not handled, to the front of the queue."""
+        bounded = self._is_bounded(item)
+        self._items.appendleft((item, bounded))
+        if bounded:
+            self._bounded_size += 1
+        self._wake(self._getters)
+
+    async def get(self) -> T:
+        await self.wait_not_empty()
+        return self.get_nowait()
+
+    async def wait_not_empty(self) -> None:
+        """Wait until the queue has a message, without taking it. Unlike :meth:`get`, cancelling the wait,
+        such as with a timeout, cannot lose a message."""
+        while not self._items:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                if getter in self._getters:
+                    self._getters.remove(getter)
+                elif self._items:
+                    self._wake(self._getters)
+                raise
+
+    def get_nowait(self) -> T:
+        if not self._items:
+            raise asyncio.QueueEmpty()
+        item, bounded = self._items.popleft()
+        if bounded:
+            self._bounded_size -= 1
+            self._wake(self._putters)
+        return item
+
+    def drain(self) -> List[T]:
+        """Remove and return all the messages in the queue."""
+        items: List[T] = []
+        while self._items:
+            items.append(self.get_nowait())
+        return items
+
+    def _append(self, item: T, bounded: bool) -> None:
+        self._items.append((item, bounded))
+        if bounded:
+            self._bounded_size += 1
+        self._wake(self._getters)
+
+    def _drop_oldest(self) -> None:
+        for i, (item, bounded) in enumerate(self._items):
+            if bounded:
+                del self._items[i]
+                self._bounded_size -= 1
+                self._dropped += 1
+                if self._on_drop is not None:
+                    self._on_drop(item)
+                return
+
+    @staticmethod
+    def _wake(waiters: Deque[asyncio.Future[None]]) -> None:
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+class QueueAsyncIterable(AsyncIterator[Any], AsyncIterable[Any]):
+    def __init__(self, queue: FlowControlQueue[agent_worker_pb2.Message]) -> None:
+        self._queue = queue
+        self._closed = False
+        # Set once the host accepts batched messages.
+        self.max_batch_size = 1
+
+    def close(self) -> None:
+        """Stop iterating. gRPC does not cancel the iteration when a call ends, so a closed iterable
+        puts the message it is waiting for back in the queue, for the next call to send."""
+        self._closed = True
+
+    async def __anext__(self) -> Any:
+        if self._closed:
+            raise StopAsyncIteration
+        message = await self._queue.get()
+        if self._closed:
+            self._queue.put_back(message)
+            raise StopAsyncIteration
+        if self.max_batch_size <= 1 or self._queue.empty():
+            return message
+        # Write the messages that are already queued together.
+        batch = [message]
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return agent_worker_pb2.Message(batch=agent_worker_pb2.MessageBatch(messages=batch))
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self
@@ -1,11 +1,32 @@
-from collections import defaultdict
-from typing import Awaitable, Callable, DefaultDict, List, Set
+import heapq
+import inspect
+import time
+import warnings
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    DefaultDict,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+    TypeGuard,
+    TypeVar,
+    cast,
+)
 
 from ..base._agent import Agent
 from ..base._agent_id import AgentId
+from ..base._agent_runtime import AgentRuntime
 from ..base._agent_type import AgentType
 from ..base._subscription import Subscription
 from ..base._topic import TopicId
+from ..components._type_subscription import TypeSubscription
 
 
 async def get_impl(
@@ -29,46 +50,237 @@ async def get_impl(
     return id
 
 
+T_co = TypeVar("T_co", bound=Agent, covariant=True)
+
+
+class AgentFactory(Generic[T_co]):
+    """An agent factory whose calling convention is resolved once, when the factory is registered,
+    rather than every time an agent is instantiated.
+
+    Raises:
+        ValueError: If the factory does not take 0 or 2 arguments.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T_co | Awaitable[T_co]] | Callable[[AgentRuntime, AgentId], T_co | Awaitable[T_co]],
+    ) -> None:
+        num_parameters = len(inspect.signature(factory).parameters)
+        if num_parameters == 2:
+            warnings.warn(
+                "Agent factories that take two arguments are deprecated. Use AgentInstantiationContext instead. Two arg factories will be removed in a future version.",
+                stacklevel=3,
+            )
+        elif num_parameters != 0:
+            raise ValueError("Agent factory must take 0 or 2 arguments.")
+        self._factory = factory
+        self._takes_runtime_and_id = num_parameters == 2
+
+    async def __call__(self, runtime: AgentRuntime, agent_id: AgentId) -> T_co:
+        if self._takes_runtime_and_id:
+            agent = cast(Callable[[AgentRuntime, AgentId], T_co | Awaitable[T_co]], self._factory)(runtime, agent_id)
+        else:
+            agent = cast(Callable[[], T_co | Awaitable[T_co]], self._factory)()
+        if inspect.isawaitable(agent):
+            return cast(T_co, await agent)
+        return cast(T_co, agent)
+
+
+DEFAULT_MAX_CACHED_TOPICS = 10000
+DEFAULT_MAX_MESSAGE_BATCH_SIZE = 100
+# gRPC metadata with which the host and the workers tell each other that they accept batched messages.
+MESSAGE_BATCHING_METADATA = ("x-agent-message-batching", "1")
+# gRPC metadata with which the host tells a worker that it acknowledges the messages of the worker.
+MESSAGE_ACKS_METADATA = ("x-agent-message-acks", "1")
+# gRPC metadata key with which the streams of a worker that opens several streams identify their worker to the host.
+WORKER_ID_METADATA_KEY = "x-agent-worker-id"
+DEFAULT_REPLAY_BUFFER_SIZE = 10000
+# The number of recently handled requests and events whose ids a worker remembers, to handle messages that are sent again once.
+MAX_RECENT_REQUESTS = 1000
+MAX_RECENT_EVENTS = 10000
+# The number of seconds to wait before the first attempt to reconnect to the host, and the most to wait between attempts.
+DEFAULT_RECONNECT_BACKOFF = (0.1, 5.0)
+# The number of seconds between the checks for requests whose deadline passed.
+DEFAULT_REAP_INTERVAL = 0.5
+
+
+def accepts_message_batches(metadata: Iterable[Tuple[str, Any]] | None) -> bool:
+    """Check if the gRPC metadata of a peer includes :data:`MESSAGE_BATCHING_METADATA`."""
+    return _has_metadata(metadata, MESSAGE_BATCHING_METADATA)
+
+
+def acknowledges_messages(metadata: Iterable[Tuple[str, Any]] | None) -> bool:
+    """Check if the gRPC metadata of a host includes :data:`MESSAGE_ACKS_METADATA`."""
+    return _has_metadata(metadata, MESSAGE_ACKS_METADATA)
+
+
+def _has_metadata(metadata: Iterable[Tuple[str, Any]] | None, item: Tuple[str, str]) -> bool:
+    # grpc.aio.Metadata checks the keys only with `in`, so compare the items.
+    return metadata is not None and any(tuple(i) == item for i in metadata)
+
+
+def _is_indexable(subscription: Subscription) -> TypeGuard[TypeSubscription]:
+    """Check if the subscription matches and maps topics exactly like :class:`TypeSubscription`,
+    so that it can be resolved through the topic type index."""
+    subscription_class = type(subscription)
+    return (
+        isinstance(subscription, TypeSubscription)
+        and subscription_class.is_match is TypeSubscription.is_match
+        and subscription_class.map_to_agent is TypeSubscription.map_to_agent
+    )
+
+
 class SubscriptionManager:
-    def __init__(self) -> None:
+    """Keeps track of subscriptions and resolves the recipients of a topic.
+
+    :class:`~autogen_core.components.TypeSubscription` and subclasses that keep its matching
+    behavior, such as :class:`~autogen_core.components.DefaultSubscription`, are indexed by topic type.
+    Resolving a topic and adding or removing such a subscription only touches the topics of that type.
+    Other subscriptions are matched against every topic using :meth:`~autogen_core.base.Subscription.is_match`.
+
+    Recipients of a topic are ordered by the order in which the matching subscriptions were added.
+
+    The resolved recipients are cached per topic. The cache evicts the least recently used topic once it
+    holds `max_cached_topics` topics, and entries older than `cached_topic_ttl` seconds are rebuilt on their next use.
+    Eviction does not change the resolved recipients, an evicted topic is resolved again on its next use.
+
+    Args:
+        max_cached_topics (int | None, optional): The maximum number of topics to cache recipients for.
+            If None, the cache is unbounded. Defaults to 10000.
+        cached_topic_ttl (float | None, optional): The number of seconds a cached topic is valid for. If None, cached topics
+            do not expire. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_cached_topics: int | None = DEFAULT_MAX_CACHED_TOPICS,
+        cached_topic_ttl: float | None = None,
+    ) -> None:
+        if max_cached_topics is not None and max_cached_topics < 1:
+            raise ValueError("max_cached_topics must be at least 1.")
+        self._max_cached_topics = max_cached_topics
+        self._cached_topic_ttl = cached_topic_ttl
+        self._cache_hits = 0
+        self._cache_misses = 0
         self._subscriptions: List[Subscription] = []
-        self._seen_topics: Set[TopicId] = set()
-        self._subscribed_recipients: DefaultDict[TopicId, List[AgentId]] = defaultdict(list)
+        # Subscriptions are stored with a sequence number to keep recipients in the order the subscriptions were added.
+        self._next_sequence = 0
+        self._type_subscriptions: DefaultDict[str, List[Tuple[int, TypeSubscription]]] = defaultdict(list)
+        self._type_subscription_keys: Set[Tuple[str, str]] = set()
+        self._type_subscription_ids: Set[str] = set()
+        self._other_subscriptions: List[Tuple[int, Subscription]] = []
+        # Cached topics in least recently used order.
+        self._subscribed_recipients: OrderedDict[TopicId, List[AgentId]] = OrderedDict()
+        self._topic_expiry: Dict[TopicId, float] = {}
+        self._seen_topics_by_type: DefaultDict[str, Set[TopicId]] = defaultdict(set)
+
+    @property
+    def cache_hits(self) -> int:
+        """The number of topic lookups served from the recipient cache."""
+        return self._cache_hits
+
+    @property
+    def cache_misses(self) -> int:
+        """The number of topic lookups that had to resolve the recipients."""
+        return self._cache_misses
+
+    @property
+    def cache_size(self) -> int:
+        """The number of topics currently in the recipient cache."""
+        return len(self._subscribed_recipients)
 
     async def add_subscription(self, subscription: Subscription) -> None:
         # Check if the subscription already exists
-        if any(sub == subscription for sub in self._subscriptions):
+        if self._is_duplicate(subscription):
             raise ValueError("Subscription already exists")
 
+        sequence = self._next_sequence
+        self._next_sequence += 1
         self._subscriptions.append(subscription)
-        self._rebuild_subscriptions(self._seen_topics)
+
+        if _is_indexable(subscription):
+            self._type_subscriptions[subscription.topic_type].append((sequence, subscription))
+            self._type_subscription_keys.add((subscription.topic_type, subscription.agent_type))
+            self._type_subscription_ids.add(subscription.id)
+            # The new subscription has the highest sequence number, so its recipient goes last.
+            for topic in self._seen_topics_by_type.get(subscription.topic_type, ()):
+                self._subscribed_recipients[topic].append(AgentId(type=subscription.agent_type, key=topic.source))
+        else:
+            self._other_subscriptions.append((sequence, subscription))
+            for topic, recipients in self._subscribed_recipients.items():
+                if subscription.is_match(topic):
+                    recipients.append(subscription.map_to_agent(topic))
 
     async def remove_subscription(self, id: str) -> None:
+        removed = [sub for sub in self._subscriptions if sub.id == id]
         # Check if the subscription exists
-        if not any(sub.id == id for sub in self._subscriptions):
+        if not removed:
             raise ValueError("Subscription does not exist")
 
-        def is_not_sub(x: Subscription) -> bool:
-            return x.id != id
+        self._subscriptions = [sub for sub in self._subscriptions if sub.id != id]
 
-        self._subscriptions = list(filter(is_not_sub, self._subscriptions))
+        affected_topics: Set[TopicId] = set()
+        for subscription in removed:
+            if _is_indexable(subscription):
+                type_subscriptions = self._type_subscriptions[subscription.topic_type]
+                type_subscriptions[:] = [(seq, sub) for seq, sub in type_subscriptions if sub is not subscription]
+                if not type_subscriptions:
+                    del self._type_subscriptions[subscription.topic_type]
+                self._type_subscription_keys.discard((subscription.topic_type, subscription.agent_type))
+                self._type_subscription_ids.discard(subscription.id)
+                affected_topics.update(self._seen_topics_by_type.get(subscription.topic_type, ()))
+            else:
+                self._other_subscriptions = [
+                    (seq, sub) for seq, sub in self._other_subscriptions if sub is not subscription
+                ]
+                affected_topics.update(topic for topic in self._subscribed_recipients if subscription.is_match(topic))
 
-        # Rebuild the subscriptions
-        self._rebuild_subscriptions(self._seen_topics)
+        # Rebuild only the topics the removed subscriptions could have matched.
+        for topic in affected_topics:
+            self._subscribed_recipients[topic] = self._build_recipients(topic)
 
     async def get_subscribed_recipients(self, topic: TopicId) -> List[AgentId]:
-        if topic not in self._seen_topics:
-            self._build_for_new_topic(topic)
-        return self._subscribed_recipients[topic]
-
-    # TODO: optimize this...
-    def _rebuild_subscriptions(self, topics: Set[TopicId]) -> None:
-        self._subscribed_recipients.clear()
-        for topic in topics:
-            self._build_for_new_topic(topic)
-
-    def _build_for_new_topic(self, topic: TopicId) -> None:
-        self._seen_topics.add(topic)
-        for subscription in self._subscriptions:
-            if subscription.is_match(topic):
-                self._subscribed_recipients[topic].append(subscription.map_to_agent(topic))
+        recipients = self._subscribed_recipients.get(topic)
+        if recipients is not None:
+            if self._cached_topic_ttl is None or self._topic_expiry[topic] > time.monotonic():
+                self._cache_hits += 1
+                self._subscribed_recipients.move_to_end(topic)
+                return recipients
+            self._evict(topic)
+
+        self._cache_misses += 1
+        recipients = self._build_recipients(topic)
+        self._subscribed_recipients[topic] = recipients
+        self._seen_topics_by_type[topic.type].add(topic)
+        if self._cached_topic_ttl is not None:
+            self._topic_expiry[topic] = time.monotonic() + self._cached_topic_ttl
+        if self._max_cached_topics is not None and len(self._subscribed_recipients) > self._max_cached_topics:
+            self._evict(next(iter(self._subscribed_recipients)))
+        return recipients
+
+    def _evict(self, topic: TopicId) -> None:
+        del self._subscribed_recipients[topic]
+        self._topic_expiry.pop(topic, None)
+        seen_topics = self._seen_topics_by_type[topic.type]
+        seen_topics.discard(topic)
+        if not seen_topics:
+            del self._seen_topics_by_type[topic.type]
+
+    def _is_duplicate(self, subscription: Subscription) -> bool:
+        if any(sub == subscription for _, sub in self._other_subscriptions):
+            return True
+        if _is_indexable(subscription):
+            return (
+                subscription.id in self._type_subscription_ids
+                or (subscription.topic_type, subscription.agent_type) in self._type_subscription_keys
+            )
+        # Fall back to comparing against every subscription.
+        return any(sub == subscription for sub in self._subscriptions)
+
+    def _build_recipients(self, topic: TopicId) -> List[AgentId]:
+        type_matches = self._type_subscriptions.get(topic.type, [])
+        other_matches = [(seq, sub) for seq, sub in self._other_subscriptions if sub.is_match(topic)]
+        if not other_matches:
+            return [AgentId(type=sub.agent_type, key=topic.source) for _, sub in type_matches]
+        return [sub.map_to_agent(topic) for _, sub in heapq.merge(type_matches, other_matches, key=itemgetter(0))]
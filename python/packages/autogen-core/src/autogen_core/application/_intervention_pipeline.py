@@ -0,0 +1,135 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Sequence, Tuple
+
+from ..base import AgentId
+from ..base.intervention import DefaultInterventionHandler, DropMessage, InterventionHandler
+from .telemetry import EnvelopeMetadata, TraceHelper
+from .telemetry._tracing_config import ExtraMessageRuntimeAttributes, MessagingDestination, MessagingOperation
+
+_HOOKS = ("on_send", "on_publish", "on_response")
+
+
+@dataclass(frozen=True)
+class InterventionHandlerMetrics:
+    """A snapshot of the time spent in one hook of an intervention handler."""
+
+    handler: str
+    """The class name of the intervention handler."""
+    hook: str
+    """The name of the hook: `on_send`, `on_publish` or `on_response`."""
+    calls: int
+    """The number of calls to the hook."""
+    total_time: float
+    """The total time spent in the hook, in seconds."""
+    max_time: float
+    """The longest time spent in a single call to the hook, in seconds."""
+
+
+def _overrides_hook(handler: InterventionHandler, hook: str) -> bool:
+    """Check if the handler provides its own implementation of a hook, rather than the
+    pass-through of :class:`DefaultInterventionHandler` or the stub of the protocol."""
+    implementation = getattr(type(handler), hook, None)
+    if implementation is None:
+        # The hook is set on the instance.
+        return True
+    return implementation is not getattr(DefaultInterventionHandler, hook) and implementation is not getattr(
+        InterventionHandler, hook
+    )
+
+
+class _HookTiming:
+    __slots__ = ("calls", "total_time", "max_time")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+
+class InterventionPipeline:
+    """Applies the intervention handlers of a runtime to messages.
+
+    The handlers that implement each hook are resolved once, when the pipeline is created. Handlers that
+    do not override a hook, for example because they inherit it from :class:`DefaultInterventionHandler`,
+    are not called for that hook. The time spent in each hook of each handler is recorded.
+    """
+
+    def __init__(
+        self,
+        handlers: Sequence[InterventionHandler],
+        tracer_helper: TraceHelper[MessagingOperation, MessagingDestination, ExtraMessageRuntimeAttributes],
+    ) -> None:
+        self._tracer_helper = tracer_helper
+        # The handlers that implement each hook, in order, with the timing of their calls.
+        self._hooks: Dict[str, List[Tuple[InterventionHandler, _HookTiming]]] = {
+            hook: [(handler, _HookTiming()) for handler in handlers if _overrides_hook(handler, hook)]
+            for hook in _HOOKS
+        }
+
+    @property
+    def intercepts_send(self) -> bool:
+        return len(self._hooks["on_send"]) > 0
+
+    @property
+    def intercepts_publish(self) -> bool:
+        return len(self._hooks["on_publish"]) > 0
+
+    @property
+    def intercepts_response(self) -> bool:
+        return len(self._hooks["on_response"]) > 0
+
+    @property
+    def metrics(self) -> List[InterventionHandlerMetrics]:
+        return [
+            InterventionHandlerMetrics(
+                handler=handler.__class__.__name__,
+                hook=hook,
+                calls=timing.calls,
+                total_time=timing.total_time,
+                max_time=timing.max_time,
+            )
+            for hook, handlers in self._hooks.items()
+            for handler, timing in handlers
+        ]
+
+    async def on_send(
+        self, message: Any, *, sender: AgentId | None, recipient: AgentId, metadata: EnvelopeMetadata | None
+    ) -> Any | type[DropMessage]:
+        """Apply the `on_send` hooks in order. Returns :class:`DropMessage` as soon as a handler drops the message."""
+        for handler, timing in self._hooks["on_send"]:
+            with self._tracer_helper.trace_block("intercept", handler.__class__.__name__, parent=metadata):
+                message = await _timed(timing, handler.on_send(message, sender=sender, recipient=recipient))
+            if message is DropMessage or isinstance(message, DropMessage):
+                return DropMessage
+        return message
+
+    async def on_publish(
+        self, message: Any, *, sender: AgentId | None, metadata: EnvelopeMetadata | None
+    ) -> Any | type[DropMessage]:
+        """Apply the `on_publish` hooks in order. Returns :class:`DropMessage` as soon as a handler drops the message."""
+        for handler, timing in self._hooks["on_publish"]:
+            with self._tracer_helper.trace_block("intercept", handler.__class__.__name__, parent=metadata):
+                message = await _timed(timing, handler.on_publish(message, sender=sender))
+            if message is DropMessage or isinstance(message, DropMessage):
+                return DropMessage
+        return message
+
+    async def on_response(self, message: Any, *, sender: AgentId, recipient: AgentId | None) -> Any | type[DropMessage]:
+        """Apply the `on_response` hooks in order. Returns :class:`DropMessage` as soon as a handler drops the message."""
+        for handler, timing in self._hooks["on_response"]:
+            message = await _timed(timing, handler.on_response(message, sender=sender, recipient=recipient))
+            if message is DropMessage or isinstance(message, DropMessage):
+                return DropMessage
+        return message
+
+
+async def _timed(timing: _HookTiming, call: Awaitable[Any]) -> Any:
+    start = time.perf_counter()
+    try:
+        return await call
+    finally:
+        elapsed = time.perf_counter() - start
+        timing.calls += 1
+        timing.total_time += elapsed
+        timing.max_time = max(timing.max_time, elapsed)
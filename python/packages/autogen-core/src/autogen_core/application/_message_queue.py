@@ -0,0 +1,120 @@
+import asyncio
+from asyncio import Future
+from collections import deque
+from typing import Deque, Iterator, List, Sequence, TypeVar, overload
+
+T = TypeVar("T")
+
+
+class MessageQueue(Sequence[T]):
+    """A FIFO queue with a fixed number of priority levels.
+
+    Each priority level is backed by a :class:`collections.deque`, so enqueue and
+    dequeue are O(1). Items are dequeued from the lowest priority value first and
+    in FIFO order within a level. The queue is also a read-only sequence of its
+    items in dequeue order.
+
+    Args:
+        maxsize (int, optional): The maximum number of items in the queue. If 0 or less, the queue is unbounded.
+            When the queue is full, :meth:`put` waits until an item is removed. Defaults to 0.
+        num_priorities (int, optional): The number of priority levels. Defaults to 1.
+    """
+
+    def __init__(self, maxsize: int = 0, num_priorities: int = 1) -> None:
+        if num_priorities < 1:
+            raise ValueError("num_priorities must be at least 1.")
+        self._maxsize = maxsize
+        self._levels: List[Deque[T]] = [deque() for _ in range(num_priorities)]
+        self._size = 0
+        self._putters: Deque[Future[None]] = deque()
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[T]:
+        """Iterate over the items in the order they would be dequeued."""
+        for level in self._levels:
+            yield from level
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | Sequence[T]:
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._size
+        if 0 <= index < self._size:
+            for level in self._levels:
+                if index < len(level):
+                    return level[index]
+                index -= len(level)
+        raise IndexError("MessageQueue index out of range")
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def full(self) -> bool:
+        return 0 < self._maxsize <= self._size
+
+    async def put(self, item: T, priority: int = 0) -> None:
+        """Put an item into the queue, waiting for a free slot if the queue is full."""
+        while self.full():
+            putter = asyncio.get_running_loop().create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except BaseException:
+                putter.cancel()
+                try:
+                    self._putters.remove(putter)
+                except ValueError:
+                    pass
+                if not self.full():
+                    self._wakeup_next_putter()
+                raise
+        self.put_nowait(item, priority)
+
+    def put_nowait(self, item: T, priority: int = 0, *, ignore_maxsize: bool = False) -> None:
+        """Put an item into the queue without waiting.
+
+        Args:
+            item (T): The item to put into the queue.
+            priority (int, optional): The priority level of the item. Defaults to 0.
+            ignore_maxsize (bool, optional): If True, the item is enqueued even if the queue is full.
+                This is used for items that complete work already accepted by the queue. Defaults to False.
+
+        Raises:
+            asyncio.QueueFull: If the queue is full and `ignore_maxsize` is False.
+        """
+        if not ignore_maxsize and self.full():
+            raise asyncio.QueueFull
+        self._levels[priority].append(item)
+        self._size += 1
+
+    def get_nowait(self) -> T:
+        """Remove and return the next item from the queue.
+
+        Raises:
+            asyncio.QueueEmpty: If the queue is empty.
+        """
+        for level in self._levels:
+            if level:
+                self._size -= 1
+                self._wakeup_next_putter()
+                return level.popleft()
+        raise asyncio.QueueEmpty
+
+    def _wakeup_next_putter(self) -> None:
+        while self._putters:
+            putter = self._putters.popleft()
+            if not putter.done():
+                putter.set_result(None)
+                break
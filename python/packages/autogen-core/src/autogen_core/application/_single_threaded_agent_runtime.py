@@ -4,12 +4,11 @@
 import inspect
 import logging
 import threading
-import warnings
 from asyncio import CancelledError, Future, Task
 from collections.abc import Sequence
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Awaitable, Callable, Dict, List, Mapping, ParamSpec, Set, Type, TypeVar, cast
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, ParamSpec, Set, Type, TypeVar
 
 from opentelemetry.trace import TracerProvider
 from typing_extensions import deprecated
@@ -32,7 +31,13 @@
 )
 from ..base.exceptions import MessageDroppedException
 from ..base.intervention import DropMessage, InterventionHandler
-from ._helpers import SubscriptionManager, get_impl
+from ._agent_lifecycle import AgentLifecycleManager, AgentLifecycleMetrics
+from ._agent_mailbox import AgentMailboxManager, MailboxMetrics
+from ._agent_state_store import AgentStateStore
+from ._helpers import DEFAULT_MAX_CACHED_TOPICS, AgentFactory, SubscriptionManager, get_impl
+from ._intervention_pipeline import InterventionHandlerMetrics, InterventionPipeline
+from ._message_queue import MessageQueue
+from .logging.events import DeliveryStage, MessageEvent, MessageKind
 from .telemetry import EnvelopeMetadata, MessageRuntimeTracingConfig, TraceHelper, get_telemetry_envelope_metadata
 
 logger = logging.getLogger("autogen_core")
@@ -112,32 +117,48 @@ def __init__(self, runtime: SingleThreadedAgentRuntime) -> None:
         self._runtime = runtime
         self._run_state = RunContext.RunState.RUNNING
         self._end_condition: Callable[[], bool] = self._stop_when_cancelled
+        self._state_changed = asyncio.Event()
         self._run_task = asyncio.create_task(self._run())
         self._lock = asyncio.Lock()
 
     async def _run(self) -> None:
         while True:
             async with self._lock:
+                # Clear the event before checking the state, so that a change made
+                # while processing a message is picked up by the next iteration.
+                self._state_changed.clear()
                 if self._end_condition():
                     return
 
-                await self._runtime.process_next()
+                if len(self._runtime.unprocessed_messages) > 0:
+                    await self._runtime.process_next()
+                    continue
+
+            # Nothing to process, wait until a message is enqueued, a task finishes or a stop is requested.
+            await self._state_changed.wait()
+
+    def notify_state_changed(self) -> None:
+        """Wake up the run loop to re-evaluate the queue and the end condition."""
+        self._state_changed.set()
 
     async def stop(self) -> None:
         async with self._lock:
             self._run_state = RunContext.RunState.CANCELLED
             self._end_condition = self._stop_when_cancelled
+            self._state_changed.set()
         await self._run_task
 
     async def stop_when_idle(self) -> None:
         async with self._lock:
             self._run_state = RunContext.RunState.UNTIL_IDLE
             self._end_condition = self._stop_when_idle
+            self._state_changed.set()
         await self._run_task
 
     async def stop_when(self, condition: Callable[[], bool]) -> None:
         async with self._lock:
             self._end_condition = condition
+            self._state_changed.set()
         await self._run_task
 
     def _stop_when_cancelled(self) -> bool:
@@ -147,24 +168,81 @@ def _stop_when_idle(self) -> bool:
         return self._run_state == RunContext.RunState.UNTIL_IDLE and self._runtime.idle
 
 
+# Priority levels of the message queue. Lower values are processed first.
+_RESPONSE_PRIORITY = 0
+_DEFAULT_PRIORITY = 1
+
+
 class SingleThreadedAgentRuntime(AgentRuntime):
+    """A single-threaded agent runtime that processes all messages using a single asyncio queue.
+
+    Args:
+        intervention_handlers (List[InterventionHandler], optional): A list of intervention handlers that can intercept messages before they are sent or published.
+            The handlers are applied in order at the start of the processing task of each message, so a slow handler does not
+            delay other messages. Hooks that a handler inherits from :class:`~autogen_core.base.intervention.DefaultInterventionHandler` are skipped. Defaults to None.
+        tracer_provider (TracerProvider, optional): The tracer provider to use for tracing. Defaults to None.
+        max_queue_size (int, optional): The maximum number of queued messages. When the queue is full,
+            :meth:`send_message` and :meth:`publish_message` wait until there is room in the queue. If 0 or less, the queue is unbounded. Defaults to 0.
+        prioritize_responses (bool, optional): If True, RPC responses are processed ahead of queued sends and publishes
+            so that chains of RPC calls are unblocked first. Defaults to False.
+        max_batch_size (int, optional): The maximum number of queued messages dispatched per iteration of the
+            processing loop. Larger batches reduce the per-message overhead of the loop when the queue is busy. Defaults to 1.
+        max_cached_topics (int | None, optional): The maximum number of topics for which the resolved subscribers are cached.
+            The least recently used topic is evicted when the cache is full. If None, the cache is unbounded. Defaults to 10000.
+        cached_topic_ttl (float | None, optional): The number of seconds after which the cached subscribers of a topic
+            are resolved again. If None, cached topics do not expire. Defaults to None.
+        max_resident_agents (int | None, optional): The maximum number of agent instances kept in memory. When exceeded,
+            the least recently used agents are passivated: their state is saved to `agent_state_store` and the instance is dropped.
+            A passivated agent is created again and loaded with its saved state on next use. If None, there is no limit. Defaults to None.
+        agent_idle_timeout (float | None, optional): The number of seconds after which an unused agent instance is passivated.
+            If None, agents are not passivated for being idle. Defaults to None.
+        agent_state_store (AgentStateStore | None, optional): The store for the state of passivated agents.
+            Defaults to an :class:`~autogen_core.application.InMemoryAgentStateStore`.
+        max_agent_concurrency (int | None, optional): The maximum number of messages that each agent handles at the same time.
+            Messages for a busy agent wait in its mailbox and are handed to it in arrival order. Use 1 to have each agent handle
+            one message at a time; an agent must then not send a message to itself, directly or through other agents, and wait for the response.
+            If None, every message is handed to its recipient as soon as it is dispatched. Defaults to None.
+        max_mailbox_size (int, optional): The maximum number of messages waiting in the mailbox of an agent. When the mailbox is full,
+            a new message for the agent is dropped with :class:`~autogen_core.base.exceptions.MessageDroppedException`.
+            Only applies if `max_agent_concurrency` is set. If 0 or less, mailboxes are unbounded. Defaults to 0.
+    """
+
     def __init__(
         self,
         *,
         intervention_handlers: List[InterventionHandler] | None = None,
         tracer_provider: TracerProvider | None = None,
+        max_queue_size: int = 0,
+        prioritize_responses: bool = False,
+        max_batch_size: int = 1,
+        max_cached_topics: int | None = DEFAULT_MAX_CACHED_TOPICS,
+        cached_topic_ttl: float | None = None,
+        max_resident_agents: int | None = None,
+        agent_idle_timeout: float | None = None,
+        agent_state_store: AgentStateStore | None = None,
+        max_agent_concurrency: int | None = None,
+        max_mailbox_size: int = 0,
     ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
         self._tracer_helper = TraceHelper(tracer_provider, MessageRuntimeTracingConfig("SingleThreadedAgentRuntime"))
-        self._message_queue: List[PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope] = []
+        self._message_queue: MessageQueue[PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope] = (
+            MessageQueue(maxsize=max_queue_size, num_priorities=2)
+        )
+        self._response_priority = _RESPONSE_PRIORITY if prioritize_responses else _DEFAULT_PRIORITY
+        self._max_batch_size = max_batch_size
         # (namespace, type) -> List[AgentId]
-        self._agent_factories: Dict[
-            str, Callable[[], Agent | Awaitable[Agent]] | Callable[[AgentRuntime, AgentId], Agent | Awaitable[Agent]]
-        ] = {}
-        self._instantiated_agents: Dict[AgentId, Agent] = {}
-        self._intervention_handlers = intervention_handlers
+        self._agent_factories: Dict[str, AgentFactory[Agent]] = {}
+        self._agent_lifecycle = AgentLifecycleManager(
+            max_resident_agents=max_resident_agents, idle_timeout=agent_idle_timeout, state_store=agent_state_store
+        )
+        self._mailboxes = AgentMailboxManager(max_concurrency=max_agent_concurrency, max_depth=max_mailbox_size)
+        self._intervention_pipeline = InterventionPipeline(intervention_handlers or [], self._tracer_helper)
         self._outstanding_tasks = Counter()
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(
+            max_cached_topics=max_cached_topics, cached_topic_ttl=cached_topic_ttl
+        )
         self._run_context: RunContext | None = None
         self._serialization_registry = SerializationRegistry()
 
@@ -178,6 +256,27 @@ def unprocessed_messages(
     def outstanding_tasks(self) -> int:
         return self._outstanding_tasks.get()
 
+    @property
+    def agent_lifecycle_metrics(self) -> AgentLifecycleMetrics:
+        """The number of resident agent instances and the number of passivated and rehydrated agents."""
+        return self._agent_lifecycle.metrics
+
+    @property
+    def mailbox_metrics(self) -> Dict[AgentId, MailboxMetrics]:
+        """The queue depth and wait times of the mailboxes of the agents that currently have messages to handle."""
+        return self._mailboxes.metrics
+
+    @property
+    def total_mailbox_metrics(self) -> MailboxMetrics:
+        """The queue depth and wait times of all agent mailboxes, including the ones that were removed when they became empty."""
+        return self._mailboxes.total_metrics
+
+    @property
+    def intervention_metrics(self) -> List[InterventionHandlerMetrics]:
+        """The number of calls to and the time spent in each hook of the intervention handlers.
+        Hooks that a handler does not override are not called and are not listed."""
+        return self._intervention_pipeline.metrics
+
     @property
     def _known_agent_names(self) -> Set[str]:
         return set(self._agent_factories.keys())
@@ -194,15 +293,16 @@ async def send_message(
         if cancellation_token is None:
             cancellation_token = CancellationToken()
 
-        # event_logger.info(
-        #     MessageEvent(
-        #         payload=message,
-        #         sender=sender,
-        #         receiver=recipient,
-        #         kind=MessageKind.DIRECT,
-        #         delivery_stage=DeliveryStage.SEND,
-        #     )
-        # )
+        if event_logger.isEnabledFor(logging.INFO):
+            event_logger.info(
+                MessageEvent(
+                    payload=message,
+                    sender=sender,
+                    receiver=recipient,
+                    kind=MessageKind.DIRECT,
+                    delivery_stage=DeliveryStage.SEND,
+                )
+            )
 
         with self._tracer_helper.trace_block(
             "create",
@@ -214,10 +314,10 @@ async def send_message(
             if recipient.type not in self._known_agent_names:
                 future.set_exception(Exception("Recipient not found"))
 
-            content = message.__dict__ if hasattr(message, "__dict__") else message
-            logger.info(f"Sending message of type {type(message).__name__} to {recipient.type}: {content}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Sending message of type %s to %s: %s", type(message).__name__, recipient.type, message)
 
-            self._message_queue.append(
+            await self._message_queue.put(
                 SendMessageEnvelope(
                     message=message,
                     recipient=recipient,
@@ -225,8 +325,10 @@ async def send_message(
                     cancellation_token=cancellation_token,
                     sender=sender,
                     metadata=get_telemetry_envelope_metadata(),
-                )
+                ),
+                priority=_DEFAULT_PRIORITY,
             )
+            self._notify_state_changed()
 
             cancellation_token.link_future(future)
 
@@ -248,34 +350,37 @@ async def publish_message(
         ):
             if cancellation_token is None:
                 cancellation_token = CancellationToken()
-            content = message.__dict__ if hasattr(message, "__dict__") else message
-            logger.info(f"Publishing message of type {type(message).__name__} to all subscribers: {content}")
-
-            # event_logger.info(
-            #     MessageEvent(
-            #         payload=message,
-            #         sender=sender,
-            #         receiver=None,
-            #         kind=MessageKind.PUBLISH,
-            #         delivery_stage=DeliveryStage.SEND,
-            #     )
-            # )
-
-            self._message_queue.append(
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Publishing message of type %s to all subscribers: %s", type(message).__name__, message)
+            if event_logger.isEnabledFor(logging.INFO):
+                event_logger.info(
+                    MessageEvent(
+                        payload=message,
+                        sender=sender,
+                        receiver=None,
+                        kind=MessageKind.PUBLISH,
+                        delivery_stage=DeliveryStage.SEND,
+                    )
+                )
+
+            await self._message_queue.put(
                 PublishMessageEnvelope(
                     message=message,
                     cancellation_token=cancellation_token,
                     sender=sender,
                     topic_id=topic_id,
                     metadata=get_telemetry_envelope_metadata(),
-                )
+                ),
+                priority=_DEFAULT_PRIORITY,
             )
+            self._notify_state_changed()
 
     async def save_state(self) -> Mapping[str, Any]:
-        state: Dict[str, Dict[str, Any]] = {}
-        for agent_id in self._instantiated_agents:
-            state[str(agent_id)] = dict((await self._get_agent(agent_id)).save_state())
-        return state
+        # The agents are not looked up one by one, which would evict the others and rehydrate them in turn.
+        return {
+            str(agent_id): dict(agent_state)
+            for agent_id, agent_state in (await self._agent_lifecycle.save_states()).items()
+        }
 
     async def load_state(self, state: Mapping[str, Any]) -> None:
         for agent_id_str in state:
@@ -290,32 +395,39 @@ async def _process_send(self, message_envelope: SendMessageEnvelope) -> None:
             # assert recipient in self._agents
 
             try:
-                # TODO use id
-                sender_name = message_envelope.sender.type if message_envelope.sender is not None else "Unknown"
-                logger.info(
-                    f"Calling message handler for {recipient} with message type {type(message_envelope.message).__name__} sent by {sender_name}"
-                )
-                # event_logger.info(
-                #     MessageEvent(
-                #         payload=message_envelope.message,
-                #         sender=message_envelope.sender,
-                #         receiver=recipient,
-                #         kind=MessageKind.DIRECT,
-                #         delivery_stage=DeliveryStage.DELIVER,
-                #     )
-                # )
-                recipient_agent = await self._get_agent(recipient)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "Calling message handler for %s with message type %s sent by %s",
+                        recipient,
+                        type(message_envelope.message).__name__,
+                        message_envelope.sender if message_envelope.sender is not None else "Unknown",
+                    )
+                if event_logger.isEnabledFor(logging.INFO):
+                    event_logger.info(
+                        MessageEvent(
+                            payload=message_envelope.message,
+                            sender=message_envelope.sender,
+                            receiver=recipient,
+                            kind=MessageKind.DIRECT,
+                            delivery_stage=DeliveryStage.DELIVER,
+                        )
+                    )
                 message_context = MessageContext(
                     sender=message_envelope.sender,
                     topic_id=None,
                     is_rpc=True,
                     cancellation_token=message_envelope.cancellation_token,
                 )
-                with MessageHandlerContext.populate_context(recipient_agent.id):
-                    response = await recipient_agent.on_message(
-                        message_envelope.message,
-                        ctx=message_context,
-                    )
+                async with self._mailboxes.slot(recipient):
+                    recipient_agent = await self._get_agent(recipient)
+                    with (
+                        self._agent_lifecycle.active(recipient),
+                        MessageHandlerContext.populate_context(recipient_agent.id),
+                    ):
+                        response = await recipient_agent.on_message(
+                            message_envelope.message,
+                            ctx=message_context,
+                        )
             except CancelledError as e:
                 if not message_envelope.future.cancelled():
                     message_envelope.future.set_exception(e)
@@ -326,15 +438,20 @@ async def _process_send(self, message_envelope: SendMessageEnvelope) -> None:
                 self._outstanding_tasks.decrement()
                 return
 
-            self._message_queue.append(
+            # Responses complete requests that were already admitted to the queue,
+            # so they are not subject to backpressure.
+            self._message_queue.put_nowait(
                 ResponseMessageEnvelope(
                     message=response,
                     future=message_envelope.future,
                     sender=message_envelope.recipient,
                     recipient=message_envelope.sender,
                     metadata=get_telemetry_envelope_metadata(),
-                )
+                ),
+                priority=self._response_priority,
+                ignore_maxsize=True,
             )
+            self._notify_state_changed()
             self._outstanding_tasks.decrement()
 
     async def _process_publish(self, message_envelope: PublishMessageEnvelope) -> None:
@@ -342,44 +459,56 @@ async def _process_publish(self, message_envelope: PublishMessageEnvelope) -> No
             try:
                 responses: List[Awaitable[Any]] = []
                 recipients = await self._subscription_manager.get_subscribed_recipients(message_envelope.topic_id)
+                # Check the loggers once per publish rather than once per recipient.
+                log_delivery = logger.isEnabledFor(logging.INFO)
+                log_events = event_logger.isEnabledFor(logging.INFO)
+                sender_name = str(message_envelope.sender) if message_envelope.sender is not None else "Unknown"
+                message_type = type(message_envelope.message).__name__
                 for agent_id in recipients:
                     # Avoid sending the message back to the sender
                     if message_envelope.sender is not None and agent_id == message_envelope.sender:
                         continue
 
-                    sender_agent = (
-                        await self._get_agent(message_envelope.sender) if message_envelope.sender is not None else None
-                    )
-                    sender_name = str(sender_agent.id) if sender_agent is not None else "Unknown"
-                    logger.info(
-                        f"Calling message handler for {agent_id.type} with message type {type(message_envelope.message).__name__} published by {sender_name}"
-                    )
-                    # event_logger.info(
-                    #     MessageEvent(
-                    #         payload=message_envelope.message,
-                    #         sender=message_envelope.sender,
-                    #         receiver=agent,
-                    #         kind=MessageKind.PUBLISH,
-                    #         delivery_stage=DeliveryStage.DELIVER,
-                    #     )
-                    # )
+                    if log_delivery:
+                        logger.info(
+                            "Calling message handler for %s with message type %s published by %s",
+                            agent_id.type,
+                            message_type,
+                            sender_name,
+                        )
+                    if log_events:
+                        event_logger.info(
+                            MessageEvent(
+                                payload=message_envelope.message,
+                                sender=message_envelope.sender,
+                                receiver=agent_id,
+                                kind=MessageKind.PUBLISH,
+                                delivery_stage=DeliveryStage.DELIVER,
+                            )
+                        )
                     message_context = MessageContext(
                         sender=message_envelope.sender,
                         topic_id=message_envelope.topic_id,
                         is_rpc=False,
                         cancellation_token=message_envelope.cancellation_token,
                     )
-                    agent = await self._get_agent(agent_id)
 
-                    async def _on_message(agent: Agent, message_context: MessageContext) -> Any:
-                        with self._tracer_helper.trace_block("process", agent.id, parent=None):
-                            with MessageHandlerContext.populate_context(agent.id):
-                                return await agent.on_message(
-                                    message_envelope.message,
-                                    ctx=message_context,
-                                )
-
-                    future = _on_message(agent, message_context)
+                    async def _on_message(agent_id: AgentId, message_context: MessageContext) -> Any:
+                        async with self._mailboxes.slot(agent_id):
+                            # Look up the agent right before handling the message, so that it cannot be
+                            # passivated while the other recipients are being created.
+                            agent = await self._get_agent(agent_id)
+                            with self._tracer_helper.trace_block("process", agent.id, parent=None):
+                                with (
+                                    self._agent_lifecycle.active(agent.id),
+                                    MessageHandlerContext.populate_context(agent.id),
+                                ):
+                                    return await agent.on_message(
+                                        message_envelope.message,
+                                        ctx=message_context,
+                                    )
+
+                    future = _on_message(agent_id, message_context)
                     responses.append(future)
 
                 await asyncio.gather(*responses)
@@ -394,105 +523,153 @@ async def _on_message(agent: Agent, message_context: MessageContext) -> Any:
 
     async def _process_response(self, message_envelope: ResponseMessageEnvelope) -> None:
         with self._tracer_helper.trace_block("ack", message_envelope.recipient, parent=message_envelope.metadata):
-            content = (
-                message_envelope.message.__dict__
-                if hasattr(message_envelope.message, "__dict__")
-                else message_envelope.message
-            )
-            logger.info(
-                f"Resolving response with message type {type(message_envelope.message).__name__} for recipient {message_envelope.recipient} from {message_envelope.sender.type}: {content}"
-            )
-            # event_logger.info(
-            #     MessageEvent(
-            #         payload=message_envelope.message,
-            #         sender=message_envelope.sender,
-            #         receiver=message_envelope.recipient,
-            #         kind=MessageKind.RESPOND,
-            #         delivery_stage=DeliveryStage.DELIVER,
-            #     )
-            # )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Resolving response with message type %s for recipient %s from %s: %s",
+                    type(message_envelope.message).__name__,
+                    message_envelope.recipient,
+                    message_envelope.sender.type,
+                    message_envelope.message,
+                )
+            if event_logger.isEnabledFor(logging.INFO):
+                event_logger.info(
+                    MessageEvent(
+                        payload=message_envelope.message,
+                        sender=message_envelope.sender,
+                        receiver=message_envelope.recipient,
+                        kind=MessageKind.RESPOND,
+                        delivery_stage=DeliveryStage.DELIVER,
+                    )
+                )
             self._outstanding_tasks.decrement()
             if not message_envelope.future.cancelled():
                 message_envelope.future.set_result(message_envelope.message)
 
     async def process_next(self) -> None:
-        """Process the next message in the queue."""
+        """Process the next message in the queue.
+
+        If the runtime was created with a `max_batch_size` greater than 1, up to that many
+        queued messages are dispatched and their processing tasks are all scheduled
+        before yielding to the event loop. A message that fails to be dispatched is failed
+        on its own, and the rest of the batch is still dispatched.
+        """
 
-        if len(self._message_queue) == 0:
+        if self._message_queue.empty():
             # Yield control to the event loop to allow other tasks to run
             await asyncio.sleep(0)
             return
-        message_envelope = self._message_queue.pop(0)
 
-        match message_envelope:
-            case SendMessageEnvelope(message=message, sender=sender, recipient=recipient, future=future):
-                if self._intervention_handlers is not None:
-                    for handler in self._intervention_handlers:
-                        with self._tracer_helper.trace_block(
-                            "intercept", handler.__class__.__name__, parent=message_envelope.metadata
-                        ):
-                            try:
-                                temp_message = await handler.on_send(message, sender=sender, recipient=recipient)
-                            except BaseException as e:
-                                future.set_exception(e)
-                                return
-                            if temp_message is DropMessage or isinstance(temp_message, DropMessage):
-                                future.set_exception(MessageDroppedException())
-                                return
-
-                        message_envelope.message = temp_message
-                self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_send(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
-            case PublishMessageEnvelope(
-                message=message,
-                sender=sender,
-            ):
-                if self._intervention_handlers is not None:
-                    for handler in self._intervention_handlers:
-                        with self._tracer_helper.trace_block(
-                            "intercept", handler.__class__.__name__, parent=message_envelope.metadata
-                        ):
-                            try:
-                                temp_message = await handler.on_publish(message, sender=sender)
-                            except BaseException as e:
-                                # TODO: we should raise the intervention exception to the publisher.
-                                logger.error(f"Exception raised in in intervention handler: {e}", exc_info=True)
-                                return
-                            if temp_message is DropMessage or isinstance(temp_message, DropMessage):
-                                # TODO log message dropped
-                                return
-
-                        message_envelope.message = temp_message
-                self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_publish(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
-            case ResponseMessageEnvelope(message=message, sender=sender, recipient=recipient, future=future):
-                if self._intervention_handlers is not None:
-                    for handler in self._intervention_handlers:
-                        try:
-                            temp_message = await handler.on_response(message, sender=sender, recipient=recipient)
-                        except BaseException as e:
-                            # TODO: should we raise the exception to sender of the response instead?
-                            future.set_exception(e)
-                            return
-                        if temp_message is DropMessage or isinstance(temp_message, DropMessage):
-                            future.set_exception(MessageDroppedException())
-                            return
-                        message_envelope.message = temp_message
-                self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_response(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
+        # Messages are dequeued one at a time, so that those after a failed one stay queued until they are dispatched.
+        for _ in range(min(self._max_batch_size, len(self._message_queue))):
+            message_envelope = self._message_queue.get_nowait()
+            try:
+                self._dispatch(message_envelope)
+            except Exception as e:
+                logger.error("Failed to dispatch %s.", type(message_envelope).__name__, exc_info=e)
+                if not isinstance(message_envelope, PublishMessageEnvelope) and not message_envelope.future.done():
+                    message_envelope.future.set_exception(e)
 
         # Yield control to the message loop to allow other tasks to run
         await asyncio.sleep(0)
 
+    def _dispatch(
+        self, message_envelope: PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope
+    ) -> None:
+        """Schedule the processing task of a dequeued message.
+
+        Intervention handlers run at the start of the processing task rather than in the processing loop,
+        so a slow handler does not hold up the dispatch of other messages.
+        """
+        match message_envelope:
+            case SendMessageEnvelope():
+                if self._intervention_pipeline.intercepts_send:
+                    coro = self._intercept_send(message_envelope)
+                else:
+                    coro = self._process_send(message_envelope)
+            case PublishMessageEnvelope():
+                if self._intervention_pipeline.intercepts_publish:
+                    coro = self._intercept_publish(message_envelope)
+                else:
+                    coro = self._process_publish(message_envelope)
+            case ResponseMessageEnvelope():
+                if self._intervention_pipeline.intercepts_response:
+                    coro = self._intercept_response(message_envelope)
+                else:
+                    coro = self._process_response(message_envelope)
+        try:
+            task = asyncio.create_task(coro)
+        except BaseException:
+            coro.close()
+            raise
+        self._outstanding_tasks.increment()
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(self._notify_state_changed)
+
+    async def _intercept_send(self, message_envelope: SendMessageEnvelope) -> None:
+        try:
+            message = await self._intervention_pipeline.on_send(
+                message_envelope.message,
+                sender=message_envelope.sender,
+                recipient=message_envelope.recipient,
+                metadata=message_envelope.metadata,
+            )
+        except BaseException as e:
+            if not message_envelope.future.done():
+                message_envelope.future.set_exception(e)
+            self._outstanding_tasks.decrement()
+            return
+        if message is DropMessage:
+            if not message_envelope.future.done():
+                message_envelope.future.set_exception(MessageDroppedException())
+            self._outstanding_tasks.decrement()
+            return
+        message_envelope.message = message
+        await self._process_send(message_envelope)
+
+    async def _intercept_publish(self, message_envelope: PublishMessageEnvelope) -> None:
+        try:
+            message = await self._intervention_pipeline.on_publish(
+                message_envelope.message, sender=message_envelope.sender, metadata=message_envelope.metadata
+            )
+        except BaseException as e:
+            # TODO: we should raise the intervention exception to the publisher.
+            logger.error("Exception raised in in intervention handler: %s", e, exc_info=True)
+            self._outstanding_tasks.decrement()
+            return
+        if message is DropMessage:
+            # TODO log message dropped
+            self._outstanding_tasks.decrement()
+            return
+        message_envelope.message = message
+        await self._process_publish(message_envelope)
+
+    async def _intercept_response(self, message_envelope: ResponseMessageEnvelope) -> None:
+        try:
+            message = await self._intervention_pipeline.on_response(
+                message_envelope.message, sender=message_envelope.sender, recipient=message_envelope.recipient
+            )
+        except BaseException as e:
+            # TODO: should we raise the exception to sender of the response instead?
+            if not message_envelope.future.done():
+                message_envelope.future.set_exception(e)
+            self._outstanding_tasks.decrement()
+            return
+        if message is DropMessage:
+            if not message_envelope.future.done():
+                message_envelope.future.set_exception(MessageDroppedException())
+            self._outstanding_tasks.decrement()
+            return
+        message_envelope.message = message
+        await self._process_response(message_envelope)
+
+    def _notify_state_changed(self, *args: Any) -> None:
+        if self._run_context is not None:
+            self._run_context.notify_state_changed()
+
     @property
     def idle(self) -> bool:
-        return len(self._message_queue) == 0 and self._outstanding_tasks.get() == 0
+        return self._message_queue.empty() and self._outstanding_tasks.get() == 0
 
     def start(self) -> None:
         """Start the runtime message processing loop."""
@@ -516,7 +693,11 @@ async def stop_when_idle(self) -> None:
         self._run_context = None
 
     async def stop_when(self, condition: Callable[[], bool]) -> None:
-        """Stop the runtime message processing loop when the condition is met."""
+        """Stop the runtime message processing loop when the condition is met.
+
+        The condition is evaluated whenever the state of the runtime changes, i.e., when
+        a message is enqueued or processed, or when a message handler finishes.
+        """
         if self._run_context is None:
             raise RuntimeError("Runtime is not started")
         await self._run_context.stop_when(condition)
@@ -544,6 +725,7 @@ async def register(
     ) -> AgentType:
         if type in self._agent_factories:
             raise ValueError(f"Agent with type {type} already exists.")
+        factory = AgentFactory(agent_factory)
 
         if subscriptions is not None:
             if callable(subscriptions):
@@ -559,7 +741,7 @@ async def register(
             for subscription in subscriptions_list:
                 await self.add_subscription(subscription)
 
-        self._agent_factories[type] = agent_factory
+        self._agent_factories[type] = factory
         return AgentType(type)
 
     async def register_factory(
@@ -584,45 +766,22 @@ async def factory_wrapper() -> T:
 
             return agent_instance
 
-        self._agent_factories[type.type] = factory_wrapper
+        self._agent_factories[type.type] = AgentFactory(factory_wrapper)
 
         return type
 
-    async def _invoke_agent_factory(
-        self,
-        agent_factory: Callable[[], T | Awaitable[T]] | Callable[[AgentRuntime, AgentId], T | Awaitable[T]],
-        agent_id: AgentId,
-    ) -> T:
+    async def _invoke_agent_factory(self, agent_factory: AgentFactory[T], agent_id: AgentId) -> T:
         with AgentInstantiationContext.populate_context((self, agent_id)):
-            if len(inspect.signature(agent_factory).parameters) == 0:
-                factory_one = cast(Callable[[], T], agent_factory)
-                agent = factory_one()
-            elif len(inspect.signature(agent_factory).parameters) == 2:
-                warnings.warn(
-                    "Agent factories that take two arguments are deprecated. Use AgentInstantiationContext instead. Two arg factories will be removed in a future version.",
-                    stacklevel=2,
-                )
-                factory_two = cast(Callable[[AgentRuntime, AgentId], T], agent_factory)
-                agent = factory_two(self, agent_id)
-            else:
-                raise ValueError("Agent factory must take 0 or 2 arguments.")
-
-            if inspect.isawaitable(agent):
-                return cast(T, await agent)
-
-            return agent
+            return await agent_factory(self, agent_id)
 
     async def _get_agent(self, agent_id: AgentId) -> Agent:
-        if agent_id in self._instantiated_agents:
-            return self._instantiated_agents[agent_id]
-
         if agent_id.type not in self._agent_factories:
             raise LookupError(f"Agent with name {agent_id.type} not found.")
 
-        agent_factory = self._agent_factories[agent_id.type]
-        agent = await self._invoke_agent_factory(agent_factory, agent_id)
-        self._instantiated_agents[agent_id] = agent
-        return agent
+        async def create() -> Agent:
+            return await self._invoke_agent_factory(self._agent_factories[agent_id.type], agent_id)
+
+        return await self._agent_lifecycle.get_or_create(agent_id, create)
 
     # TODO: uncomment out the following type ignore when this is fixed in mypy: https://github.com/python/mypy/issues/3737
     async def try_get_underlying_agent_instance(self, id: AgentId, type: Type[T] = Agent) -> T:  # type: ignore[assignment]
@@ -655,5 +814,25 @@ async def get(
             instance_getter=self._get_agent,
         )
 
+    async def warm_up(self, type: AgentType | str, keys: Iterable[str]) -> None:
+        """Instantiate the agents of a registered type for the given keys ahead of time,
+        so that the first message to each of them does not wait for the agent to be constructed.
+
+        Agents that already exist are left as they are. If the runtime limits the number of resident agents,
+        warmed up agents are subject to eviction like any other agent.
+
+        Args:
+            type (AgentType | str): The type of the agents.
+            keys (Iterable[str]): The keys of the agents to instantiate.
+
+        Raises:
+            LookupError: If the agent type is not registered.
+        """
+        type_str = type if isinstance(type, str) else type.type
+        if type_str not in self._agent_factories:
+            raise LookupError(f"Agent with name {type_str} not found.")
+        for key in keys:
+            await self._get_agent(AgentId(type_str, key))
+
     def add_message_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSerializer[Any]]) -> None:
         self._serialization_registry.add_serializer(serializer)
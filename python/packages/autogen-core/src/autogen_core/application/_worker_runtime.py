@@ -3,9 +3,10 @@
 import json
 import logging
 import signal
-import warnings
+import uuid
 from asyncio import Future, Task
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -16,12 +17,15 @@
     ClassVar,
     DefaultDict,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Literal,
     Mapping,
     ParamSpec,
     Sequence,
     Set,
+    Tuple,
     Type,
     TypeVar,
     cast,
@@ -50,8 +54,36 @@
     SubscriptionInstantiationContext,
     TopicId,
 )
+from ..base.exceptions import MessageDroppedException
 from ..components import TypeSubscription
-from ._helpers import SubscriptionManager, get_impl
+from ._agent_lifecycle import AgentLifecycleManager, AgentLifecycleMetrics
+from ._agent_state_store import AgentStateStore
+from ._blob_store import DEFAULT_BLOB_CACHE_SIZE, DEFAULT_BLOB_THRESHOLD, DEFAULT_BLOB_TTL, BlobCache, BlobStore
+from ._flow_control import (
+    DEFAULT_MAX_QUEUE_SIZE,
+    FlowControlQueue,
+    QueueAsyncIterable,
+    QueueFullPolicy,
+    QueueMetrics,
+    is_flow_controlled,
+    sum_queue_metrics,
+)
+from ._helpers import (
+    DEFAULT_MAX_CACHED_TOPICS,
+    DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+    DEFAULT_REAP_INTERVAL,
+    DEFAULT_RECONNECT_BACKOFF,
+    DEFAULT_REPLAY_BUFFER_SIZE,
+    MAX_RECENT_EVENTS,
+    MAX_RECENT_REQUESTS,
+    MESSAGE_BATCHING_METADATA,
+    WORKER_ID_METADATA_KEY,
+    AgentFactory,
+    SubscriptionManager,
+    accepts_message_batches,
+    acknowledges_messages,
+    get_impl,
+)
 from .protos import agent_worker_pb2, agent_worker_pb2_grpc
 from .telemetry import MessageRuntimeTracingConfig, TraceHelper, get_telemetry_grpc_metadata
 
@@ -68,17 +100,6 @@
 type_func_alias = type
 
 
-class QueueAsyncIterable(AsyncIterator[Any], AsyncIterable[Any]):
-    def __init__(self, queue: asyncio.Queue[Any]) -> None:
-        self._queue = queue
-
-    async def __anext__(self) -> Any:
-        return await self._queue.get()
-
-    def __aiter__(self) -> AsyncIterator[Any]:
-        return self
-
-
 class HostConnection:
     DEFAULT_GRPC_CONFIG: ClassVar[ChannelArgumentType] = [
         (
@@ -102,14 +123,60 @@ class HostConnection:
         )
     ]
 
-    def __init__(self, channel: grpc.aio.Channel) -> None:  # type: ignore
+    def __init__(  # type: ignore
+        self,
+        channel: grpc.aio.Channel,  # type: ignore
+        *,
+        replay_buffer_size: int = DEFAULT_REPLAY_BUFFER_SIZE,
+        reconnect_backoff: Tuple[float, float] = DEFAULT_RECONNECT_BACKOFF,
+        on_reconnect: Callable[[], Awaitable[List[agent_worker_pb2.Message]]] | None = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        queue_full_policy: QueueFullPolicy = "block",
+        on_drop: Callable[[agent_worker_pb2.Message], None] | None = None,
+        metadata: Sequence[Tuple[str, str]] = (),
+        max_batch_size: int = DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+    ) -> None:
         self._channel = channel
-        self._send_queue = asyncio.Queue[agent_worker_pb2.Message]()
-        self._recv_queue = asyncio.Queue[agent_worker_pb2.Message]()
+        self._max_batch_size = max_batch_size
+        # Only tell the host that batched messages are accepted if this connection batches the messages it sends as well.
+        self._metadata = [*([MESSAGE_BATCHING_METADATA] if max_batch_size > 1 else []), *metadata]
+        # Only requests and events count towards the bounds of the queues, so that responses are never held up behind them.
+        self._send_queue = FlowControlQueue[agent_worker_pb2.Message](
+            max_queue_size, queue_full_policy, is_bounded=is_flow_controlled, on_drop=self._on_drop
+        )
+        self._recv_queue = FlowControlQueue[agent_worker_pb2.Message](
+            max_queue_size, "block", is_bounded=is_flow_controlled
+        )
+        self._drop_callback = on_drop
         self._connection_task: Task[None] | None = None
+        self._closed = False
+        self._connected = False
+        # Sent messages are kept until the host acknowledges them, and retained messages until they are released,
+        # so that they can be sent again after reconnecting. Both are ordered by sequence number.
+        self._next_sequence = 0
+        self._unacknowledged: OrderedDict[int, agent_worker_pb2.Message] = OrderedDict()
+        self._retained: Dict[int, agent_worker_pb2.Message] = {}
+        self._replay_slots = asyncio.Semaphore(replay_buffer_size)
+        # Until the host is known not to acknowledge messages.
+        self._keep_unacknowledged = True
+        self._reconnect_backoff = reconnect_backoff
+        self._on_reconnect = on_reconnect
 
     @classmethod
-    def from_host_address(cls, host_address: str, extra_grpc_config: ChannelArgumentType = DEFAULT_GRPC_CONFIG) -> Self:
+    def from_host_address(
+        cls,
+        host_address: str,
+        extra_grpc_config: ChannelArgumentType = DEFAULT_GRPC_CONFIG,
+        *,
+        replay_buffer_size: int = DEFAULT_REPLAY_BUFFER_SIZE,
+        reconnect_backoff: Tuple[float, float] = DEFAULT_RECONNECT_BACKOFF,
+        on_reconnect: Callable[[], Awaitable[List[agent_worker_pb2.Message]]] | None = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        queue_full_policy: QueueFullPolicy = "block",
+        on_drop: Callable[[agent_worker_pb2.Message], None] | None = None,
+        metadata: Sequence[Tuple[str, str]] = (),
+        max_batch_size: int = DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+    ) -> Self:
         logger.info("Connecting to %s", host_address)
         #  Always use DEFAULT_GRPC_CONFIG and override it with provided grpc_config
         merged_options = [
@@ -120,76 +187,352 @@ def from_host_address(cls, host_address: str, extra_grpc_config: ChannelArgument
             host_address,
             options=merged_options,
         )
-        instance = cls(channel)
-        instance._connection_task = asyncio.create_task(
-            instance._connect(channel, instance._send_queue, instance._recv_queue)
+        instance = cls(
+            channel,
+            replay_buffer_size=replay_buffer_size,
+            reconnect_backoff=reconnect_backoff,
+            on_reconnect=on_reconnect,
+            max_queue_size=max_queue_size,
+            queue_full_policy=queue_full_policy,
+            on_drop=on_drop,
+            metadata=metadata,
+            max_batch_size=max_batch_size,
         )
+        instance._connection_task = asyncio.create_task(instance._run())
         return instance
 
     async def close(self) -> None:
         if self._connection_task is None:
             raise RuntimeError("Connection is not open.")
+        self._closed = True
         await self._channel.close()
-        await self._connection_task
-
-    @staticmethod
-    async def _connect(  # type: ignore
-        channel: grpc.aio.Channel,
-        send_queue: asyncio.Queue[agent_worker_pb2.Message],
-        receive_queue: asyncio.Queue[agent_worker_pb2.Message],
+        self._connection_task.cancel()
+        try:
+            await self._connection_task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(self._channel)  # type: ignore
+        initial_backoff, max_backoff = self._reconnect_backoff
+        backoff = initial_backoff
+        disconnected_at: float | None = None
+        while True:
+            self._connected = False
+            try:
+                # Send the messages that the host may not have received ahead of any new message.
+                # The messages that are still queued are kept in the buffers as well, or are not needed after reconnecting.
+                first_messages = await self._on_reconnect() if self._on_reconnect is not None else []
+                self._send_queue.drain()
+                for message in first_messages:
+                    self._send_queue.put_nowait(message)
+                for sequence in sorted([*self._unacknowledged, *self._retained]):
+                    if sequence in self._unacknowledged:
+                        self._send_queue.put_nowait(self._unacknowledged[sequence])
+                    else:
+                        self._send_queue.put_nowait(self._retained[sequence])
+                await self._connect(stub, self._send_queue, disconnected_at)
+                logger.info("EOF")
+            except grpc.aio.AioRpcError as e:
+                if self._closed:
+                    return
+                logger.warning("Connection to host failed: %s", e.code())
+            except Exception:
+                # Keep reconnecting after any other error, such as from the on_reconnect callback.
+                if self._closed:
+                    return
+                logger.exception("Connection to host failed.")
+            if self._closed:
+                return
+            if self._connected:
+                # The connection was lost, so reconnect after the shortest wait.
+                backoff = initial_backoff
+                disconnected_at = asyncio.get_running_loop().time()
+            # Wait longer after every failed attempt.
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    async def _connect(
+        self,
+        stub: "AgentRpcAsyncStub",
+        send_queue: FlowControlQueue[agent_worker_pb2.Message],
+        disconnected_at: float | None,
     ) -> None:
-        stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(channel)  # type: ignore
+        # Tell the host whether batched messages are accepted, and batch outgoing messages if the host does as well.
+        send_stream = QueueAsyncIterable(send_queue)
+        try:
+            await self._exchange_messages(stub, send_stream, disconnected_at)
+        finally:
+            send_stream.close()
 
-        # TODO: where do exceptions from reading the iterable go? How do we recover from those?
+    async def _exchange_messages(
+        self,
+        stub: "AgentRpcAsyncStub",
+        send_stream: QueueAsyncIterable,
+        disconnected_at: float | None,
+    ) -> None:
         recv_stream: StreamStreamCall[agent_worker_pb2.Message, agent_worker_pb2.Message] = stub.OpenChannel(  # type: ignore
-            QueueAsyncIterable(send_queue)
+            send_stream, metadata=self._metadata
         )  # type: ignore
+        initial_metadata = await recv_stream.initial_metadata()  # type: ignore
+        if recv_stream.done():  # type: ignore
+            # The call failed before the host answered.
+            await recv_stream.wait_for_connection()  # type: ignore
+            return
+        if accepts_message_batches(initial_metadata):
+            send_stream.max_batch_size = self._max_batch_size
+        self._keep_unacknowledged = acknowledges_messages(initial_metadata)
+        if not self._keep_unacknowledged:
+            # The host does not acknowledge messages, so only the retained messages are kept.
+            self._acknowledge(self._next_sequence)
+        self._connected = True
+        if disconnected_at is not None:
+            logger.info("Reconnected to host after %.3f seconds.", asyncio.get_running_loop().time() - disconnected_at)
 
         while True:
-            logger.info("Waiting for message from host")
             message = await recv_stream.read()  # type: ignore
             if message == grpc.aio.EOF:  # type: ignore
-                logger.info("EOF")
-                break
+                return
             message = cast(agent_worker_pb2.Message, message)
-            logger.info(f"Received a message from host: {message}")
-            await receive_queue.put(message)
-            logger.info("Put message in receive queue")
-
-    async def send(self, message: agent_worker_pb2.Message) -> None:
-        logger.info(f"Send message to host: {message}")
-        await self._send_queue.put(message)
-        logger.info("Put message in send queue")
+            if message.HasField("batch"):
+                for batched_message in message.batch.messages:
+                    if batched_message.HasField("ack"):
+                        self._acknowledge(batched_message.ack.sequence)
+                    else:
+                        await self._recv_queue.put(batched_message)
+            elif message.HasField("ack"):
+                self._acknowledge(message.ack.sequence)
+            else:
+                await self._recv_queue.put(message)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received %s message from host.", message.WhichOneof("message"))
+
+    def _acknowledge(self, sequence: int) -> None:
+        while self._unacknowledged and next(iter(self._unacknowledged)) <= sequence:
+            self._unacknowledged.popitem(last=False)
+            self._replay_slots.release()
+
+    async def send(self, message: agent_worker_pb2.Message, *, retain: bool = False) -> int:
+        """Send a message to the host. The message is kept to be sent again if the connection is lost before
+        the host acknowledges it, or, if `retain` is True, until :meth:`release` is called. Waits while the replay buffer is full,
+        and applies the queue full policy while the send queue is full.
+
+        Returns:
+            int: The sequence number of the message, or 0 if the message is not kept.
+
+        Raises:
+            MessageDroppedException: If the send queue is full and the policy is "reject".
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Send %s message to host.", message.WhichOneof("message"))
+        keep = retain or self._keep_unacknowledged
+        if keep:
+            await self._replay_slots.acquire()
+        try:
+            await self._send_queue.put(message)
+        except BaseException:
+            if keep:
+                self._replay_slots.release()
+            raise
+        if not keep:
+            return 0
+        # The message is numbered once it is queued, so that sequence numbers follow the order of the queue.
+        self._next_sequence += 1
+        sequence = message.sequence = self._next_sequence
+        if retain:
+            self._retained[sequence] = message
+        else:
+            self._unacknowledged[sequence] = message
+        return sequence
+
+    def _on_drop(self, message: agent_worker_pb2.Message) -> None:
+        # A dropped message is not sent again either.
+        sequence = message.sequence
+        if self._unacknowledged.pop(sequence, None) is not None or self._retained.pop(sequence, None) is not None:
+            self._replay_slots.release()
+        if self._drop_callback is not None:
+            self._drop_callback(message)
+
+    def release(self, sequence: int) -> None:
+        """Stop keeping a message that was sent with `retain`."""
+        if self._retained.pop(sequence, None) is not None:
+            self._replay_slots.release()
+
+    async def save_state(self, state: agent_worker_pb2.AgentState) -> agent_worker_pb2.SaveStateResponse:
+        stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(self._channel)  # type: ignore
+        response: agent_worker_pb2.SaveStateResponse = await stub.SaveState(state)
+        return response
+
+    async def get_state(self, agent_id: agent_worker_pb2.AgentId) -> agent_worker_pb2.GetStateResponse:
+        stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(self._channel)  # type: ignore
+        response: agent_worker_pb2.GetStateResponse = await stub.GetState(agent_id)
+        return response
 
     async def recv(self) -> agent_worker_pb2.Message:
-        logger.info("Getting message from queue")
         return await self._recv_queue.get()
 
+    @property
+    def send_queue_metrics(self) -> QueueMetrics:
+        return self._send_queue.metrics
+
+    @property
+    def receive_queue_metrics(self) -> QueueMetrics:
+        return self._recv_queue.metrics
+
 
 class WorkerAgentRuntime(AgentRuntime):
+    """An agent runtime that hosts agents in a worker process and exchanges messages with
+    other workers through a :class:`WorkerAgentRuntimeHost`.
+
+    Args:
+        host_address (str): The address of the host.
+        tracer_provider (TracerProvider, optional): The tracer provider to use for tracing. Defaults to None.
+        extra_grpc_config (ChannelArgumentType, optional): Extra gRPC channel options. Defaults to None.
+        max_cached_topics (int | None, optional): The maximum number of topics for which the resolved subscribers are cached.
+            If None, the cache is unbounded. Defaults to 10000.
+        cached_topic_ttl (float | None, optional): The number of seconds after which the cached subscribers of a topic
+            are resolved again. If None, cached topics do not expire. Defaults to None.
+        max_resident_agents (int | None, optional): The maximum number of agent instances kept in memory. When exceeded,
+            the least recently used agents are passivated: their state is saved to `agent_state_store` and the instance is dropped.
+            A passivated agent is created again and loaded with its saved state on next use. If None, there is no limit. Defaults to None.
+        agent_idle_timeout (float | None, optional): The number of seconds after which an unused agent instance is passivated.
+            If None, agents are not passivated for being idle. Defaults to None.
+        agent_state_store (AgentStateStore | None, optional): The store for the state of passivated agents.
+            Defaults to an :class:`~autogen_core.application.InMemoryAgentStateStore`.
+        data_content_types (Sequence[str], optional): The content types to encode message payloads with, in order of preference.
+            The runtime advertises them to the host when it registers an agent type, as the content types that the agents of the type accept,
+            and the host passes them on to the other workers. A payload is encoded with the first content type that its recipients accept
+            and for which a serializer of its type is registered. Use :meth:`set_data_content_types` to choose different content types
+            for the messages sent to an agent type. Defaults to JSON only.
+        blob_store (BlobStore | None, optional): A blob store shared by the workers. Serialized payloads of at least
+            `blob_threshold` bytes are put in the store and only their reference is sent through the host.
+            All the workers that exchange such payloads must use the same store. If None, payloads are always sent inline. Defaults to None.
+        blob_threshold (int, optional): The size in bytes from which payloads are put in the blob store. Defaults to 1 MiB.
+        blob_cache_size (int, optional): The maximum total size in bytes of the blobs that are cached by the worker,
+            so that a payload received by several agents of the worker is fetched once. Defaults to 64 MiB.
+        blob_ttl (float, optional): The number of seconds after which the blob of a published event is deleted from the blob store,
+            which bounds the time that the receiving workers have to fetch it. The blob of a request is deleted once the request is
+            answered, and the blob of a response once the requester fetched it. The blobs of events that are published less than
+            `blob_ttl` seconds before the runtime stops are left in the store. Defaults to 60 seconds.
+        request_timeout (float | None, optional): The default number of seconds that :meth:`send_message` waits for the response.
+            The timeout is sent with the request, so that the host and the target worker give up on the request as well.
+            If None, requests wait until they are answered or cancelled. Defaults to None.
+        reap_interval (float, optional): The number of seconds between the checks for requests that timed out, which bounds
+            the precision of the timeouts: a request can outlive its timeout by up to this interval. Defaults to 0.5.
+        replay_buffer_size (int, optional): The maximum number of sent messages that are kept until the host acknowledges them,
+            or, for requests, until they are answered. When the connection to the host is lost, the runtime reconnects,
+            registers its agent types and subscriptions again, and sends the kept messages again. Sending waits while the buffer is full.
+            The host acknowledges a message when it has received it, before the message is queued for its recipients, so an event
+            that is in the host when the host stops is lost: events are delivered at most once across host restarts. Defaults to 10000.
+        reconnect_backoff (Tuple[float, float], optional): The number of seconds to wait before the first attempt to reconnect to the host,
+            and the most to wait between attempts. The wait doubles after every failed attempt. Defaults to (0.1, 5.0).
+        max_queue_size (int, optional): The maximum number of requests and events that are queued to be sent to the host,
+            and the maximum number of received requests and events whose handlers have not started yet. When too many received messages
+            wait for their handlers, the runtime stops reading from the host, so that a slow worker slows down the senders instead of
+            growing the queues of the host. Handlers that are running do not count, so a handler can wait for the requests it sends
+            to agents of the same runtime. If 0, the queues are unbounded. Defaults to 10000.
+        queue_full_policy (QueueFullPolicy, optional): What to do with a message that is sent while the send queue is full:
+            "block" waits for space, so :meth:`send_message` and :meth:`publish_message` wait as well; "drop_oldest" drops the oldest
+            queued request or event, failing the dropped request with a :class:`~autogen_core.base.exceptions.MessageDroppedException`;
+            "reject" raises a :class:`~autogen_core.base.exceptions.MessageDroppedException` to the sender. Defaults to "block".
+        num_channels (int, optional): The number of streams to the host, each over its own connection. Messages are sent on
+            the stream chosen by their recipient agent or topic, so the messages to an agent stay in order, and the host spreads
+            the messages for the agents of this worker over the streams by agent key. The streams are read concurrently,
+            so a large payload on one stream does not hold up the messages on the others. The host and the other workers
+            must support workers with several streams. Defaults to 1.
+        restore_checkpoints (bool, optional): If True, an agent that is created is loaded with the state that was last saved at the host
+            by :meth:`checkpoint`, if there is any. Defaults to False.
+        max_batch_size (int, optional): The maximum number of queued messages written to the host in a single batch, if the host
+            accepts batches. If 1 or less, messages are written one at a time, and the host does not batch the messages it writes
+            to this runtime either. Defaults to 100.
+    """
+
     def __init__(
         self,
         host_address: str,
         tracer_provider: TracerProvider | None = None,
         extra_grpc_config: ChannelArgumentType | None = None,
+        *,
+        max_cached_topics: int | None = DEFAULT_MAX_CACHED_TOPICS,
+        cached_topic_ttl: float | None = None,
+        max_resident_agents: int | None = None,
+        agent_idle_timeout: float | None = None,
+        agent_state_store: AgentStateStore | None = None,
+        data_content_types: Sequence[str] = (JSON_DATA_CONTENT_TYPE,),
+        blob_store: BlobStore | None = None,
+        blob_threshold: int = DEFAULT_BLOB_THRESHOLD,
+        blob_cache_size: int = DEFAULT_BLOB_CACHE_SIZE,
+        blob_ttl: float = DEFAULT_BLOB_TTL,
+        request_timeout: float | None = None,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+        replay_buffer_size: int = DEFAULT_REPLAY_BUFFER_SIZE,
+        reconnect_backoff: Tuple[float, float] = DEFAULT_RECONNECT_BACKOFF,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        queue_full_policy: QueueFullPolicy = "block",
+        num_channels: int = 1,
+        restore_checkpoints: bool = False,
+        max_batch_size: int = DEFAULT_MAX_MESSAGE_BATCH_SIZE,
     ) -> None:
+        if num_channels < 1:
+            raise ValueError("num_channels must be at least 1.")
         self._host_address = host_address
         self._trace_helper = TraceHelper(tracer_provider, MessageRuntimeTracingConfig("Worker Runtime"))
         self._per_type_subscribers: DefaultDict[tuple[str, str], Set[AgentId]] = defaultdict(set)
-        self._agent_factories: Dict[
-            str, Callable[[], Agent | Awaitable[Agent]] | Callable[[AgentRuntime, AgentId], Agent | Awaitable[Agent]]
-        ] = {}
-        self._instantiated_agents: Dict[AgentId, Agent] = {}
+        self._agent_factories: Dict[str, AgentFactory[Agent]] = {}
+        self._agent_lifecycle = AgentLifecycleManager(
+            max_resident_agents=max_resident_agents, idle_timeout=agent_idle_timeout, state_store=agent_state_store
+        )
         self._known_namespaces: set[str] = set()
-        self._read_task: None | Task[None] = None
+        # Agents that handled a message since the last checkpoint.
+        self._changed_agents: Set[AgentId] = set()
+        self._restore_checkpoints = restore_checkpoints
+        self._num_channels = num_channels
+        self._max_batch_size = max_batch_size
+        self._read_tasks: List[Task[None]] = []
         self._running = False
         self._pending_requests: Dict[str, Future[Any]] = {}
+        self._request_deadlines: Dict[str, float] = {}
+        # The connection on which each pending request was sent, to cancel it on the same stream.
+        self._request_connections: Dict[str, HostConnection] = {}
+        self._request_timeout = request_timeout
+        self._reap_interval = reap_interval
+        self._reap_task: Task[None] | None = None
+        # The cancellation tokens of the requests being handled, by request id.
+        self._request_cancellation_tokens: Dict[str, CancellationToken] = {}
+        self._replay_buffer_size = replay_buffer_size
+        self._reconnect_backoff = reconnect_backoff
+        self._max_queue_size = max_queue_size
+        self._queue_full_policy: QueueFullPolicy = queue_full_policy
+        # Credits for the received requests and events that are being handled.
+        self._receive_credits = asyncio.Semaphore(max_queue_size) if max_queue_size > 0 else None
+        # The agent types and subscriptions that the host confirmed, to register again after reconnecting.
+        self._registered_agent_types: List[str] = []
+        self._registered_subscriptions: List[TypeSubscription] = []
+        # Ids of the requests and events sent by this runtime, and the ids of those recently received,
+        # so that messages sent again after reconnecting are handled once.
+        self._message_id_prefix = uuid.uuid4().hex
+        self._next_message_id = 0
+        self._recent_requests: OrderedDict[str, agent_worker_pb2.RpcResponse | List[Tuple[str, HostConnection]]] = (
+            OrderedDict()
+        )
+        self._recent_events: OrderedDict[Tuple[str, Tuple[Tuple[str, str], ...]], None] = OrderedDict()
         self._pending_requests_lock = asyncio.Lock()
         self._next_request_id = 0
-        self._host_connection: HostConnection | None = None
+        self._host_connections: List[HostConnection] = []
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(
+            max_cached_topics=max_cached_topics, cached_topic_ttl=cached_topic_ttl
+        )
         self._serialization_registry = SerializationRegistry()
+        self._data_content_types = list(data_content_types)
+        self._per_agent_type_data_content_types: Dict[str, List[str]] = {}
+        # The content types that the agents of each type accept, as announced by the host, and those that all of them accept.
+        self._accepted_data_content_types: Dict[str, List[str]] = {}
+        self._commonly_accepted_data_content_types: List[str] | None = None
+        self._blobs = BlobCache(blob_store, blob_cache_size) if blob_store is not None else None
+        self._blob_threshold = blob_threshold
+        self._blob_ttl = blob_ttl
+        self._blob_deletions: Set[asyncio.TimerHandle] = set()
         self._extra_grpc_config = extra_grpc_config or []
 
     def start(self) -> None:
@@ -197,12 +540,33 @@ def start(self) -> None:
         if self._running:
             raise ValueError("Runtime is already running.")
         logger.info(f"Connecting to host: {self._host_address}")
-        self._host_connection = HostConnection.from_host_address(
-            self._host_address, extra_grpc_config=self._extra_grpc_config
-        )
+        extra_grpc_config = self._extra_grpc_config
+        metadata: List[Tuple[str, str]] = []
+        if self._num_channels > 1:
+            # Do not share connections between the channels, and tell the host that the streams belong to one worker.
+            extra_grpc_config = [*extra_grpc_config, ("grpc.use_local_subchannel_pool", 1)]
+            metadata.append((WORKER_ID_METADATA_KEY, self._message_id_prefix))
+        self._host_connections = [
+            HostConnection.from_host_address(
+                self._host_address,
+                extra_grpc_config=extra_grpc_config,
+                replay_buffer_size=self._replay_buffer_size,
+                reconnect_backoff=self._reconnect_backoff,
+                on_reconnect=self._get_reconnect_messages,
+                max_queue_size=self._max_queue_size,
+                queue_full_policy=self._queue_full_policy,
+                on_drop=self._on_message_dropped,
+                metadata=metadata,
+                max_batch_size=self._max_batch_size,
+            )
+            for _ in range(self._num_channels)
+        ]
         logger.info("Connection established")
-        if self._read_task is None:
-            self._read_task = asyncio.create_task(self._run_read_loop())
+        if not self._read_tasks:
+            self._read_tasks = [
+                asyncio.create_task(self._run_read_loop(connection)) for connection in self._host_connections
+            ]
+        self._reap_task = asyncio.create_task(self._reap_expired_requests())
         self._running = True
 
     def _raise_on_exception(self, task: Task[Any]) -> None:
@@ -210,31 +574,45 @@ def _raise_on_exception(self, task: Task[Any]) -> None:
         if exception is not None:
             raise exception
 
-    async def _run_read_loop(self) -> None:
+    def _get_host_connection(self, recipient: AgentId | TopicId | None = None) -> HostConnection:
+        """Get the connection for the messages to a recipient, so that the messages to the same recipient keep their order."""
+        if not self._host_connections:
+            raise RuntimeError("Host connection is not set.")
+        if recipient is None or len(self._host_connections) == 1:
+            return self._host_connections[0]
+        return self._host_connections[hash(recipient) % len(self._host_connections)]
+
+    async def _run_read_loop(self, connection: HostConnection) -> None:
         logger.info("Starting read loop")
-        # TODO: catch exceptions and reconnect
         while self._running:
             try:
-                message = await self._host_connection.recv()  # type: ignore
+                message = await connection.recv()
+                if self._receive_credits is not None and is_flow_controlled(message):
+                    # Stop reading while too many received messages wait for their handlers to start.
+                    await self._receive_credits.acquire()
                 oneofcase = agent_worker_pb2.Message.WhichOneof(message, "message")
                 match oneofcase:
                     case "registerAgentTypeRequest" | "addSubscriptionRequest":
                         logger.warning(f"Cant handle {oneofcase}, skipping.")
                     case "request":
-                        task = asyncio.create_task(self._process_request(message.request))
+                        release_credit = self._new_receive_credit_release()
+                        task = asyncio.create_task(self._process_request(message.request, connection, release_credit))
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                        task.add_done_callback(release_credit)
                     case "response":
                         task = asyncio.create_task(self._process_response(message.response))
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
                     case "event":
-                        task = asyncio.create_task(self._process_event(message.event))
+                        release_credit = self._new_receive_credit_release()
+                        task = asyncio.create_task(self._process_event(message.event, release_credit))
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                        task.add_done_callback(release_credit)
                     case "registerAgentTypeResponse":
                         task = asyncio.create_task(
                             self._process_register_agent_type_response(message.registerAgentTypeResponse)
@@ -249,6 +627,10 @@ async def _run_read_loop(self) -> None:
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                    case "cancel":
+                        self._process_cancel(message.cancel)
+                    case "agentTypeContentTypes":
+                        self._process_agent_type_content_types(message.agentTypeContentTypes)
                     case None:
                         logger.warning("No message")
                     case other:
@@ -256,27 +638,52 @@ async def _run_read_loop(self) -> None:
             except Exception as e:
                 logger.error("Error in read loop", exc_info=e)
 
+    def _new_receive_credit_release(self) -> Callable[..., None]:
+        """Get a function that returns the credit of a received request or event, once. The credit is returned when the handlers
+        of the message start, so that a handler can wait for the messages it sends to this worker, or when the handling ends early."""
+        credits = self._receive_credits
+        released = credits is None
+
+        def release(*_: Any) -> None:
+            nonlocal released
+            if not released:
+                released = True
+                assert credits is not None
+                credits.release()
+
+        return release
+
     async def stop(self) -> None:
         """Stop the runtime immediately."""
         if not self._running:
             raise RuntimeError("Runtime is not running.")
         self._running = False
+        if self._reap_task is not None:
+            self._reap_task.cancel()
+            try:
+                await self._reap_task
+            except asyncio.CancelledError:
+                pass
+            self._reap_task = None
+        for handle in self._blob_deletions:
+            handle.cancel()
+        self._blob_deletions.clear()
         # Wait for all background tasks to finish.
         final_tasks_results = await asyncio.gather(*self._background_tasks, return_exceptions=True)
         for task_result in final_tasks_results:
             if isinstance(task_result, Exception):
                 logger.error("Error in background task", exc_info=task_result)
-        # Close the host connection.
-        if self._host_connection is not None:
+        # Close the host connections.
+        for connection in self._host_connections:
             try:
-                await self._host_connection.close()
+                await connection.close()
             except asyncio.CancelledError:
                 pass
-        # Cancel the read task.
-        if self._read_task is not None:
-            self._read_task.cancel()
+        # Cancel the read tasks.
+        for read_task in self._read_tasks:
+            read_task.cancel()
             try:
-                await self._read_task
+                await read_task
             except asyncio.CancelledError:
                 pass
 
@@ -298,6 +705,27 @@ def signal_handler() -> None:
         # Stop the runtime.
         await self.stop()
 
+    @property
+    def agent_lifecycle_metrics(self) -> AgentLifecycleMetrics:
+        """The number of resident agent instances and the number of passivated and rehydrated agents."""
+        return self._agent_lifecycle.metrics
+
+    @property
+    def send_queue_metrics(self) -> QueueMetrics:
+        """The depth of the queue of messages to send to the host, and the number of senders waiting for space
+        and of messages dropped or rejected because the queue was full. Summed over the streams to the host."""
+        if not self._host_connections:
+            raise RuntimeError("Host connection is not set.")
+        return sum_queue_metrics(connection.send_queue_metrics for connection in self._host_connections)
+
+    @property
+    def receive_queue_metrics(self) -> QueueMetrics:
+        """The depth of the queue of messages received from the host that are waiting to be handled.
+        Summed over the streams to the host."""
+        if not self._host_connections:
+            raise RuntimeError("Host connection is not set.")
+        return sum_queue_metrics(connection.receive_queue_metrics for connection in self._host_connections)
+
     @property
     def _known_agent_names(self) -> Set[str]:
         return set(self._agent_factories.keys())
@@ -308,11 +736,11 @@ async def _send_message(
         send_type: Literal["send", "publish"],
         recipient: AgentId | TopicId,
         telemetry_metadata: Mapping[str, str],
-    ) -> None:
-        if self._host_connection is None:
-            raise RuntimeError("Host connection is not set.")
+        retain: bool = False,
+    ) -> int:
+        connection = self._get_host_connection(recipient)
         with self._trace_helper.trace_block(send_type, recipient, parent=telemetry_metadata):
-            await self._host_connection.send(runtime_message)
+            return await connection.send(runtime_message, retain=retain)
 
     async def send_message(
         self,
@@ -321,11 +749,28 @@ async def send_message(
         *,
         sender: AgentId | None = None,
         cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
     ) -> Any:
+        """Send a message to an agent and wait for the response.
+
+        Cancelling the cancellation token, or the task that waits for the response, cancels the request at the target worker.
+
+        Args:
+            message (Any): The message to send.
+            recipient (AgentId): The agent to send the message to.
+            sender (AgentId | None, optional): The agent sending the message. Defaults to None.
+            cancellation_token (CancellationToken | None, optional): A token to cancel the request with. Defaults to None.
+            timeout (float | None, optional): The number of seconds to wait for the response. If None, the `request_timeout` of the runtime is used. Defaults to None.
+
+        Raises:
+            TimeoutError: If the response does not arrive in time.
+            MessageDroppedException: If the request is dropped or rejected because the send queue is full.
+        """
         if not self._running:
             raise ValueError("Runtime must be running when sending message.")
-        if self._host_connection is None:
-            raise RuntimeError("Host connection is not set.")
+        if timeout is None:
+            timeout = self._request_timeout
+        connection = self._get_host_connection(recipient)
         data_type = self._serialization_registry.type_name(message)
         with self._trace_helper.trace_block(
             "create", recipient, parent=None, extraAttributes={"message_type": data_type}
@@ -334,8 +779,9 @@ async def send_message(
             future = asyncio.get_event_loop().create_future()
             request_id = await self._get_new_request_id()
             self._pending_requests[request_id] = future
+            data_content_type = self._select_data_content_type(data_type, recipient.type)
             serialized_message = self._serialization_registry.serialize(
-                message, type_name=data_type, data_content_type=JSON_DATA_CONTENT_TYPE
+                message, type_name=data_type, data_content_type=data_content_type
             )
             telemetry_metadata = get_telemetry_grpc_metadata()
             runtime_message = agent_worker_pb2.Message(
@@ -344,20 +790,72 @@ async def send_message(
                     target=agent_worker_pb2.AgentId(type=recipient.type, key=recipient.key),
                     source=agent_worker_pb2.AgentId(type=sender.type, key=sender.key) if sender is not None else None,
                     metadata=telemetry_metadata,
-                    payload=agent_worker_pb2.Payload(
-                        data_type=data_type,
-                        data=serialized_message,
-                        data_content_type=JSON_DATA_CONTENT_TYPE,
-                    ),
+                    payload=await self._make_payload(data_type, data_content_type, serialized_message),
+                    timeout=timeout,
+                    message_id=self._new_message_id(),
                 )
             )
+            if timeout is not None:
+                self._request_deadlines[request_id] = asyncio.get_running_loop().time() + timeout
+            if cancellation_token is not None:
+                cancellation_token.link_future(future)
 
-            # TODO: Find a way to handle timeouts/errors
-            task = asyncio.create_task(self._send_message(runtime_message, "send", recipient, telemetry_metadata))
-            self._background_tasks.add(task)
-            task.add_done_callback(self._raise_on_exception)
-            task.add_done_callback(self._background_tasks.discard)
-            return await future
+            # The request is kept until it is answered, to send it again if the host restarts in the meantime.
+            self._request_connections[request_id] = connection
+            try:
+                sequence = await self._send_message(runtime_message, "send", recipient, telemetry_metadata, retain=True)
+            except BaseException:
+                self._pending_requests.pop(request_id, None)
+                self._request_deadlines.pop(request_id, None)
+                self._request_connections.pop(request_id, None)
+                self._delete_blob(runtime_message.request.payload.data_ref)
+                raise
+            try:
+                return await future
+            except asyncio.CancelledError:
+                if self._pending_requests.pop(request_id, None) is not None:
+                    # Tell the host and the target that the response is no longer awaited.
+                    self._send_cancel(request_id)
+                raise
+            finally:
+                self._request_deadlines.pop(request_id, None)
+                self._request_connections.pop(request_id, None)
+                connection.release(sequence)
+                # The recipient got the payload before answering, and the request is not sent again.
+                self._delete_blob(runtime_message.request.payload.data_ref)
+
+    def _send_cancel(self, request_id: str) -> None:
+        # Cancel the request on the stream that it was sent on, where the host knows it.
+        connection = self._request_connections.get(request_id)
+        if connection is None:
+            return
+        task = asyncio.create_task(
+            connection.send(agent_worker_pb2.Message(cancel=agent_worker_pb2.RpcCancel(request_id=request_id)))
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._raise_on_exception)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _on_message_dropped(self, message: agent_worker_pb2.Message) -> None:
+        oneofcase = message.WhichOneof("message")
+        logger.warning("Dropped %s message because the send queue is full.", oneofcase)
+        if oneofcase == "request":
+            future = self._pending_requests.pop(message.request.request_id, None)
+            if future is not None and not future.done():
+                future.set_exception(MessageDroppedException("The request was dropped because the send queue is full."))
+
+    async def _reap_expired_requests(self) -> None:
+        while True:
+            await asyncio.sleep(self._reap_interval)
+            now = asyncio.get_running_loop().time()
+            expired = [request_id for request_id, deadline in self._request_deadlines.items() if deadline <= now]
+            for request_id in expired:
+                del self._request_deadlines[request_id]
+                future = self._pending_requests.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                future.set_exception(TimeoutError(f"Request {request_id} timed out."))
+                self._send_cancel(request_id)
 
     async def publish_message(
         self,
@@ -369,14 +867,13 @@ async def publish_message(
     ) -> None:
         if not self._running:
             raise ValueError("Runtime must be running when publishing message.")
-        if self._host_connection is None:
-            raise RuntimeError("Host connection is not set.")
         message_type = self._serialization_registry.type_name(message)
         with self._trace_helper.trace_block(
             "create", topic_id, parent=None, extraAttributes={"message_type": message_type}
         ):
+            data_content_type = self._select_data_content_type(message_type, None)
             serialized_message = self._serialization_registry.serialize(
-                message, type_name=message_type, data_content_type=JSON_DATA_CONTENT_TYPE
+                message, type_name=message_type, data_content_type=data_content_type
             )
             telemetry_metadata = get_telemetry_grpc_metadata()
             runtime_message = agent_worker_pb2.Message(
@@ -385,68 +882,195 @@ async def publish_message(
                     topic_source=topic_id.source,
                     source=agent_worker_pb2.AgentId(type=sender.type, key=sender.key) if sender is not None else None,
                     metadata=telemetry_metadata,
-                    payload=agent_worker_pb2.Payload(
-                        data_type=message_type,
-                        data=serialized_message,
-                        data_content_type=JSON_DATA_CONTENT_TYPE,
-                    ),
+                    payload=await self._make_payload(message_type, data_content_type, serialized_message),
+                    message_id=self._new_message_id(),
                 )
             )
 
-            task = asyncio.create_task(self._send_message(runtime_message, "publish", topic_id, telemetry_metadata))
-            self._background_tasks.add(task)
-            task.add_done_callback(self._raise_on_exception)
-            task.add_done_callback(self._background_tasks.discard)
+            # Wait for the event to be queued, so that a full send queue slows down the publisher.
+            try:
+                await self._send_message(runtime_message, "publish", topic_id, telemetry_metadata)
+            except BaseException:
+                self._delete_blob(runtime_message.event.payload.data_ref)
+                raise
+            # The number of recipients is not known, so the blob is kept for them to fetch for a while.
+            self._delete_blob(runtime_message.event.payload.data_ref, delay=self._blob_ttl)
 
     async def save_state(self) -> Mapping[str, Any]:
-        raise NotImplementedError("Saving state is not yet implemented.")
+        # The agents are not looked up one by one, which would evict the others and rehydrate them in turn.
+        return {
+            str(agent_id): dict(agent_state)
+            for agent_id, agent_state in (await self._agent_lifecycle.save_states()).items()
+        }
 
     async def load_state(self, state: Mapping[str, Any]) -> None:
-        raise NotImplementedError("Loading state is not yet implemented.")
+        for agent_id_str in state:
+            agent_id = AgentId.from_str(agent_id_str)
+            if agent_id.type in self._agent_factories:
+                await self.agent_load_state(agent_id, state[agent_id_str])
+
+    async def checkpoint(self) -> int:
+        """Save the state of the agents that handled a message since the last checkpoint at the host, which writes them to its
+        agent state store. Agents that did not change are not saved again, so a checkpoint of a large number of agents
+        only costs as much as the agents that were in use. The states are saved concurrently and the host writes them in batches.
+
+        Returns:
+            int: The number of agents whose state was saved.
+
+        Raises:
+            RuntimeError: If the state of an agent could not be saved. The agents that were not saved are saved by the next checkpoint.
+        """
+        if not self._host_connections:
+            raise RuntimeError("Host connection is not set.")
+        changed, self._changed_agents = self._changed_agents, set()
+        states: Dict[AgentId, Mapping[str, Any]] = {}
+        for agent_id in changed:
+            state = await self._agent_lifecycle.save_state(agent_id)
+            if state is not None:
+                states[agent_id] = state
+        results = await asyncio.gather(
+            *(self._save_checkpoint(agent_id, state) for agent_id, state in states.items()), return_exceptions=True
+        )
+        errors: List[BaseException] = []
+        for agent_id, result in zip(states, results, strict=True):
+            if isinstance(result, BaseException):
+                self._changed_agents.add(agent_id)
+                errors.append(result)
+        if errors:
+            raise RuntimeError(f"Failed to save the state of {len(errors)} agents.") from errors[0]
+        return len(states)
+
+    async def _save_checkpoint(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        response = await self._get_host_connection(agent_id).save_state(
+            agent_worker_pb2.AgentState(
+                agent_id=agent_worker_pb2.AgentId(type=agent_id.type, key=agent_id.key), text_data=json.dumps(state)
+            )
+        )
+        if not response.success:
+            raise RuntimeError(response.error)
+
+    async def _load_checkpoint(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        response = await self._get_host_connection(agent_id).get_state(
+            agent_worker_pb2.AgentId(type=agent_id.type, key=agent_id.key)
+        )
+        if not response.success:
+            return None
+        return json.loads(response.agent_state.text_data)  # type: ignore[no-any-return]
 
     async def agent_metadata(self, agent: AgentId) -> AgentMetadata:
         raise NotImplementedError("Agent metadata is not yet implemented.")
 
     async def agent_save_state(self, agent: AgentId) -> Mapping[str, Any]:
-        raise NotImplementedError("Agent save_state is not yet implemented.")
+        return (await self._get_agent(agent)).save_state()
 
     async def agent_load_state(self, agent: AgentId, state: Mapping[str, Any]) -> None:
-        raise NotImplementedError("Agent load_state is not yet implemented.")
+        (await self._get_agent(agent)).load_state(state)
+        self._changed_agents.add(agent)
+
+    def _new_message_id(self) -> str:
+        self._next_message_id += 1
+        return f"{self._message_id_prefix}-{self._next_message_id}"
 
     async def _get_new_request_id(self) -> str:
         async with self._pending_requests_lock:
             self._next_request_id += 1
             return str(self._next_request_id)
 
-    async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
-        assert self._host_connection is not None
+    async def _make_payload(self, data_type: str, data_content_type: str, data: bytes) -> agent_worker_pb2.Payload:
+        if self._blobs is not None and len(data) >= self._blob_threshold:
+            ref = await self._blobs.put(data)
+            return agent_worker_pb2.Payload(data_type=data_type, data_content_type=data_content_type, data_ref=ref)
+        return agent_worker_pb2.Payload(data_type=data_type, data_content_type=data_content_type, data=data)
+
+    def _delete_blob(self, ref: str, delay: float = 0) -> None:
+        """Delete the blob of a payload in the background, after `delay` seconds. Does nothing for payloads that are sent inline."""
+        if not ref or self._blobs is None:
+            return
+        if delay > 0:
+
+            def delete() -> None:
+                self._blob_deletions.discard(handle)
+                self._delete_blob(ref)
+
+            handle = asyncio.get_running_loop().call_later(delay, delete)
+            self._blob_deletions.add(handle)
+            return
+        task = asyncio.create_task(self._delete_blob_now(self._blobs, ref))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    @staticmethod
+    async def _delete_blob_now(blobs: BlobCache, ref: str) -> None:
+        try:
+            await blobs.delete(ref)
+        except Exception:
+            logger.warning("Failed to delete blob %s.", ref, exc_info=True)
+
+    async def _deserialize_payload(self, payload: agent_worker_pb2.Payload) -> Any:
+        data = payload.data
+        if payload.data_ref:
+            if self._blobs is None:
+                raise RuntimeError(f"Received a payload in blob {payload.data_ref}, but the runtime has no blob store.")
+            try:
+                data = await self._blobs.get(payload.data_ref)
+            except KeyError as e:
+                raise LookupError(f"Blob {payload.data_ref} of the payload is not in the blob store.") from e
+        return self._serialization_registry.deserialize(
+            data, type_name=payload.data_type, data_content_type=payload.data_content_type
+        )
+
+    async def _process_request(
+        self, request: agent_worker_pb2.RpcRequest, connection: HostConnection, release_credit: Callable[..., None]
+    ) -> None:
         recipient = AgentId(request.target.type, request.target.key)
         sender: AgentId | None = None
         if request.HasField("source"):
             sender = AgentId(request.source.type, request.source.key)
-            logging.info(f"Processing request from {sender} to {recipient}")
+            logger.info("Processing request from %s to %s", sender, recipient)
         else:
-            logging.info(f"Processing request from unknown source to {recipient}")
-
-        # Deserialize the message.
-        message = self._serialization_registry.deserialize(
-            request.payload.data,
-            type_name=request.payload.data_type,
-            data_content_type=request.payload.data_content_type,
-        )
+            logger.info("Processing request from unknown source to %s", recipient)
+
+        if request.message_id:
+            recent = self._recent_requests.get(request.message_id)
+            if isinstance(recent, list):
+                # The request was sent again while it is being handled, so answer both deliveries when it is done.
+                recent.append((request.request_id, connection))
+                return
+            if recent is not None:
+                # The request was sent again after it was answered, so send the same response.
+                await self._send_response(recent, request.request_id, connection)
+                return
+            self._recent_requests[request.message_id] = []
+            while len(self._recent_requests) > MAX_RECENT_REQUESTS:
+                self._recent_requests.popitem(last=False)
+
+        # Deserialize the message and get the receiving agent. The sender waits for a response even if this fails.
+        try:
+            message = await self._deserialize_payload(request.payload)
+            rec_agent = await self._get_agent(recipient)
+        except Exception as e:
+            logger.error("Failed to deliver request %s to %s.", request.request_id, recipient, exc_info=e)
+            await self._complete_request(
+                request,
+                agent_worker_pb2.RpcResponse(error=str(e), metadata=get_telemetry_grpc_metadata()),
+                connection,
+            )
+            return
 
-        # Get the receiving agent and prepare the message context.
-        rec_agent = await self._get_agent(recipient)
+        # Prepare the message context.
+        cancellation_token = CancellationToken()
         message_context = MessageContext(
             sender=sender,
             topic_id=None,
             is_rpc=True,
-            cancellation_token=CancellationToken(),
+            cancellation_token=cancellation_token,
         )
 
-        # Call the receiving agent.
+        # Call the receiving agent. The call is cancelled when the sender cancels the request or its timeout passes.
+        release_credit()
+        self._request_cancellation_tokens[request.request_id] = cancellation_token
         try:
-            with MessageHandlerContext.populate_context(rec_agent.id):
+            with self._handling(recipient), MessageHandlerContext.populate_context(rec_agent.id):
                 with self._trace_helper.trace_block(
                     "process",
                     rec_agent.id,
@@ -454,40 +1078,84 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
                     attributes={"request_id": request.request_id},
                     extraAttributes={"message_type": request.payload.data_type},
                 ):
-                    result = await rec_agent.on_message(message, ctx=message_context)
+                    future = cancellation_token.link_future(
+                        asyncio.ensure_future(rec_agent.on_message(message, ctx=message_context))
+                    )
+                    if request.HasField("timeout"):
+                        timeout_handle = asyncio.get_running_loop().call_later(
+                            request.timeout, cancellation_token.cancel
+                        )
+                        try:
+                            result = await future
+                        finally:
+                            timeout_handle.cancel()
+                    else:
+                        result = await future
         except BaseException as e:
-            response_message = agent_worker_pb2.Message(
-                response=agent_worker_pb2.RpcResponse(
-                    request_id=request.request_id,
-                    error=str(e),
-                    metadata=get_telemetry_grpc_metadata(),
-                ),
-            )
+            if cancellation_token.is_cancelled():
+                # The sender no longer waits for the response.
+                logger.info("Request %s to %s was cancelled.", request.request_id, recipient)
+                self._recent_requests.pop(request.message_id, None)
+                return
             # Send the error response.
-            await self._host_connection.send(response_message)
+            await self._complete_request(
+                request,
+                agent_worker_pb2.RpcResponse(error=str(e), metadata=get_telemetry_grpc_metadata()),
+                connection,
+            )
             return
+        finally:
+            del self._request_cancellation_tokens[request.request_id]
 
-        # Serialize the result.
+        # Serialize the result, preferably with the content type of the request.
         result_type = self._serialization_registry.type_name(result)
+        data_content_type = self._serialization_registry.select_data_content_type(
+            result_type,
+            [request.payload.data_content_type, *self._get_data_content_types(sender.type if sender else None)],
+        )
         serialized_result = self._serialization_registry.serialize(
-            result, type_name=result_type, data_content_type=JSON_DATA_CONTENT_TYPE
+            result, type_name=result_type, data_content_type=data_content_type
         )
 
-        # Create the response message.
-        response_message = agent_worker_pb2.Message(
-            response=agent_worker_pb2.RpcResponse(
-                request_id=request.request_id,
-                payload=agent_worker_pb2.Payload(
-                    data_type=result_type,
-                    data=serialized_result,
-                    data_content_type=JSON_DATA_CONTENT_TYPE,
-                ),
-                metadata=get_telemetry_grpc_metadata(),
-            )
+        # Create and send the response.
+        response = agent_worker_pb2.RpcResponse(
+            payload=await self._make_payload(result_type, data_content_type, serialized_result),
+            metadata=get_telemetry_grpc_metadata(),
         )
+        await self._complete_request(request, response, connection)
+
+    async def _complete_request(
+        self, request: agent_worker_pb2.RpcRequest, response: agent_worker_pb2.RpcResponse, connection: HostConnection
+    ) -> None:
+        # The response goes back on the stream that the request came in on, where the host waits for it.
+        await self._send_response(response, request.request_id, connection)
+        if not request.message_id:
+            return
+        # Answer the deliveries of the request that arrived while it was handled, and keep the response for later ones.
+        waiting = self._recent_requests.get(request.message_id)
+        self._recent_requests[request.message_id] = response
+        if isinstance(waiting, list):
+            for request_id, waiting_connection in waiting:
+                await self._send_response(response, request_id, waiting_connection)
+
+    async def _send_response(
+        self, response: agent_worker_pb2.RpcResponse, request_id: str, connection: HostConnection
+    ) -> None:
+        response_message = agent_worker_pb2.Message(response=response)
+        response_message.response.request_id = request_id
+        await connection.send(response_message)
 
-        # Send the response.
-        await self._host_connection.send(response_message)
+    def _process_agent_type_content_types(self, content_types: agent_worker_pb2.AgentTypeContentTypes) -> None:
+        if content_types.data_content_types:
+            self._accepted_data_content_types[content_types.type] = list(content_types.data_content_types)
+        else:
+            self._accepted_data_content_types.pop(content_types.type, None)
+        self._commonly_accepted_data_content_types = None
+
+    def _process_cancel(self, cancel: agent_worker_pb2.RpcCancel) -> None:
+        cancellation_token = self._request_cancellation_tokens.get(cancel.request_id)
+        if cancellation_token is not None:
+            cancellation_token.cancel()
 
     async def _process_response(self, response: agent_worker_pb2.RpcResponse) -> None:
         with self._trace_helper.trace_block(
@@ -497,29 +1165,49 @@ async def _process_response(self, response: agent_worker_pb2.RpcResponse) -> Non
             attributes={"request_id": response.request_id},
             extraAttributes={"message_type": response.payload.data_type},
         ):
-            # Deserialize the result.
-            result = self._serialization_registry.deserialize(
-                response.payload.data,
-                type_name=response.payload.data_type,
-                data_content_type=response.payload.data_content_type,
-            )
-            # Get the future and set the result.
-            future = self._pending_requests.pop(response.request_id)
+            # Get the future, unless the request was cancelled or timed out.
+            future = self._pending_requests.pop(response.request_id, None)
+            if future is None:
+                logger.info("Ignoring the response to request %s, which is no longer awaited.", response.request_id)
+                self._delete_blob(response.payload.data_ref)
+                return
+            if response.timed_out:
+                # The host gave up on the request before this worker did.
+                future.set_exception(TimeoutError(f"Request {response.request_id} timed out."))
+                return
             if len(response.error) > 0:
                 future.set_exception(Exception(response.error))
-            else:
-                future.set_result(result)
-
-    async def _process_event(self, event: agent_worker_pb2.Event) -> None:
-        message = self._serialization_registry.deserialize(
-            event.payload.data, type_name=event.payload.data_type, data_content_type=event.payload.data_content_type
-        )
+                return
+            # Deserialize the result and set it. The response has a single recipient, so its blob is no longer needed.
+            try:
+                future.set_result(await self._deserialize_payload(response.payload))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._delete_blob(response.payload.data_ref)
+
+    async def _process_event(self, event: agent_worker_pb2.Event, release_credit: Callable[..., None]) -> None:
+        if event.message_id:
+            # The streams of this worker receive the same event for different recipients.
+            event_key = (event.message_id, tuple((recipient.type, recipient.key) for recipient in event.recipients))
+            if event_key in self._recent_events:
+                # The event was sent again after reconnecting.
+                return
+            self._recent_events[event_key] = None
+            while len(self._recent_events) > MAX_RECENT_EVENTS:
+                self._recent_events.popitem(last=False)
+        message = await self._deserialize_payload(event.payload)
         sender: AgentId | None = None
         if event.HasField("source"):
             sender = AgentId(event.source.type, event.source.key)
         topic_id = TopicId(event.topic_type, event.topic_source)
-        # Get the recipients for the topic.
-        recipients = await self._subscription_manager.get_subscribed_recipients(topic_id)
+        # Get the recipients for the topic. If the host chose the recipients, because other workers
+        # host the other agents of a shared agent type, only those are delivered to.
+        recipients: Sequence[AgentId]
+        if event.recipients:
+            recipients = [AgentId(recipient.type, recipient.key) for recipient in event.recipients]
+        else:
+            recipients = await self._subscription_manager.get_subscribed_recipients(topic_id)
         # Send the message to each recipient.
         responses: List[Awaitable[Any]] = []
         for agent_id in recipients:
@@ -531,10 +1219,13 @@ async def _process_event(self, event: agent_worker_pb2.Event) -> None:
                 is_rpc=False,
                 cancellation_token=CancellationToken(),
             )
-            agent = await self._get_agent(agent_id)
-            with MessageHandlerContext.populate_context(agent.id):
 
-                async def send_message(agent: Agent, message_context: MessageContext) -> Any:
+            async def send_message(agent_id: AgentId, message_context: MessageContext) -> Any:
+                # Look up the agent right before handling the message, so that it cannot be
+                # passivated while the other recipients are being created.
+                agent = await self._get_agent(agent_id)
+                release_credit()
+                with self._handling(agent_id), MessageHandlerContext.populate_context(agent.id):
                     with self._trace_helper.trace_block(
                         "process",
                         agent.id,
@@ -543,7 +1234,7 @@ async def send_message(agent: Agent, message_context: MessageContext) -> Any:
                     ):
                         await agent.on_message(message, ctx=message_context)
 
-                future = send_message(agent, message_context)
+            future = send_message(agent_id, message_context)
             responses.append(future)
         # Wait for all responses.
         try:
@@ -564,24 +1255,17 @@ async def register(
     ) -> AgentType:
         if type in self._agent_factories:
             raise ValueError(f"Agent with type {type} already exists.")
-        self._agent_factories[type] = agent_factory
-
-        if self._host_connection is None:
-            raise RuntimeError("Host connection is not set.")
-
-        # Create a future for the registration response.
-        future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
-        self._pending_requests[request_id] = future
+        self._agent_factories[type] = AgentFactory(agent_factory)
 
-        # Send the registration request message to the host.
-        message = agent_worker_pb2.Message(
-            registerAgentTypeRequest=agent_worker_pb2.RegisterAgentTypeRequest(request_id=request_id, type=type)
+        # Send the registration request message to the host, and wait for the registration response.
+        await self._send_to_all_host_connections(
+            lambda request_id: agent_worker_pb2.Message(
+                registerAgentTypeRequest=agent_worker_pb2.RegisterAgentTypeRequest(
+                    request_id=request_id, type=type, data_content_types=self._data_content_types
+                )
+            )
         )
-        await self._host_connection.send(message)
-
-        # Wait for the registration response.
-        await future
+        self._registered_agent_types.append(type)
 
         if subscriptions is not None:
             if callable(subscriptions):
@@ -608,7 +1292,7 @@ async def register_factory(
     ) -> AgentType:
         if type.type in self._agent_factories:
             raise ValueError(f"Agent with type {type} already exists.")
-        if self._host_connection is None:
+        if not self._host_connections:
             raise RuntimeError("Host connection is not set.")
 
         async def factory_wrapper() -> T:
@@ -623,66 +1307,104 @@ async def factory_wrapper() -> T:
 
             return agent_instance
 
-        self._agent_factories[type.type] = factory_wrapper
+        self._agent_factories[type.type] = AgentFactory(factory_wrapper)
 
-        # Create a future for the registration response.
-        future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
-        self._pending_requests[request_id] = future
-
-        # Send the registration request message to the host.
-        message = agent_worker_pb2.Message(
-            registerAgentTypeRequest=agent_worker_pb2.RegisterAgentTypeRequest(request_id=request_id, type=type.type)
+        # Send the registration request message to the host, and wait for the registration response.
+        await self._send_to_all_host_connections(
+            lambda request_id: agent_worker_pb2.Message(
+                registerAgentTypeRequest=agent_worker_pb2.RegisterAgentTypeRequest(
+                    request_id=request_id, type=type.type, data_content_types=self._data_content_types
+                )
+            )
         )
-        await self._host_connection.send(message)
-
-        # Wait for the registration response.
-        await future
+        self._registered_agent_types.append(type.type)
 
         return type
 
+    async def _send_to_all_host_connections(self, make_message: Callable[[str], agent_worker_pb2.Message]) -> None:
+        """Send a registration or subscription request on every stream to the host, as the host routes messages
+        to the streams that registered, and wait for the responses. The requests are kept until they are answered."""
+        if not self._host_connections:
+            raise RuntimeError("Host connection is not set.")
+        futures: List[Future[Any]] = []
+        sent: List[Tuple[HostConnection, int]] = []
+        try:
+            for connection in self._host_connections:
+                future = asyncio.get_event_loop().create_future()
+                request_id = await self._get_new_request_id()
+                self._pending_requests[request_id] = future
+                futures.append(future)
+                sent.append((connection, await connection.send(make_message(request_id), retain=True)))
+            for result in await asyncio.gather(*futures, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    raise result
+        finally:
+            for connection, sequence in sent:
+                connection.release(sequence)
+
+    async def _get_reconnect_messages(self) -> List[agent_worker_pb2.Message]:
+        # Register the agent types and add the subscriptions again, as the host forgets them when the connection is lost.
+        messages: List[agent_worker_pb2.Message] = []
+        for agent_type in self._registered_agent_types:
+            request = agent_worker_pb2.RegisterAgentTypeRequest(
+                request_id=await self._get_new_request_id(),
+                type=agent_type,
+                data_content_types=self._data_content_types,
+            )
+            messages.append(agent_worker_pb2.Message(registerAgentTypeRequest=request))
+        for subscription in self._registered_subscriptions:
+            messages.append(
+                agent_worker_pb2.Message(
+                    addSubscriptionRequest=agent_worker_pb2.AddSubscriptionRequest(
+                        request_id=await self._get_new_request_id(),
+                        subscription=agent_worker_pb2.Subscription(
+                            typeSubscription=agent_worker_pb2.TypeSubscription(
+                                topic_type=subscription.topic_type, agent_type=subscription.agent_type
+                            )
+                        ),
+                    )
+                )
+            )
+        return messages
+
     async def _process_register_agent_type_response(self, response: agent_worker_pb2.RegisterAgentTypeResponse) -> None:
-        future = self._pending_requests.pop(response.request_id)
+        future = self._pending_requests.pop(response.request_id, None)
+        if future is None:
+            # The response to registering an agent type again after reconnecting.
+            if response.HasField("error"):
+                logger.error("Failed to register an agent type again after reconnecting: %s", response.error)
+            return
         if response.HasField("error"):
             future.set_exception(RuntimeError(response.error))
         else:
             future.set_result(None)
 
-    async def _invoke_agent_factory(
-        self,
-        agent_factory: Callable[[], T | Awaitable[T]] | Callable[[AgentRuntime, AgentId], T | Awaitable[T]],
-        agent_id: AgentId,
-    ) -> T:
+    async def _invoke_agent_factory(self, agent_factory: AgentFactory[T], agent_id: AgentId) -> T:
         with AgentInstantiationContext.populate_context((self, agent_id)):
-            if len(inspect.signature(agent_factory).parameters) == 0:
-                factory_one = cast(Callable[[], T], agent_factory)
-                agent = factory_one()
-            elif len(inspect.signature(agent_factory).parameters) == 2:
-                warnings.warn(
-                    "Agent factories that take two arguments are deprecated. Use AgentInstantiationContext instead. Two arg factories will be removed in a future version.",
-                    stacklevel=2,
-                )
-                factory_two = cast(Callable[[AgentRuntime, AgentId], T], agent_factory)
-                agent = factory_two(self, agent_id)
-            else:
-                raise ValueError("Agent factory must take 0 or 2 arguments.")
-
-            if inspect.isawaitable(agent):
-                return cast(T, await agent)
-
-        return agent
+            return await agent_factory(self, agent_id)
 
     async def _get_agent(self, agent_id: AgentId) -> Agent:
-        if agent_id in self._instantiated_agents:
-            return self._instantiated_agents[agent_id]
-
         if agent_id.type not in self._agent_factories:
             raise ValueError(f"Agent with name {agent_id.type} not found.")
 
-        agent_factory = self._agent_factories[agent_id.type]
-        agent = await self._invoke_agent_factory(agent_factory, agent_id)
-        self._instantiated_agents[agent_id] = agent
-        return agent
+        async def create() -> Agent:
+            agent = await self._invoke_agent_factory(self._agent_factories[agent_id.type], agent_id)
+            if self._restore_checkpoints:
+                state = await self._load_checkpoint(agent_id)
+                if state is not None:
+                    agent.load_state(state)
+            return agent
+
+        return await self._agent_lifecycle.get_or_create(agent_id, create)
+
+    @contextmanager
+    def _handling(self, agent_id: AgentId) -> Iterator[None]:
+        """Mark an agent as in use while it handles a message, and as changed once it is done."""
+        with self._agent_lifecycle.active(agent_id):
+            try:
+                yield
+            finally:
+                self._changed_agents.add(agent_id)
 
     # TODO: uncomment out the following type ignore when this is fixed in mypy: https://github.com/python/mypy/issues/3737
     async def try_get_underlying_agent_instance(self, id: AgentId, type: Type[T] = Agent) -> T:  # type: ignore[assignment]
@@ -698,36 +1420,35 @@ async def try_get_underlying_agent_instance(self, id: AgentId, type: Type[T] = A
         return agent_instance
 
     async def add_subscription(self, subscription: Subscription) -> None:
-        if self._host_connection is None:
+        if not self._host_connections:
             raise RuntimeError("Host connection is not set.")
         if not isinstance(subscription, TypeSubscription):
             raise ValueError("Only TypeSubscription is supported.")
         # Add to local subscription manager.
         await self._subscription_manager.add_subscription(subscription)
 
-        # Create a future for the subscription response.
-        future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
-        self._pending_requests[request_id] = future
-
-        # Send the subscription to the host.
-        message = agent_worker_pb2.Message(
-            addSubscriptionRequest=agent_worker_pb2.AddSubscriptionRequest(
-                request_id=request_id,
-                subscription=agent_worker_pb2.Subscription(
-                    typeSubscription=agent_worker_pb2.TypeSubscription(
-                        topic_type=subscription.topic_type, agent_type=subscription.agent_type
-                    )
-                ),
+        # Send the subscription to the host, and wait for the subscription response.
+        await self._send_to_all_host_connections(
+            lambda request_id: agent_worker_pb2.Message(
+                addSubscriptionRequest=agent_worker_pb2.AddSubscriptionRequest(
+                    request_id=request_id,
+                    subscription=agent_worker_pb2.Subscription(
+                        typeSubscription=agent_worker_pb2.TypeSubscription(
+                            topic_type=subscription.topic_type, agent_type=subscription.agent_type
+                        )
+                    ),
+                )
             )
         )
-        await self._host_connection.send(message)
-
-        # Wait for the subscription response.
-        await future
+        self._registered_subscriptions.append(subscription)
 
     async def _process_add_subscription_response(self, response: agent_worker_pb2.AddSubscriptionResponse) -> None:
-        future = self._pending_requests.pop(response.request_id)
+        future = self._pending_requests.pop(response.request_id, None)
+        if future is None:
+            # The response to adding a subscription again after reconnecting.
+            if response.HasField("error"):
+                logger.error("Failed to add a subscription again after reconnecting: %s", response.error)
+            return
         if response.HasField("error"):
             future.set_exception(RuntimeError(response.error))
         else:
@@ -746,5 +1467,68 @@ async def get(
             instance_getter=self._get_agent,
         )
 
+    async def warm_up(self, type: AgentType | str, keys: Iterable[str]) -> None:
+        """Instantiate the agents of a registered type for the given keys ahead of time,
+        so that the first message to each of them does not wait for the agent to be constructed.
+
+        Agents that already exist are left as they are. If the runtime limits the number of resident agents,
+        warmed up agents are subject to eviction like any other agent.
+
+        Args:
+            type (AgentType | str): The type of the agents.
+            keys (Iterable[str]): The keys of the agents to instantiate.
+
+        Raises:
+            LookupError: If the agent type is not registered.
+        """
+        type_str = type if isinstance(type, str) else type.type
+        if type_str not in self._agent_factories:
+            raise LookupError(f"Agent with name {type_str} not found.")
+        for key in keys:
+            await self._get_agent(AgentId(type_str, key))
+
     def add_message_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSerializer[Any]]) -> None:
         self._serialization_registry.add_serializer(serializer)
+
+    def set_data_content_types(self, type: AgentType | str, data_content_types: Sequence[str]) -> None:
+        """Set the content types to encode the messages sent to agents of a type with, in order of preference.
+        This overrides the `data_content_types` of the runtime for that agent type. Content types that the agents of the type
+        do not accept, as advertised by their workers, are skipped.
+
+        Args:
+            type (AgentType | str): The type of the recipient agents.
+            data_content_types (Sequence[str]): The content types, for example
+                :data:`~autogen_core.base.MSGPACK_DATA_CONTENT_TYPE` or :data:`~autogen_core.base.JSON_DATA_CONTENT_TYPE`.
+        """
+        type_str = type if isinstance(type, str) else type.type
+        self._per_agent_type_data_content_types[type_str] = list(data_content_types)
+
+    def _get_data_content_types(self, agent_type: str | None) -> List[str]:
+        if agent_type is None:
+            return self._data_content_types
+        return self._per_agent_type_data_content_types.get(agent_type, self._data_content_types)
+
+    def _select_data_content_type(self, type_name: str, agent_type: str | None) -> str:
+        """Select the content type of a payload for the agents of a type, or, if None, for the subscribers of a topic.
+        The content types that the recipients accept are tried in the order of preference of this runtime, then in theirs."""
+        preferred = self._get_data_content_types(agent_type)
+        if agent_type is not None:
+            accepted = self._accepted_data_content_types.get(agent_type)
+        else:
+            # The subscribers of a topic are not known here, so only the content types that all known agent types accept are used.
+            if self._commonly_accepted_data_content_types is None:
+                self._commonly_accepted_data_content_types = _common_data_content_types(
+                    self._accepted_data_content_types.values()
+                )
+            accepted = self._commonly_accepted_data_content_types
+        if accepted:
+            preferred = [t for t in preferred if t in accepted] + [t for t in accepted if t not in preferred]
+        return self._serialization_registry.select_data_content_type(type_name, preferred)
+
+
+def _common_data_content_types(accepted: Iterable[Sequence[str]]) -> List[str]:
+    accepted = list(accepted)
+    if not accepted:
+        return []
+    first, *others = accepted
+    return [t for t in first if all(t in other for other in others)]
@@ -1,12 +1,15 @@
 import asyncio
 import logging
 import signal
-from typing import Optional, Sequence
+from typing import Dict, Optional, Sequence
 
 import grpc
 
 from autogen_core.base._type_helpers import ChannelArgumentType
 
+from ._agent_state_store import AgentStateStore
+from ._flow_control import DEFAULT_MAX_QUEUE_SIZE, QueueFullPolicy, QueueMetrics
+from ._helpers import DEFAULT_MAX_CACHED_TOPICS, DEFAULT_MAX_MESSAGE_BATCH_SIZE, DEFAULT_REAP_INTERVAL
 from ._worker_runtime_host_servicer import WorkerAgentRuntimeHostServicer
 from .protos import agent_worker_pb2_grpc
 
@@ -14,9 +17,95 @@
 
 
 class WorkerAgentRuntimeHost:
-    def __init__(self, address: str, extra_grpc_config: Optional[ChannelArgumentType] = None) -> None:
+    """A gRPC server that routes messages between :class:`WorkerAgentRuntime` instances.
+
+    Several hosts can run as a cluster by passing each of them the addresses of all the hosts in `cluster_addresses`.
+    Agent types are assigned to hosts by consistent hashing of the agent type, and a worker must register an agent type
+    at the host that the type is assigned to. The hosts forward requests for agent types of other hosts to those hosts,
+    and forward the published events to all the other hosts. Subscriptions are not replicated across the cluster:
+    a subscription must be added at the host of its agent type, which delivers the events to the agents of the type.
+
+    .. code-block:: python
+
+        from autogen_core.application import WorkerAgentRuntimeHost
+
+        addresses = ["localhost:50051", "localhost:50052"]
+        hosts = [WorkerAgentRuntimeHost(address, cluster_addresses=addresses) for address in addresses]
+        for host in hosts:
+            host.start()
+
+        # The host of an agent type.
+        host_address = hosts[0].get_host_address("my_agent_type")
+
+    Args:
+        address (str): The address to listen on.
+        extra_grpc_config (ChannelArgumentType, optional): Extra gRPC server options. Defaults to None.
+        max_cached_topics (int | None, optional): The maximum number of topics for which the resolved subscribers are cached.
+            If None, the cache is unbounded. Defaults to 10000.
+        cached_topic_ttl (float | None, optional): The number of seconds after which the cached subscribers of a topic
+            are resolved again. If None, cached topics do not expire. Defaults to None.
+        max_batch_size (int, optional): The maximum number of messages written to a worker in a single batch.
+            If 1 or less, messages are written one at a time. Defaults to 100.
+        batch_flush_interval (float, optional): The number of seconds to wait for more messages before writing a batch that is not full.
+            If 0, only the messages that are already queued are batched, which adds no latency. Defaults to 0.
+        cluster_addresses (Sequence[str] | None, optional): The addresses of all the hosts of the cluster, including `address`.
+            Every host of the cluster must be given the same addresses. If None, the host does not belong to a cluster. Defaults to None.
+        shared_agent_types (bool, optional): If True, several workers can register the same agent type, and the messages for an agent
+            of the type are routed to one of the workers by consistent hashing of the agent key. Defaults to False.
+        request_timeout (float | None, optional): The number of seconds to wait for the response to a request that was sent without a timeout.
+            When a request times out, the sender receives an error and the request is cancelled at the target worker.
+            If None, such requests wait until the target responds or disconnects. Defaults to None.
+        reap_interval (float, optional): The number of seconds between the checks for requests that timed out, which bounds
+            the precision of the timeouts: a request can outlive its timeout by up to this interval. Defaults to 0.5.
+        unrouted_request_timeout (float, optional): The number of seconds that a request for an agent type that is not registered
+            waits for a worker to register the type, so that requests are not lost while workers reconnect after the host restarted.
+            If 0, such requests fail immediately. Defaults to 5.
+        max_queue_size (int, optional): The maximum number of requests and events queued for each worker. A worker whose queue is full
+            slows down the workers that send to it: the host stops reading from a worker while that many of its messages wait for space.
+            If 0, the queues are unbounded. Defaults to 10000.
+        queue_full_policy (QueueFullPolicy, optional): What to do with a request or event for a worker whose queue is full:
+            "block" waits for space, "drop_oldest" drops the oldest request or event queued for the worker, and "reject" does not
+            deliver the message. The sender of a dropped or rejected request receives an error. Defaults to "block".
+        agent_state_store (AgentStateStore | None, optional): The store of the agent states that workers save at the host, such as
+            a :class:`~autogen_core.application.SqliteAgentStateStore`. States that are saved at the same time are written in one batch.
+            The hosts of a cluster should share a store. Defaults to an :class:`~autogen_core.application.InMemoryAgentStateStore`.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        extra_grpc_config: Optional[ChannelArgumentType] = None,
+        *,
+        max_cached_topics: int | None = DEFAULT_MAX_CACHED_TOPICS,
+        cached_topic_ttl: float | None = None,
+        max_batch_size: int = DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+        batch_flush_interval: float = 0.0,
+        cluster_addresses: Sequence[str] | None = None,
+        shared_agent_types: bool = False,
+        request_timeout: float | None = None,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+        unrouted_request_timeout: float = 5.0,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        queue_full_policy: QueueFullPolicy = "block",
+        agent_state_store: AgentStateStore | None = None,
+    ) -> None:
         self._server = grpc.aio.server(options=extra_grpc_config)
-        self._servicer = WorkerAgentRuntimeHostServicer()
+        self._servicer = WorkerAgentRuntimeHostServicer(
+            max_cached_topics=max_cached_topics,
+            cached_topic_ttl=cached_topic_ttl,
+            max_batch_size=max_batch_size,
+            batch_flush_interval=batch_flush_interval,
+            shared_agent_types=shared_agent_types,
+            address=address,
+            cluster_addresses=cluster_addresses,
+            extra_grpc_config=extra_grpc_config,
+            request_timeout=request_timeout,
+            reap_interval=reap_interval,
+            unrouted_request_timeout=unrouted_request_timeout,
+            max_queue_size=max_queue_size,
+            queue_full_policy=queue_full_policy,
+            agent_state_store=agent_state_store,
+        )
         agent_worker_pb2_grpc.add_AgentRpcServicer_to_server(self._servicer, self._server)
         self._server.add_insecure_port(address)
         self._address = address
@@ -25,8 +114,26 @@ def __init__(self, address: str, extra_grpc_config: Optional[ChannelArgumentType
     async def _serve(self) -> None:
         await self._server.start()
         logger.info(f"Server started at {self._address}.")
+        await self._servicer.start()
         await self._server.wait_for_termination()
 
+    def get_host_address(self, agent_type: str) -> str:
+        """Get the address of the host of the cluster at which an agent type must be registered.
+
+        Args:
+            agent_type (str): The agent type.
+
+        Returns:
+            str: The address of the host. The address of this host if it does not belong to a cluster.
+        """
+        return self._servicer.get_host_address(agent_type)
+
+    @property
+    def client_queue_metrics(self) -> Dict[int, QueueMetrics]:
+        """The depth of the queue of messages for each connected worker, and the number of messages that were
+        dropped or rejected because the queue was full, by client id."""
+        return self._servicer.client_queue_metrics
+
     def start(self) -> None:
         """Start the server in a background task."""
         if self._serve_task is not None:
@@ -37,6 +144,7 @@ async def stop(self, grace: int = 5) -> None:
         """Stop the server."""
         if self._serve_task is None:
             raise RuntimeError("Host runtime is not started.")
+        await self._servicer.stop()
         await self._server.stop(grace=grace)
         self._serve_task.cancel()
         try:
@@ -1,33 +1,165 @@
 import asyncio
+import json
 import logging
 from _collections_abc import AsyncIterator, Iterator
 from asyncio import Future, Task
-from typing import Any, Dict, Set
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Set, Tuple
 
 import grpc
 
-from ..base import TopicId
+from ..base import AgentId, TopicId
+from ..base._type_helpers import ChannelArgumentType
+from ..base.exceptions import MessageDroppedException
 from ..components import TypeSubscription
-from ._helpers import SubscriptionManager
+from ._agent_state_service import AgentStateService
+from ._agent_state_store import AgentStateStore, InMemoryAgentStateStore
+from ._consistent_hash import ConsistentHashRing
+from ._flow_control import (
+    DEFAULT_MAX_QUEUE_SIZE,
+    FlowControlQueue,
+    QueueAsyncIterable,
+    QueueFullPolicy,
+    QueueMetrics,
+    is_flow_controlled,
+)
+from ._helpers import (
+    DEFAULT_MAX_CACHED_TOPICS,
+    DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+    DEFAULT_REAP_INTERVAL,
+    MESSAGE_ACKS_METADATA,
+    MESSAGE_BATCHING_METADATA,
+    WORKER_ID_METADATA_KEY,
+    SubscriptionManager,
+    accepts_message_batches,
+)
 from .protos import agent_worker_pb2, agent_worker_pb2_grpc
 
 logger = logging.getLogger("autogen_core")
 event_logger = logging.getLogger("autogen_core.events")
 
+# gRPC metadata key with which a host of a cluster identifies itself to the other hosts.
+PEER_HOST_METADATA_KEY = "x-agent-host-peer"
+PEER_RECONNECT_INTERVAL = 1.0
+
 
 class WorkerAgentRuntimeHostServicer(agent_worker_pb2_grpc.AgentRpcServicer):
-    """A gRPC servicer that hosts message delivery service for agents."""
+    """A gRPC servicer that hosts message delivery service for agents.
+
+    Args:
+        max_cached_topics (int | None, optional): The maximum number of topics for which the resolved subscribers are cached.
+            If None, the cache is unbounded. Defaults to 10000.
+        cached_topic_ttl (float | None, optional): The number of seconds after which the cached subscribers of a topic
+            are resolved again. If None, cached topics do not expire. Defaults to None.
+        max_batch_size (int, optional): The maximum number of messages written to a client in a single batch.
+            Messages that are queued for a client are written together, so that a burst of messages costs one stream write.
+            Only clients that announce support for batches receive them. If 1 or less, messages are written one at a time. Defaults to 100.
+        batch_flush_interval (float, optional): The number of seconds to wait for more messages before writing a batch that is not full.
+            If 0, only the messages that are already queued are batched, which adds no latency. Defaults to 0.
+        shared_agent_types (bool, optional): If True, several clients can register the same agent type. Messages for an agent
+            of the type are routed to one of the clients by consistent hashing of the agent key, so each agent stays on the same
+            client while the clients of the type do not change. If False, an agent type can only be registered by one client,
+            or by the streams of one worker, which identify their worker with gRPC metadata. Defaults to False.
+        address (str | None, optional): The address of this host in `cluster_addresses`. Required if `cluster_addresses` is set. Defaults to None.
+        cluster_addresses (Sequence[str] | None, optional): The addresses of all the hosts of a cluster, including this one.
+            See :class:`~autogen_core.application.WorkerAgentRuntimeHost`. If None, the host does not belong to a cluster. Defaults to None.
+        extra_grpc_config (ChannelArgumentType | None, optional): Extra gRPC channel options for the connections to the other hosts of the cluster. Defaults to None.
+        request_timeout (float | None, optional): The number of seconds to wait for the response to a request that has no timeout of its own.
+            When a request times out, an error response is sent to the sender and the request is cancelled at the target.
+            If None, such requests wait until the target responds or disconnects. Defaults to None.
+        reap_interval (float, optional): The number of seconds between the checks for requests that timed out, which bounds
+            the precision of the timeouts: a request can outlive its timeout by up to this interval. Defaults to 0.5.
+        unrouted_request_timeout (float, optional): The number of seconds that a request for an agent type that is not registered
+            waits for a client to register the type, such as while workers reconnect after the host restarted.
+            The request fails when no client registers the type in time. If 0, such requests fail immediately. Defaults to 5.
+        max_queue_size (int, optional): The maximum number of requests and events queued for each client, and the maximum number
+            of messages received from each client that wait for space in the queues of their recipients. When a client has
+            that many messages waiting, the host stops reading from the client, which slows down its senders. Responses and other
+            control messages are not counted. If 0, the queues are unbounded. Defaults to 10000.
+        queue_full_policy (QueueFullPolicy, optional): What to do with a request or event for a client whose queue is full:
+            "block" waits for space; "drop_oldest" drops the oldest request or event queued for the client; "reject" does not
+            deliver the message. The sender of a request that is dropped or rejected receives an error response. Defaults to "block".
+        agent_state_store (AgentStateStore | None, optional): The store of the agent states that clients save with `SaveState`
+            and load with `GetState`. Defaults to an :class:`~autogen_core.application.InMemoryAgentStateStore`.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        max_cached_topics: int | None = DEFAULT_MAX_CACHED_TOPICS,
+        cached_topic_ttl: float | None = None,
+        max_batch_size: int = DEFAULT_MAX_MESSAGE_BATCH_SIZE,
+        batch_flush_interval: float = 0.0,
+        shared_agent_types: bool = False,
+        address: str | None = None,
+        cluster_addresses: Sequence[str] | None = None,
+        extra_grpc_config: ChannelArgumentType | None = None,
+        request_timeout: float | None = None,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+        unrouted_request_timeout: float = 5.0,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        queue_full_policy: QueueFullPolicy = "block",
+        agent_state_store: AgentStateStore | None = None,
+    ) -> None:
         self._client_id = 0
         self._client_id_lock = asyncio.Lock()
-        self._send_queues: Dict[int, asyncio.Queue[agent_worker_pb2.Message]] = {}
+        self._send_queues: Dict[int, FlowControlQueue[agent_worker_pb2.Message]] = {}
+        self._max_queue_size = max_queue_size
+        self._queue_full_policy: QueueFullPolicy = queue_full_policy
+        # The routing tables are copied on write and replaced as a whole, so that messages are routed without locking.
+        # The lock serializes the changes to the tables.
         self._agent_type_to_client_id_lock = asyncio.Lock()
-        self._agent_type_to_client_id: Dict[str, int] = {}
-        self._pending_responses: Dict[int, Dict[str, Future[Any]]] = {}
+        self._agent_type_to_client_ids: Mapping[str, ConsistentHashRing[int]] = {}
+        # The recipients of each topic by client id, built on first use and dropped when routing changes.
+        # The topics are in least recently used order.
+        self._topic_routes: OrderedDict[TopicId, Dict[int, List[AgentId]]] = OrderedDict()
+        self._max_cached_topics = max_cached_topics
+        self._shared_agent_types = shared_agent_types
+        # Requests are forwarded with an id assigned by the host, so that the ids of different clients do not collide.
+        self._next_request_id = 0
+        self._pending_responses: Dict[int, Dict[str, Future[agent_worker_pb2.RpcResponse]]] = {}
+        # The forwarded request of each pending request of a sender, and the deadlines of the forwarded requests,
+        # both by client id and request id.
+        self._forwarded_requests: Dict[Tuple[int, str], Tuple[int, str]] = {}
+        self._request_deadlines: Dict[Tuple[int, str], float] = {}
+        self._request_timeout = request_timeout
+        self._reap_interval = reap_interval
+        self._reap_task: Task[None] | None = None
+        # Requests for agent types that are not registered, with the client ids of their senders and their deadlines, by agent type.
+        self._unrouted_requests: Dict[str, List[Tuple[agent_worker_pb2.RpcRequest, int, float]]] = {}
+        self._unrouted_request_timeout = unrouted_request_timeout
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(
+            max_cached_topics=max_cached_topics, cached_topic_ttl=cached_topic_ttl
+        )
         self._client_id_to_subscription_id_mapping: Dict[int, set[str]] = {}
+        # The clients that added each subscription. Several clients add the same subscription for a shared agent type.
+        self._subscription_clients: Dict[str, Set[int]] = {}
+        self._subscription_ids: Dict[Tuple[str, str], str] = {}
+        self._max_batch_size = max_batch_size
+        self._batch_flush_interval = batch_flush_interval
+        # Cluster membership. Agent types are assigned to hosts by consistent hashing of the agent type.
+        self._address = address
+        self._host_ring: ConsistentHashRing[str] | None = None
+        if cluster_addresses is not None:
+            if address is None or address not in cluster_addresses:
+                raise ValueError("The address of the host must be one of the cluster addresses.")
+            self._host_ring = ConsistentHashRing(sorted(set(cluster_addresses)))
+        self._extra_grpc_config = extra_grpc_config or []
+        # Clients that are other hosts of the cluster, and the client ids of the connections to the other hosts.
+        self._peer_client_ids: Set[int] = set()
+        self._peer_links: Dict[str, int] = {}
+        self._peer_link_tasks: Set[Task[None]] = set()
+        # The workers of the clients that are streams of a worker with several streams, by client id.
+        # The streams of a worker share its agent types and subscriptions.
+        self._client_worker_ids: Dict[int, str] = {}
+        self._agent_state_service = AgentStateService(
+            agent_state_store if agent_state_store is not None else InMemoryAgentStateStore()
+        )
+        # The content types that the clients of each agent type advertised when they registered it, by agent type and client id,
+        # and the content types that the other hosts of the cluster announced for their agent types.
+        self._client_content_types: Dict[str, Dict[int, List[str]]] = {}
+        self._peer_content_types: Dict[str, List[str]] = {}
 
     async def OpenChannel(  # type: ignore
         self,
@@ -40,9 +172,24 @@ async def OpenChannel(  # type: ignore
             client_id = self._client_id
 
         # Register the client with the server and create a send queue for the client.
-        send_queue: asyncio.Queue[agent_worker_pb2.Message] = asyncio.Queue()
+        send_queue = self._new_send_queue(client_id)
         self._send_queues[client_id] = send_queue
-        logger.info(f"Client {client_id} connected.")
+        metadata = context.invocation_metadata() or ()
+        batching = self._max_batch_size > 1 and accepts_message_batches(metadata)
+        # Tell the client that its messages are acknowledged, and that batched messages are accepted as well.
+        await context.send_initial_metadata([MESSAGE_ACKS_METADATA, *([MESSAGE_BATCHING_METADATA] if batching else [])])
+        peer_address = next((value for key, value in metadata if key == PEER_HOST_METADATA_KEY), None)
+        worker_id = next((value for key, value in metadata if key == WORKER_ID_METADATA_KEY), None)
+        if worker_id is not None:
+            self._client_worker_ids[client_id] = worker_id
+        if peer_address is not None:
+            self._peer_client_ids.add(client_id)
+            logger.info(f"Host {peer_address} connected as client {client_id}.")
+        else:
+            logger.info(f"Client {client_id} connected.")
+        # Tell the client which content types the known agent types accept.
+        for agent_type, data_content_types in self._known_content_types().items():
+            send_queue.put_nowait(_content_types_message(agent_type, data_content_types))
 
         try:
             # Concurrently handle receiving messages from the client and sending messages to the client.
@@ -52,36 +199,117 @@ async def OpenChannel(  # type: ignore
             # Return an async generator that will yield messages from the send queue to the client.
             while True:
                 message = await send_queue.get()
+                num_messages = 1
+                if batching:
+                    batch = await self._fill_batch(send_queue, message)
+                    num_messages = len(batch)
+                    if num_messages > 1:
+                        message = agent_worker_pb2.Message(batch=agent_worker_pb2.MessageBatch(messages=batch))
                 # Yield the message to the client.
                 try:
                     yield message
                 except Exception as e:
                     logger.error(f"Failed to send message to client {client_id}: {e}", exc_info=True)
                     break
-                logger.info(f"Sent message to client {client_id}: {message}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Sent %s message(s) to client %s.", num_messages, client_id)
             # Wait for the receiving task to finish.
             await receiving_task
 
         finally:
             # Clean up the client connection.
             del self._send_queues[client_id]
+            self._peer_client_ids.discard(client_id)
+            self._client_worker_ids.pop(client_id, None)
             # Cancel pending requests sent to this client.
             for future in self._pending_responses.pop(client_id, {}).values():
                 future.cancel()
             # Remove the client id from the agent type to client id mapping.
             await self._on_client_disconnect(client_id)
 
+    def _new_send_queue(self, client_id: int) -> FlowControlQueue[agent_worker_pb2.Message]:
+        return FlowControlQueue(
+            self._max_queue_size,
+            self._queue_full_policy,
+            is_bounded=is_flow_controlled,
+            on_drop=lambda message: self._on_message_dropped(client_id, message),
+        )
+
+    def _on_message_dropped(self, client_id: int, message: agent_worker_pb2.Message) -> None:
+        if message.HasField("request"):
+            logger.warning(
+                f"Dropped request {message.request.request_id} because the queue of client {client_id} is full."
+            )
+            # Fail the request, which sends an error response to its sender.
+            future = self._pending_responses.get(client_id, {}).pop(message.request.request_id, None)
+            if future is not None and not future.done():
+                future.set_exception(MessageDroppedException())
+        else:
+            logger.warning(f"Dropped event because the queue of client {client_id} is full.")
+
+    @property
+    def client_queue_metrics(self) -> Dict[int, QueueMetrics]:
+        """The metrics of the send queue of each client, by client id."""
+        return {client_id: send_queue.metrics for client_id, send_queue in self._send_queues.items()}
+
+    async def _fill_batch(
+        self, send_queue: FlowControlQueue[agent_worker_pb2.Message], first: agent_worker_pb2.Message
+    ) -> List[agent_worker_pb2.Message]:
+        """Collect the messages queued after the first one, up to the maximum batch size."""
+        batch = [first]
+        while len(batch) < self._max_batch_size and not send_queue.empty():
+            batch.append(send_queue.get_nowait())
+        if self._batch_flush_interval > 0:
+            deadline = asyncio.get_running_loop().time() + self._batch_flush_interval
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                # Only the wait for a message times out, so a message that arrives as the timeout expires stays queued.
+                try:
+                    await asyncio.wait_for(send_queue.wait_not_empty(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                while len(batch) < self._max_batch_size and not send_queue.empty():
+                    batch.append(send_queue.get_nowait())
+        return batch
+
     async def _on_client_disconnect(self, client_id: int) -> None:
         async with self._agent_type_to_client_id_lock:
-            agent_types = [agent_type for agent_type, id_ in self._agent_type_to_client_id.items() if id_ == client_id]
-            for agent_type in agent_types:
-                logger.info(f"Removing agent type {agent_type} from agent type to client id mapping")
-                del self._agent_type_to_client_id[agent_type]
-            for sub_id in self._client_id_to_subscription_id_mapping.get(client_id, []):
-                logger.info(f"Client id {client_id} disconnected. Removing corresponding subscription with id {id}")
+            agent_type_to_client_ids: Dict[str, ConsistentHashRing[int]] = {}
+            for agent_type, client_ids in self._agent_type_to_client_ids.items():
+                if client_id in client_ids:
+                    if len(client_ids) == 1:
+                        logger.info(f"Removing agent type {agent_type} from agent type to client id mapping")
+                        continue
+                    client_ids = client_ids.copy()
+                    client_ids.remove(client_id)
+                agent_type_to_client_ids[agent_type] = client_ids
+            for agent_type, client_content_types in list(self._client_content_types.items()):
+                if client_content_types.pop(client_id, None) is not None:
+                    self._announce_content_types(agent_type)
+            for sub_id in self._client_id_to_subscription_id_mapping.pop(client_id, set()):
+                subscription_clients = self._subscription_clients[sub_id]
+                subscription_clients.discard(client_id)
+                if subscription_clients:
+                    # Other clients of a shared agent type still use the subscription.
+                    continue
+                logger.info(f"Client id {client_id} disconnected. Removing corresponding subscription with id {sub_id}")
                 await self._subscription_manager.remove_subscription(sub_id)
+                del self._subscription_clients[sub_id]
+                self._subscription_ids = {key: id_ for key, id_ in self._subscription_ids.items() if id_ != sub_id}
+            self._update_routing(agent_type_to_client_ids)
         logger.info(f"Client {client_id} disconnected successfully")
 
+    def _shares_agent_types(self, client_id: int, other_client_ids: Iterable[int]) -> bool:
+        """Check if a client can register the agent types and add the subscriptions that other clients did."""
+        if self._shared_agent_types:
+            return True
+        worker_id = self._client_worker_ids.get(client_id)
+        return worker_id is not None and all(
+            self._client_worker_ids.get(other_client_id) == worker_id for other_client_id in other_client_ids
+        )
+
     def _raise_on_exception(self, task: Task[Any]) -> None:
         exception = task.exception()
         if exception is not None:
@@ -91,118 +319,437 @@ async def _receive_messages(
         self, client_id: int, request_iterator: AsyncIterator[agent_worker_pb2.Message]
     ) -> None:
         # Receive messages from the client and process them.
+        credits = self._new_credits()
         async for message in request_iterator:
-            logger.info(f"Received message from client {client_id}: {message}")
-            oneofcase = message.WhichOneof("message")
-            match oneofcase:
-                case "request":
-                    request: agent_worker_pb2.RpcRequest = message.request
-                    task = asyncio.create_task(self._process_request(request, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "response":
-                    response: agent_worker_pb2.RpcResponse = message.response
-                    task = asyncio.create_task(self._process_response(response, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "event":
-                    event: agent_worker_pb2.Event = message.event
-                    task = asyncio.create_task(self._process_event(event))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "registerAgentTypeRequest":
-                    register_agent_type: agent_worker_pb2.RegisterAgentTypeRequest = message.registerAgentTypeRequest
-                    task = asyncio.create_task(
-                        self._process_register_agent_type_request(register_agent_type, client_id)
-                    )
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "addSubscriptionRequest":
-                    add_subscription: agent_worker_pb2.AddSubscriptionRequest = message.addSubscriptionRequest
-                    task = asyncio.create_task(self._process_add_subscription_request(add_subscription, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "registerAgentTypeResponse" | "addSubscriptionResponse":
-                    logger.warning(f"Received unexpected message type: {oneofcase}")
-                case None:
-                    logger.warning("Received empty message")
-                case other:
-                    logger.error(f"Received unexpected message: {other}")
+            if message.HasField("batch"):
+                for batched_message in message.batch.messages:
+                    await self._receive_with_credit(client_id, batched_message, credits)
+                sequence = message.batch.messages[-1].sequence if message.batch.messages else 0
+            else:
+                await self._receive_with_credit(client_id, message, credits)
+                sequence = message.sequence
+            if sequence:
+                # Acknowledge the messages that the client keeps for redelivery. The messages are acknowledged once received,
+                # not once delivered, so the messages that are still in the host when it stops are lost.
+                send_queue = self._send_queues[client_id]
+                send_queue.put_nowait(agent_worker_pb2.Message(ack=agent_worker_pb2.Ack(sequence=sequence)))
+
+    def _new_credits(self) -> asyncio.Semaphore | None:
+        return asyncio.Semaphore(self._max_queue_size) if self._max_queue_size > 0 else None
+
+    async def _receive_with_credit(
+        self, client_id: int, message: agent_worker_pb2.Message, credits: asyncio.Semaphore | None
+    ) -> None:
+        if credits is None or not is_flow_controlled(message):
+            self._receive_message(client_id, message)
+            return
+        # A request or event holds a credit of its sender until it is queued for its recipients, not while it is handled,
+        # so the host stops reading from a sender whose messages wait for full queues.
+        await credits.acquire()
+        task = self._receive_message(client_id, message)
+        if task is None:
+            credits.release()
+        else:
+            task.add_done_callback(lambda _: credits.release())
+
+    def _receive_message(self, client_id: int, message: agent_worker_pb2.Message) -> Task[None] | None:
+        oneofcase = message.WhichOneof("message")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received %s message from client %s.", oneofcase, client_id)
+        match oneofcase:
+            case "request":
+                request: agent_worker_pb2.RpcRequest = message.request
+                task = asyncio.create_task(self._process_request(request, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "response":
+                response: agent_worker_pb2.RpcResponse = message.response
+                task = asyncio.create_task(self._process_response(response, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+            case "event":
+                event: agent_worker_pb2.Event = message.event
+                task = asyncio.create_task(self._process_event(event, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "registerAgentTypeRequest":
+                register_agent_type: agent_worker_pb2.RegisterAgentTypeRequest = message.registerAgentTypeRequest
+                task = asyncio.create_task(self._process_register_agent_type_request(register_agent_type, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+            case "addSubscriptionRequest":
+                add_subscription: agent_worker_pb2.AddSubscriptionRequest = message.addSubscriptionRequest
+                task = asyncio.create_task(self._process_add_subscription_request(add_subscription, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+            case "cancel":
+                self._process_cancel(message.cancel, client_id)
+            case "agentTypeContentTypes":
+                self._process_agent_type_content_types(message.agentTypeContentTypes, client_id)
+            case "ack":
+                pass
+            case "registerAgentTypeResponse" | "addSubscriptionResponse" | "batch":
+                logger.warning(f"Received unexpected message type: {oneofcase}")
+            case None:
+                logger.warning("Received empty message")
+            case other:
+                logger.error(f"Received unexpected message: {other}")
+        return None
 
     async def _process_request(self, request: agent_worker_pb2.RpcRequest, client_id: int) -> None:
-        # Deliver the message to a client given the target agent type.
-        async with self._agent_type_to_client_id_lock:
-            target_client_id = self._agent_type_to_client_id.get(request.target.type)
+        # Deliver the message to a client given the target agent.
+        target_client_id = self._route_request(request.target, client_id)
+        if target_client_id is None and self._unrouted_request_timeout > 0:
+            # Wait for a client to register the agent type.
+            deadline = asyncio.get_running_loop().time() + self._unrouted_request_timeout
+            self._unrouted_requests.setdefault(request.target.type, []).append((request, client_id, deadline))
+            return
         if target_client_id is None:
             logger.error(f"Agent {request.target.type} not found, failed to deliver message.")
+            await self._send_error_response(client_id, request.request_id, f"Agent {request.target.type} not found.")
             return
         target_send_queue = self._send_queues.get(target_client_id)
         if target_send_queue is None:
             logger.error(f"Client {target_client_id} not found, failed to deliver message.")
+            await self._send_error_response(client_id, request.request_id, f"Agent {request.target.type} not found.")
             return
-        await target_send_queue.put(agent_worker_pb2.Message(request=request))
 
         # Create a future to wait for the response from the target.
-        future = asyncio.get_event_loop().create_future()
-        self._pending_responses.setdefault(target_client_id, {})[request.request_id] = future
+        self._next_request_id += 1
+        forwarded_request_id = str(self._next_request_id)
+        future: Future[agent_worker_pb2.RpcResponse] = asyncio.get_event_loop().create_future()
+        self._pending_responses.setdefault(target_client_id, {})[forwarded_request_id] = future
+        self._forwarded_requests[(client_id, request.request_id)] = (target_client_id, forwarded_request_id)
+
+        message = agent_worker_pb2.Message(request=request)
+        message.request.request_id = forwarded_request_id
+        timeout = request.timeout if request.HasField("timeout") else self._request_timeout
+        if timeout is not None:
+            # The target gives up on the request at the same time.
+            message.request.timeout = timeout
+            deadline = asyncio.get_running_loop().time() + timeout
+            self._request_deadlines[(target_client_id, forwarded_request_id)] = deadline
+        try:
+            await target_send_queue.put(message)
+        except MessageDroppedException:
+            logger.warning(
+                f"Rejected request {forwarded_request_id} because the queue of client {target_client_id} is full."
+            )
+            self._pending_responses[target_client_id].pop(forwarded_request_id, None)
+            self._forwarded_requests.pop((client_id, request.request_id), None)
+            self._request_deadlines.pop((target_client_id, forwarded_request_id), None)
+            await self._send_error_response(
+                client_id, request.request_id, "The request was rejected because the queue of the target is full."
+            )
+            return
 
         # Create a task to wait for the response and send it back to the client.
-        send_response_task = asyncio.create_task(self._wait_and_send_response(future, client_id))
+        send_response_task = asyncio.create_task(
+            self._wait_and_send_response(future, client_id, request.request_id, target_client_id, forwarded_request_id)
+        )
         self._background_tasks.add(send_response_task)
         send_response_task.add_done_callback(self._raise_on_exception)
         send_response_task.add_done_callback(self._background_tasks.discard)
 
-    async def _wait_and_send_response(self, future: Future[agent_worker_pb2.RpcResponse], client_id: int) -> None:
-        response = await future
+    def _route_request(self, target: agent_worker_pb2.AgentId, client_id: int) -> int | None:
+        client_ids = self._agent_type_to_client_ids.get(target.type)
+        if client_ids is not None:
+            return client_ids.get(target.key)
+        # Forward requests from the clients of this host to the host of the agent type.
+        # Requests from other hosts are not forwarded again.
+        if self._host_ring is not None and client_id not in self._peer_client_ids:
+            host_address = self._host_ring.get(target.type)
+            if host_address != self._address:
+                return self._peer_links.get(host_address)
+        return None
+
+    async def _wait_and_send_response(
+        self,
+        future: Future[agent_worker_pb2.RpcResponse],
+        client_id: int,
+        request_id: str,
+        target_client_id: int,
+        forwarded_request_id: str,
+    ) -> None:
+        try:
+            response = await future
+        except asyncio.CancelledError:
+            await self._send_error_response(
+                client_id, request_id, "The request was cancelled or the target disconnected before responding."
+            )
+            return
+        except TimeoutError:
+            # The sender raises a TimeoutError for the responses that are marked as timed out.
+            await self._send_error_response(client_id, request_id, "The request timed out.", timed_out=True)
+            return
+        except MessageDroppedException:
+            await self._send_error_response(
+                client_id, request_id, "The request was dropped because the queue of the target is full."
+            )
+            return
+        finally:
+            self._forwarded_requests.pop((client_id, request_id), None)
+            self._request_deadlines.pop((target_client_id, forwarded_request_id), None)
         message = agent_worker_pb2.Message(response=response)
+        message.response.request_id = request_id
         send_queue = self._send_queues.get(client_id)
         if send_queue is None:
             logger.error(f"Client {client_id} not found, failed to send response message.")
             return
         await send_queue.put(message)
 
+    async def _send_error_response(
+        self, client_id: int, request_id: str, error: str, *, timed_out: bool = False
+    ) -> None:
+        send_queue = self._send_queues.get(client_id)
+        if send_queue is None:
+            logger.error(f"Client {client_id} not found, failed to send response message.")
+            return
+        await send_queue.put(
+            agent_worker_pb2.Message(
+                response=agent_worker_pb2.RpcResponse(request_id=request_id, error=error, timed_out=timed_out)
+            )
+        )
+
     async def _process_response(self, response: agent_worker_pb2.RpcResponse, client_id: int) -> None:
         # Setting the result of the future will send the response back to the original sender.
-        future = self._pending_responses[client_id].pop(response.request_id)
+        future = self._pending_responses.get(client_id, {}).pop(response.request_id, None)
+        if future is None:
+            logger.warning(f"Received a response from client {client_id} for unknown request {response.request_id}.")
+            return
         future.set_result(response)
 
-    async def _process_event(self, event: agent_worker_pb2.Event) -> None:
+    def _process_cancel(self, cancel: agent_worker_pb2.RpcCancel, client_id: int) -> None:
+        # The sender no longer waits for the response, so drop the request and cancel it at the target.
+        forwarded = self._forwarded_requests.pop((client_id, cancel.request_id), None)
+        if forwarded is None:
+            return
+        target_client_id, forwarded_request_id = forwarded
+        self._cancel_forwarded_request(target_client_id, forwarded_request_id)
+
+    def _cancel_forwarded_request(self, target_client_id: int, forwarded_request_id: str) -> None:
+        future = self._pending_responses.get(target_client_id, {}).pop(forwarded_request_id, None)
+        if future is None:
+            return
+        future.cancel()
+        send_queue = self._send_queues.get(target_client_id)
+        if send_queue is not None:
+            send_queue.put_nowait(
+                agent_worker_pb2.Message(cancel=agent_worker_pb2.RpcCancel(request_id=forwarded_request_id))
+            )
+
+    async def _reap_expired_requests(self) -> None:
+        while True:
+            await asyncio.sleep(self._reap_interval)
+            now = asyncio.get_running_loop().time()
+            for agent_type, unrouted_requests in list(self._unrouted_requests.items()):
+                for request, client_id, deadline in unrouted_requests:
+                    if deadline <= now:
+                        logger.error(f"Agent {agent_type} not found, failed to deliver message.")
+                        await self._send_error_response(client_id, request.request_id, f"Agent {agent_type} not found.")
+                unrouted_requests = [item for item in unrouted_requests if item[2] > now]
+                if unrouted_requests:
+                    self._unrouted_requests[agent_type] = unrouted_requests
+                else:
+                    del self._unrouted_requests[agent_type]
+            expired = [key for key, deadline in self._request_deadlines.items() if deadline <= now]
+            for target_client_id, forwarded_request_id in expired:
+                del self._request_deadlines[(target_client_id, forwarded_request_id)]
+                future = self._pending_responses.get(target_client_id, {}).pop(forwarded_request_id, None)
+                if future is None or future.done():
+                    continue
+                logger.warning(f"Request {forwarded_request_id} to client {target_client_id} timed out.")
+                future.set_exception(TimeoutError())
+                send_queue = self._send_queues.get(target_client_id)
+                if send_queue is not None:
+                    await send_queue.put(
+                        agent_worker_pb2.Message(cancel=agent_worker_pb2.RpcCancel(request_id=forwarded_request_id))
+                    )
+
+    async def _process_event(self, event: agent_worker_pb2.Event, client_id: int) -> None:
         topic_id = TopicId(type=event.topic_type, source=event.topic_source)
+        routes = self._topic_routes.get(topic_id)
+        if routes is None:
+            routes = await self._resolve_topic_routes(topic_id)
+        elif self._max_cached_topics is not None:
+            self._topic_routes.move_to_end(topic_id)
+        # Deliver the event to clients. Unless agent types are shared, the message is shared by the send queues,
+        # so the event is copied once.
+        message = agent_worker_pb2.Message(event=event)
+        for target_client_id, recipients in routes.items():
+            if self._shared_agent_types or target_client_id in self._client_worker_ids:
+                # Tell the client which of its agents the event is for, as other clients host the other agents of the type.
+                client_message = agent_worker_pb2.Message(event=event)
+                client_message.event.recipients.extend(
+                    agent_worker_pb2.AgentId(type=recipient.type, key=recipient.key) for recipient in recipients
+                )
+                await self._deliver_event(target_client_id, client_message)
+            else:
+                await self._deliver_event(target_client_id, message)
+        # Forward events from the clients of this host to the other hosts of the cluster,
+        # which deliver them to their own clients.
+        if client_id not in self._peer_client_ids:
+            for link_client_id in self._peer_links.values():
+                await self._deliver_event(link_client_id, message)
+
+    async def _deliver_event(self, client_id: int, message: agent_worker_pb2.Message) -> None:
+        send_queue = self._send_queues.get(client_id)
+        if send_queue is None:
+            logger.error(f"Client {client_id} not found, failed to deliver event.")
+            return
+        try:
+            await send_queue.put(message)
+        except MessageDroppedException:
+            logger.warning(f"Rejected event because the queue of client {client_id} is full.")
+
+    async def _resolve_topic_routes(self, topic_id: TopicId) -> Dict[int, List[AgentId]]:
+        # Resolve against the current tables. If they are replaced in the meantime, the result is still
+        # used for this event but is cached in the replaced cache only.
+        agent_type_to_client_ids = self._agent_type_to_client_ids
+        topic_routes = self._topic_routes
         recipients = await self._subscription_manager.get_subscribed_recipients(topic_id)
-        # Get the client ids of the recipients.
-        async with self._agent_type_to_client_id_lock:
-            client_ids: Set[int] = set()
-            for recipient in recipients:
-                client_id = self._agent_type_to_client_id.get(recipient.type)
-                if client_id is not None:
-                    client_ids.add(client_id)
-                else:
-                    logger.error(f"Agent {recipient.type} and its client not found for topic {topic_id}.")
-        # Deliver the event to clients.
-        for client_id in client_ids:
-            await self._send_queues[client_id].put(agent_worker_pb2.Message(event=event))
+        routes: Dict[int, List[AgentId]] = {}
+        for recipient in recipients:
+            client_ids = agent_type_to_client_ids.get(recipient.type)
+            if client_ids is not None:
+                routes.setdefault(client_ids.get(recipient.key), []).append(recipient)
+            else:
+                logger.error(f"Agent {recipient.type} and its client not found for topic {topic_id}.")
+        if self._max_cached_topics is not None and len(topic_routes) >= self._max_cached_topics:
+            # Evict the least recently used topic.
+            topic_routes.popitem(last=False)
+        topic_routes[topic_id] = routes
+        return routes
+
+    def _update_routing(self, agent_type_to_client_ids: Mapping[str, ConsistentHashRing[int]]) -> None:
+        """Replace the routing tables after agent types or subscriptions changed. Must be called with the lock held."""
+        self._agent_type_to_client_ids = agent_type_to_client_ids
+        self._topic_routes = OrderedDict()
+
+    def get_host_address(self, agent_type: str) -> str:
+        """Get the address of the host of the cluster that an agent type is assigned to."""
+        if self._host_ring is None:
+            assert self._address is not None
+            return self._address
+        return self._host_ring.get(agent_type)
+
+    async def start(self) -> None:
+        """Start the background tasks of the host: the check for requests that timed out, and the connections to the other hosts of the cluster."""
+        self._reap_task = asyncio.create_task(self._reap_expired_requests())
+        await self._start_peer_links()
+
+    async def stop(self) -> None:
+        """Stop the background tasks of the host."""
+        if self._reap_task is not None:
+            self._reap_task.cancel()
+            try:
+                await self._reap_task
+            except asyncio.CancelledError:
+                pass
+            self._reap_task = None
+        await self._stop_peer_links()
+
+    async def _start_peer_links(self) -> None:
+        # Connect to the other hosts of the cluster. Each connection is kept open, and reopened when it is lost.
+        if self._host_ring is None:
+            return
+        for address in self._host_ring.nodes:
+            if address == self._address or address in self._peer_links:
+                continue
+            async with self._client_id_lock:
+                self._client_id += 1
+                link_client_id = self._client_id
+            # The send queue outlives the connections, so messages for the host wait while it is reconnecting.
+            self._send_queues[link_client_id] = self._new_send_queue(link_client_id)
+            self._peer_links[address] = link_client_id
+            task = asyncio.create_task(self._run_peer_link(address, link_client_id))
+            self._peer_link_tasks.add(task)
+
+    async def _stop_peer_links(self) -> None:
+        for task in self._peer_link_tasks:
+            task.cancel()
+        await asyncio.gather(*self._peer_link_tasks, return_exceptions=True)
+        self._peer_link_tasks.clear()
+        for link_client_id in self._peer_links.values():
+            del self._send_queues[link_client_id]
+        self._peer_links.clear()
+
+    async def _run_peer_link(self, address: str, link_client_id: int) -> None:
+        assert self._address is not None
+        send_queue = self._send_queues[link_client_id]
+        while True:
+            try:
+                async with grpc.aio.insecure_channel(address, options=self._extra_grpc_config) as channel:
+                    stub: Any = agent_worker_pb2_grpc.AgentRpcStub(channel)  # type: ignore
+                    request_iterator = QueueAsyncIterable(send_queue)
+                    call = stub.OpenChannel(
+                        request_iterator,
+                        metadata=[MESSAGE_BATCHING_METADATA, (PEER_HOST_METADATA_KEY, self._address)],
+                        wait_for_ready=True,
+                    )
+                    try:
+                        if accepts_message_batches(await call.initial_metadata()):
+                            request_iterator.max_batch_size = self._max_batch_size
+                        logger.info(f"Connected to host {address} as client {link_client_id}.")
+                        credits = self._new_credits()
+                        async for message in call:
+                            if message.HasField("batch"):
+                                for batched_message in message.batch.messages:
+                                    await self._receive_with_credit(link_client_id, batched_message, credits)
+                            else:
+                                await self._receive_with_credit(link_client_id, message, credits)
+                    finally:
+                        # Leave the queued messages for the next connection.
+                        request_iterator.close()
+            except grpc.aio.AioRpcError as e:
+                logger.warning(f"Connection to host {address} lost: {e.code()}")
+            # Requests forwarded over the lost connection are not answered.
+            for future in self._pending_responses.pop(link_client_id, {}).values():
+                future.cancel()
+            await asyncio.sleep(PEER_RECONNECT_INTERVAL)
 
     async def _process_register_agent_type_request(
         self, register_agent_type_req: agent_worker_pb2.RegisterAgentTypeRequest, client_id: int
     ) -> None:
         # Register the agent type with the host runtime.
+        agent_type = register_agent_type_req.type
         async with self._agent_type_to_client_id_lock:
-            if register_agent_type_req.type in self._agent_type_to_client_id:
-                existing_client_id = self._agent_type_to_client_id[register_agent_type_req.type]
-                logger.error(
-                    f"Agent type {register_agent_type_req.type} already registered with client {existing_client_id}."
-                )
+            client_ids = self._agent_type_to_client_ids.get(agent_type)
+            host_address = self._host_ring.get(agent_type) if self._host_ring is not None else None
+            if host_address is not None and host_address != self._address:
+                logger.error(f"Agent type {agent_type} belongs to host {host_address} of the cluster.")
+                success = False
+                error = f"Agent type {agent_type} belongs to host {host_address} of the cluster."
+            elif client_ids is not None and (
+                client_id in client_ids or not self._shares_agent_types(client_id, client_ids.nodes)
+            ):
+                logger.error(f"Agent type {agent_type} already registered with clients {client_ids.nodes}.")
                 success = False
-                error = f"Agent type {register_agent_type_req.type} already registered."
+                error = f"Agent type {agent_type} already registered."
             else:
-                self._agent_type_to_client_id[register_agent_type_req.type] = client_id
+                client_ids = client_ids.copy() if client_ids is not None else ConsistentHashRing[int]()
+                client_ids.add(client_id)
+                self._update_routing({**self._agent_type_to_client_ids, agent_type: client_ids})
                 success = True
                 error = None
+                if register_agent_type_req.data_content_types:
+                    client_content_types = self._client_content_types.setdefault(agent_type, {})
+                    client_content_types[client_id] = list(register_agent_type_req.data_content_types)
+                    self._announce_content_types(agent_type)
+                # Deliver the requests that waited for the agent type.
+                for request, sender_client_id, _ in self._unrouted_requests.pop(agent_type, []):
+                    if sender_client_id in self._send_queues:
+                        task = asyncio.create_task(self._process_request(request, sender_client_id))
+                        self._background_tasks.add(task)
+                        task.add_done_callback(self._raise_on_exception)
+                        task.add_done_callback(self._background_tasks.discard)
         # Send a response back to the client.
         await self._send_queues[client_id].put(
             agent_worker_pb2.Message(
@@ -212,6 +759,50 @@ async def _process_register_agent_type_request(
             )
         )
 
+    def _agent_type_content_types(self, agent_type: str) -> List[str]:
+        """The content types that all the clients of an agent type accept, in the order of preference of the first client.
+        Clients that did not advertise content types are not taken into account."""
+        client_content_types = list(self._client_content_types.get(agent_type, {}).values())
+        if not client_content_types:
+            return self._peer_content_types.get(agent_type, [])
+        first, *others = client_content_types
+        return [t for t in first if all(t in other for other in others)]
+
+    def _known_content_types(self) -> Dict[str, List[str]]:
+        known = {
+            agent_type: list(data_content_types) for agent_type, data_content_types in self._peer_content_types.items()
+        }
+        for agent_type in self._client_content_types:
+            data_content_types = self._agent_type_content_types(agent_type)
+            if data_content_types:
+                known[agent_type] = data_content_types
+        return known
+
+    def _announce_content_types(self, agent_type: str) -> None:
+        """Tell the clients, and the other hosts of the cluster, which content types the agents of a type accept."""
+        message = _content_types_message(agent_type, self._agent_type_content_types(agent_type))
+        for client_id, send_queue in self._send_queues.items():
+            # The hosts that connected to this host hear from it through the connections that this host opened to them.
+            if client_id not in self._peer_client_ids:
+                send_queue.put_nowait(message)
+
+    def _process_agent_type_content_types(
+        self, content_types: agent_worker_pb2.AgentTypeContentTypes, client_id: int
+    ) -> None:
+        # Only other hosts announce the content types of their agent types, which are passed on to the clients of this host.
+        if client_id not in self._peer_client_ids and client_id not in self._peer_links.values():
+            logger.warning(f"Received the content types of agent type {content_types.type} from client {client_id}.")
+            return
+        if content_types.data_content_types:
+            self._peer_content_types[content_types.type] = list(content_types.data_content_types)
+        else:
+            self._peer_content_types.pop(content_types.type, None)
+        message = agent_worker_pb2.Message(agentTypeContentTypes=content_types)
+        peer_links = set(self._peer_links.values())
+        for other_client_id, send_queue in self._send_queues.items():
+            if other_client_id not in self._peer_client_ids and other_client_id not in peer_links:
+                send_queue.put_nowait(message)
+
     async def _process_add_subscription_request(
         self, add_subscription_req: agent_worker_pb2.AddSubscriptionRequest, client_id: int
     ) -> None:
@@ -224,10 +815,34 @@ async def _process_add_subscription_request(
                 type_subscription = TypeSubscription(
                     topic_type=type_subscription_msg.topic_type, agent_type=type_subscription_msg.agent_type
                 )
+                key = (type_subscription.topic_type, type_subscription.agent_type)
+                host_address = (
+                    self._host_ring.get(type_subscription.agent_type) if self._host_ring is not None else None
+                )
                 try:
-                    await self._subscription_manager.add_subscription(type_subscription)
+                    if host_address is not None and host_address != self._address:
+                        # Subscriptions are not replicated across the cluster, so only the host of the agent type,
+                        # which delivers the events to its agents, can hold the subscription.
+                        raise ValueError(
+                            f"Agent type {type_subscription.agent_type} belongs to host {host_address} of the cluster."
+                        )
+                    async with self._agent_type_to_client_id_lock:
+                        subscription_id = self._subscription_ids.get(key)
+                        if (
+                            subscription_id is not None
+                            and client_id not in self._subscription_clients[subscription_id]
+                            and self._shares_agent_types(client_id, self._subscription_clients[subscription_id])
+                        ):
+                            # Another client of a shared agent type already added the subscription.
+                            self._subscription_clients[subscription_id].add(client_id)
+                        else:
+                            await self._subscription_manager.add_subscription(type_subscription)
+                            subscription_id = type_subscription.id
+                            self._subscription_ids[key] = subscription_id
+                            self._subscription_clients[subscription_id] = {client_id}
+                            self._update_routing(self._agent_type_to_client_ids)
                     subscription_ids = self._client_id_to_subscription_id_mapping.setdefault(client_id, set())
-                    subscription_ids.add(type_subscription.id)
+                    subscription_ids.add(subscription_id)
                     success = True
                     error = None
                 except ValueError as e:
@@ -249,11 +864,42 @@ async def GetState(  # type: ignore
         request: agent_worker_pb2.AgentId,
         context: grpc.aio.ServicerContext[agent_worker_pb2.AgentId, agent_worker_pb2.GetStateResponse],
     ) -> agent_worker_pb2.GetStateResponse:  # type: ignore
-        raise NotImplementedError("Method not implemented!")
+        agent_id = AgentId(request.type, request.key)
+        result = await self._agent_state_service.get(agent_id)
+        if result is None:
+            return agent_worker_pb2.GetStateResponse(success=False, error=f"No state is saved for {agent_id}.")
+        state, etag = result
+        return agent_worker_pb2.GetStateResponse(
+            agent_state=agent_worker_pb2.AgentState(agent_id=request, eTag=etag, text_data=json.dumps(state)),
+            success=True,
+        )
 
     async def SaveState(  # type: ignore
         self,
         request: agent_worker_pb2.AgentState,
         context: grpc.aio.ServicerContext[agent_worker_pb2.AgentId, agent_worker_pb2.SaveStateResponse],
     ) -> agent_worker_pb2.SaveStateResponse:  # type: ignore
-        raise NotImplementedError("Method not implemented!")
+        agent_id = AgentId(request.agent_id.type, request.agent_id.key)
+        match request.WhichOneof("data"):
+            case "text_data":
+                data: str | bytes = request.text_data
+            case "binary_data":
+                data = request.binary_data
+            case _:
+                return agent_worker_pb2.SaveStateResponse(success=False, error="The state must be JSON text or bytes.")
+        try:
+            state = json.loads(data)
+            if not isinstance(state, dict):
+                raise ValueError("The state must be a JSON object.")
+            await self._agent_state_service.save(agent_id, state, request.eTag or None)
+        except ValueError as e:
+            return agent_worker_pb2.SaveStateResponse(success=False, error=str(e))
+        return agent_worker_pb2.SaveStateResponse(success=True)
+
+
+def _content_types_message(agent_type: str, data_content_types: Sequence[str]) -> agent_worker_pb2.Message:
+    return agent_worker_pb2.Message(
+        agentTypeContentTypes=agent_worker_pb2.AgentTypeContentTypes(
+            type=agent_type, data_content_types=data_content_types
+        )
+    )
@@ -41,6 +41,12 @@ def __str__(self) -> str:
         return json.dumps(self.kwargs)
 
 
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.name
+    return str(value)
+
+
 class MessageKind(Enum):
     DIRECT = 1
     PUBLISH = 2
@@ -79,6 +85,7 @@ def prompt_tokens(self) -> int:
     def completion_tokens(self) -> int:
         return cast(int, self.kwargs["completion_tokens"])
 
-    # This must output the event in a json serializable format
+    # This must output the event in a json serializable format. The payload is formatted only
+    # when the record is emitted, and values that are not JSON serializable are written as strings.
     def __str__(self) -> str:
-        return json.dumps(self.kwargs)
+        return json.dumps(self.kwargs, default=_json_default)
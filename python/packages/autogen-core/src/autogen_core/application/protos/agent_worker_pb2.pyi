@@ -57,17 +57,21 @@ class Payload(google.protobuf.message.Message):
     DATA_TYPE_FIELD_NUMBER: builtins.int
     DATA_CONTENT_TYPE_FIELD_NUMBER: builtins.int
     DATA_FIELD_NUMBER: builtins.int
+    DATA_REF_FIELD_NUMBER: builtins.int
     data_type: builtins.str
     data_content_type: builtins.str
     data: builtins.bytes
+    data_ref: builtins.str
+    """Content address of the data in a blob store shared by the workers, set instead of data for large payloads."""
     def __init__(
         self,
         *,
         data_type: builtins.str = ...,
         data_content_type: builtins.str = ...,
         data: builtins.bytes = ...,
+        data_ref: builtins.str = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["data", b"data", "data_content_type", b"data_content_type", "data_type", b"data_type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["data", b"data", "data_content_type", b"data_content_type", "data_ref", b"data_ref", "data_type", b"data_type"]) -> None: ...
 
 global___Payload = Payload
 
@@ -97,8 +101,14 @@ class RpcRequest(google.protobuf.message.Message):
     METHOD_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
     METADATA_FIELD_NUMBER: builtins.int
+    TIMEOUT_FIELD_NUMBER: builtins.int
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
     request_id: builtins.str
     method: builtins.str
+    timeout: builtins.float
+    """The number of seconds the sender waits for the response. The host and the target give up on the request after that."""
+    message_id: builtins.str
+    """Identifies the request across redeliveries, so that the target handles it once."""
     @property
     def source(self) -> global___AgentId: ...
     @property
@@ -116,13 +126,35 @@ class RpcRequest(google.protobuf.message.Message):
         method: builtins.str = ...,
         payload: global___Payload | None = ...,
         metadata: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        timeout: builtins.float | None = ...,
+        message_id: builtins.str = ...,
     ) -> None: ...
-    def HasField(self, field_name: typing.Literal["_source", b"_source", "payload", b"payload", "source", b"source", "target", b"target"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_source", b"_source", "metadata", b"metadata", "method", b"method", "payload", b"payload", "request_id", b"request_id", "source", b"source", "target", b"target"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_source", b"_source", "_timeout", b"_timeout", "payload", b"payload", "source", b"source", "target", b"target", "timeout", b"timeout"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_source", b"_source", "_timeout", b"_timeout", "message_id", b"message_id", "metadata", b"metadata", "method", b"method", "payload", b"payload", "request_id", b"request_id", "source", b"source", "target", b"target", "timeout", b"timeout"]) -> None: ...
+    @typing.overload
     def WhichOneof(self, oneof_group: typing.Literal["_source", b"_source"]) -> typing.Literal["source"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_timeout", b"_timeout"]) -> typing.Literal["timeout"] | None: ...
 
 global___RpcRequest = RpcRequest
 
+@typing.final
+class RpcCancel(google.protobuf.message.Message):
+    """Tells the receiver of a request that the sender no longer waits for the response."""
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    REQUEST_ID_FIELD_NUMBER: builtins.int
+    request_id: builtins.str
+    def __init__(
+        self,
+        *,
+        request_id: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["request_id", b"request_id"]) -> None: ...
+
+global___RpcCancel = RpcCancel
+
 @typing.final
 class RpcResponse(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -147,8 +179,11 @@ class RpcResponse(google.protobuf.message.Message):
     PAYLOAD_FIELD_NUMBER: builtins.int
     ERROR_FIELD_NUMBER: builtins.int
     METADATA_FIELD_NUMBER: builtins.int
+    TIMED_OUT_FIELD_NUMBER: builtins.int
     request_id: builtins.str
     error: builtins.str
+    timed_out: builtins.bool
+    """Set with the error when the host gave up on the request because its timeout passed."""
     @property
     def payload(self) -> global___Payload: ...
     @property
@@ -160,9 +195,10 @@ class RpcResponse(google.protobuf.message.Message):
         payload: global___Payload | None = ...,
         error: builtins.str = ...,
         metadata: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        timed_out: builtins.bool = ...,
     ) -> None: ...
     def HasField(self, field_name: typing.Literal["payload", b"payload"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["error", b"error", "metadata", b"metadata", "payload", b"payload", "request_id", b"request_id"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["error", b"error", "metadata", b"metadata", "payload", b"payload", "request_id", b"request_id", "timed_out", b"timed_out"]) -> None: ...
 
 global___RpcResponse = RpcResponse
 
@@ -191,14 +227,22 @@ class Event(google.protobuf.message.Message):
     SOURCE_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
     METADATA_FIELD_NUMBER: builtins.int
+    RECIPIENTS_FIELD_NUMBER: builtins.int
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
     topic_type: builtins.str
     topic_source: builtins.str
+    message_id: builtins.str
+    """Identifies the event across redeliveries, so that each recipient handles it once."""
     @property
     def source(self) -> global___AgentId: ...
     @property
     def payload(self) -> global___Payload: ...
     @property
     def metadata(self) -> google.protobuf.internal.containers.ScalarMap[builtins.str, builtins.str]: ...
+    @property
+    def recipients(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___AgentId]:
+        """The agents of the receiving worker to deliver the event to. If empty, the event is delivered to all subscribed agents of the worker."""
+
     def __init__(
         self,
         *,
@@ -207,9 +251,11 @@ class Event(google.protobuf.message.Message):
         source: global___AgentId | None = ...,
         payload: global___Payload | None = ...,
         metadata: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        recipients: collections.abc.Iterable[global___AgentId] | None = ...,
+        message_id: builtins.str = ...,
     ) -> None: ...
     def HasField(self, field_name: typing.Literal["_source", b"_source", "payload", b"payload", "source", b"source"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_source", b"_source", "metadata", b"metadata", "payload", b"payload", "source", b"source", "topic_source", b"topic_source", "topic_type", b"topic_type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["_source", b"_source", "message_id", b"message_id", "metadata", b"metadata", "payload", b"payload", "recipients", b"recipients", "source", b"source", "topic_source", b"topic_source", "topic_type", b"topic_type"]) -> None: ...
     def WhichOneof(self, oneof_group: typing.Literal["_source", b"_source"]) -> typing.Literal["source"] | None: ...
 
 global___Event = Event
@@ -220,15 +266,21 @@ class RegisterAgentTypeRequest(google.protobuf.message.Message):
 
     REQUEST_ID_FIELD_NUMBER: builtins.int
     TYPE_FIELD_NUMBER: builtins.int
+    DATA_CONTENT_TYPES_FIELD_NUMBER: builtins.int
     request_id: builtins.str
     type: builtins.str
+    @property
+    def data_content_types(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """The content types of the payloads that the worker decodes for the agents of the type, in order of preference."""
+
     def __init__(
         self,
         *,
         request_id: builtins.str = ...,
         type: builtins.str = ...,
+        data_content_types: collections.abc.Iterable[builtins.str] | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["request_id", b"request_id", "type", b"type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["data_content_types", b"data_content_types", "request_id", b"request_id", "type", b"type"]) -> None: ...
 
 global___RegisterAgentTypeRequest = RegisterAgentTypeRequest
 
@@ -255,6 +307,29 @@ class RegisterAgentTypeResponse(google.protobuf.message.Message):
 
 global___RegisterAgentTypeResponse = RegisterAgentTypeResponse
 
+@typing.final
+class AgentTypeContentTypes(google.protobuf.message.Message):
+    """Tells the workers which content types the agents of a type accept, as advertised by the workers that registered the type.
+    An empty list means that the content types are not known, such as after the agent type was removed.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TYPE_FIELD_NUMBER: builtins.int
+    DATA_CONTENT_TYPES_FIELD_NUMBER: builtins.int
+    type: builtins.str
+    @property
+    def data_content_types(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]: ...
+    def __init__(
+        self,
+        *,
+        type: builtins.str = ...,
+        data_content_types: collections.abc.Iterable[builtins.str] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["data_content_types", b"data_content_types", "type", b"type"]) -> None: ...
+
+global___AgentTypeContentTypes = AgentTypeContentTypes
+
 @typing.final
 class TypeSubscription(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -421,6 +496,15 @@ class Message(google.protobuf.message.Message):
     ADDSUBSCRIPTIONREQUEST_FIELD_NUMBER: builtins.int
     ADDSUBSCRIPTIONRESPONSE_FIELD_NUMBER: builtins.int
     CLOUDEVENT_FIELD_NUMBER: builtins.int
+    BATCH_FIELD_NUMBER: builtins.int
+    CANCEL_FIELD_NUMBER: builtins.int
+    ACK_FIELD_NUMBER: builtins.int
+    AGENTTYPECONTENTTYPES_FIELD_NUMBER: builtins.int
+    SEQUENCE_FIELD_NUMBER: builtins.int
+    sequence: builtins.int
+    """The position of the message in the stream of a worker, if the worker keeps the message for redelivery
+    until the host acknowledges it. 0 otherwise.
+    """
     @property
     def request(self) -> global___RpcRequest: ...
     @property
@@ -437,6 +521,14 @@ class Message(google.protobuf.message.Message):
     def addSubscriptionResponse(self) -> global___AddSubscriptionResponse: ...
     @property
     def cloudEvent(self) -> cloudevent_pb2.CloudEvent: ...
+    @property
+    def batch(self) -> global___MessageBatch: ...
+    @property
+    def cancel(self) -> global___RpcCancel: ...
+    @property
+    def ack(self) -> global___Ack: ...
+    @property
+    def agentTypeContentTypes(self) -> global___AgentTypeContentTypes: ...
     def __init__(
         self,
         *,
@@ -448,9 +540,49 @@ class Message(google.protobuf.message.Message):
         addSubscriptionRequest: global___AddSubscriptionRequest | None = ...,
         addSubscriptionResponse: global___AddSubscriptionResponse | None = ...,
         cloudEvent: cloudevent_pb2.CloudEvent | None = ...,
+        batch: global___MessageBatch | None = ...,
+        cancel: global___RpcCancel | None = ...,
+        ack: global___Ack | None = ...,
+        agentTypeContentTypes: global___AgentTypeContentTypes | None = ...,
+        sequence: builtins.int = ...,
     ) -> None: ...
-    def HasField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> None: ...
-    def WhichOneof(self, oneof_group: typing.Literal["message", b"message"]) -> typing.Literal["request", "response", "event", "registerAgentTypeRequest", "registerAgentTypeResponse", "addSubscriptionRequest", "addSubscriptionResponse", "cloudEvent"] | None: ...
+    def HasField(self, field_name: typing.Literal["ack", b"ack", "addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "agentTypeContentTypes", b"agentTypeContentTypes", "batch", b"batch", "cancel", b"cancel", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["ack", b"ack", "addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "agentTypeContentTypes", b"agentTypeContentTypes", "batch", b"batch", "cancel", b"cancel", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response", "sequence", b"sequence"]) -> None: ...
+    def WhichOneof(self, oneof_group: typing.Literal["message", b"message"]) -> typing.Literal["request", "response", "event", "registerAgentTypeRequest", "registerAgentTypeResponse", "addSubscriptionRequest", "addSubscriptionResponse", "cloudEvent", "batch", "cancel", "ack", "agentTypeContentTypes"] | None: ...
 
 global___Message = Message
+
+@typing.final
+class Ack(google.protobuf.message.Message):
+    """Acknowledges the messages of a stream up to and including a sequence number."""
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SEQUENCE_FIELD_NUMBER: builtins.int
+    sequence: builtins.int
+    def __init__(
+        self,
+        *,
+        sequence: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["sequence", b"sequence"]) -> None: ...
+
+global___Ack = Ack
+
+@typing.final
+class MessageBatch(google.protobuf.message.Message):
+    """Several messages written to a stream at once. Only sent to clients that opt in to batching."""
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGES_FIELD_NUMBER: builtins.int
+    @property
+    def messages(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Message]: ...
+    def __init__(
+        self,
+        *,
+        messages: collections.abc.Iterable[global___Message] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["messages", b"messages"]) -> None: ...
+
+global___MessageBatch = MessageBatch
@@ -1,10 +1,22 @@
+import importlib.util
 import json
-from dataclasses import asdict, dataclass, fields
-from typing import Any, ClassVar, Dict, List, Protocol, Sequence, TypeVar, cast, get_args, get_origin, runtime_checkable
-
+from dataclasses import asdict, dataclass
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Protocol,
+    Sequence,
+    TypeVar,
+    cast,
+    runtime_checkable,
+)
+
+from google.protobuf import message as protobuf_message
 from pydantic import BaseModel
 
-from autogen_core.base._type_helpers import is_union
+from ._type_plan import get_type_plan
 
 T = TypeVar("T")
 
@@ -32,77 +44,72 @@ def is_dataclass(cls: type[Any]) -> bool:
     return hasattr(cls, "__dataclass_fields__")
 
 
-def has_nested_dataclass(cls: type[IsDataclass]) -> bool:
-    # iterate fields and check if any of them are dataclasses
-    return any(is_dataclass(f.type) for f in cls.__dataclass_fields__.values())
-
-
-def contains_a_union(cls: type[IsDataclass]) -> bool:
-    return any(is_union(f.type) for f in cls.__dataclass_fields__.values())
-
-
-def has_nested_base_model(cls: type[IsDataclass]) -> bool:
-    for f in fields(cls):
-        field_type = f.type
-        # Resolve forward references and other annotations
-        origin = get_origin(field_type)
-        args = get_args(field_type)
-
-        # If the field type is directly a subclass of BaseModel
-        if isinstance(field_type, type) and issubclass(field_type, BaseModel):
-            return True
-
-        # If the field type is a generic type like List[BaseModel], Tuple[BaseModel, ...], etc.
-        if origin is not None and args:
-            for arg in args:
-                # Recursively check the argument types
-                if isinstance(arg, type) and issubclass(arg, BaseModel):
-                    return True
-                elif get_origin(arg) is not None:
-                    # Handle nested generics like List[List[BaseModel]]
-                    if has_nested_base_model_in_type(arg):
-                        return True
-        # Handle Union types
-        elif args:
-            for arg in args:
-                if isinstance(arg, type) and issubclass(arg, BaseModel):
-                    return True
-                elif get_origin(arg) is not None:
-                    if has_nested_base_model_in_type(arg):
-                        return True
-    return False
-
-
-def has_nested_base_model_in_type(tp: Any) -> bool:
-    """Helper function to check if a type or its arguments is a BaseModel subclass."""
-    origin = get_origin(tp)
-    args = get_args(tp)
-
-    if isinstance(tp, type) and issubclass(tp, BaseModel):
-        return True
-    if origin is not None and args:
-        for arg in args:
-            if has_nested_base_model_in_type(arg):
-                return True
-    return False
-
-
 DataclassT = TypeVar("DataclassT", bound=IsDataclass)
 
 JSON_DATA_CONTENT_TYPE = "application/json"
+MSGPACK_DATA_CONTENT_TYPE = "application/x-msgpack"
+PROTOBUF_DATA_CONTENT_TYPE = "application/x-protobuf"
+
+_MSGPACK_AVAILABLE = importlib.util.find_spec("msgpack") is not None
+
+if importlib.util.find_spec("orjson") is not None:
+    import orjson
+
+    _orjson: Any = orjson
+else:
+    _orjson = None
+
+
+def _encode_nested_dataclass(obj: Any) -> Any:
+    """Encode the dataclasses nested in a message, for the encoders that do not support them natively."""
+    if is_dataclass(type(obj)):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode JSON with the standard library. orjson is not used, because its output differs from `json.dumps`:
+    it has no spaces after separators, does not escape non-ASCII characters, encodes NaN and infinity as null,
+    and encodes types such as datetime that `json.dumps` rejects."""
+    return json.dumps(obj, default=_encode_nested_dataclass).encode("utf-8")
+
+
+def _json_loads(payload: bytes) -> Any:
+    """Decode JSON with orjson if it is installed. Payloads that orjson rejects but `json.loads` accepts,
+    such as NaN, infinity and integers of more than 64 bits, are decoded with the standard library."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(payload)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(payload)
+
+
+def _import_msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError as e:
+        raise RuntimeError(
+            "Missing dependencies for msgpack serialization. Please ensure the autogen-core package was installed with the 'msgpack' extra."
+        ) from e
+    return msgpack
 
 
 class DataclassJsonMessageSerializer(MessageSerializer[DataclassT]):
-    def __init__(self, cls: type[DataclassT]) -> None:
-        if contains_a_union(cls):
-            raise ValueError("Dataclass has a union type, which is not supported. To use a union, use a Pydantic model")
+    """Serializes dataclasses as JSON. Fields can be nested dataclasses, Pydantic models, enums, containers of them,
+    and unions. A union of several dataclasses or models names the class of each value with a `"__type__"` key.
+
+    The way to encode and decode a dataclass is worked out once per class and shared by all its serializers.
 
-        if has_nested_dataclass(cls) or has_nested_base_model(cls):
-            raise ValueError(
-                "Dataclass has nested dataclasses or base models, which are not supported. To use nested types, use a Pydantic model"
-            )
+    Raises:
+        ValueError: If the dataclass has a union whose members cannot be told apart once encoded,
+            such as two classes with the same name, or annotations that cannot be resolved.
+    """
 
+    def __init__(self, cls: type[DataclassT]) -> None:
         self.cls = cls
+        self._type_name = _type_name(cls)
+        self._plan = get_type_plan(cls)
 
     @property
     def data_content_type(self) -> str:
@@ -110,14 +117,13 @@ def data_content_type(self) -> str:
 
     @property
     def type_name(self) -> str:
-        return _type_name(self.cls)
+        return self._type_name
 
     def deserialize(self, payload: bytes) -> DataclassT:
-        message_str = payload.decode("utf-8")
-        return self.cls(**json.loads(message_str))
+        return cast(DataclassT, self._plan.decode(_json_loads(payload)))
 
     def serialize(self, message: DataclassT) -> bytes:
-        return json.dumps(asdict(message)).encode("utf-8")
+        return _json_dumps(self._plan.encode(message))
 
 
 PydanticT = TypeVar("PydanticT", bound=BaseModel)
@@ -126,6 +132,7 @@ def serialize(self, message: DataclassT) -> bytes:
 class PydanticJsonMessageSerializer(MessageSerializer[PydanticT]):
     def __init__(self, cls: type[PydanticT]) -> None:
         self.cls = cls
+        self._type_name = _type_name(cls)
 
     @property
     def data_content_type(self) -> str:
@@ -133,14 +140,90 @@ def data_content_type(self) -> str:
 
     @property
     def type_name(self) -> str:
-        return _type_name(self.cls)
+        return self._type_name
+
+    def deserialize(self, payload: bytes) -> PydanticT:
+        return self.cls.model_validate_json(payload)
+
+    def serialize(self, message: PydanticT) -> bytes:
+        # The same as `model_dump_json`, without decoding the JSON to a string.
+        return message.__pydantic_serializer__.to_json(message)
+
+
+class DataclassMsgpackMessageSerializer(MessageSerializer[DataclassT]):
+    """Serializes dataclasses as msgpack, which is more compact and faster to encode than JSON.
+    Supports the same dataclasses as :class:`DataclassJsonMessageSerializer`. Requires the `msgpack` extra."""
+
+    def __init__(self, cls: type[DataclassT]) -> None:
+        self.cls = cls
+        self._type_name = _type_name(cls)
+        self._plan = get_type_plan(cls)
+        self._msgpack = _import_msgpack()
+
+    @property
+    def data_content_type(self) -> str:
+        return MSGPACK_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return self._type_name
+
+    def deserialize(self, payload: bytes) -> DataclassT:
+        return cast(DataclassT, self._plan.decode(self._msgpack.unpackb(payload)))
+
+    def serialize(self, message: DataclassT) -> bytes:
+        return cast(bytes, self._msgpack.packb(self._plan.encode(message), default=_encode_nested_dataclass))
+
+
+class PydanticMsgpackMessageSerializer(MessageSerializer[PydanticT]):
+    """Serializes Pydantic models as msgpack, which is more compact and faster to encode than JSON.
+    Requires the `msgpack` extra."""
+
+    def __init__(self, cls: type[PydanticT]) -> None:
+        self.cls = cls
+        self._type_name = _type_name(cls)
+        self._msgpack = _import_msgpack()
+
+    @property
+    def data_content_type(self) -> str:
+        return MSGPACK_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return self._type_name
 
     def deserialize(self, payload: bytes) -> PydanticT:
-        message_str = payload.decode("utf-8")
-        return self.cls.model_validate_json(message_str)
+        return self.cls.model_validate(self._msgpack.unpackb(payload))
 
     def serialize(self, message: PydanticT) -> bytes:
-        return message.model_dump_json().encode("utf-8")
+        return cast(bytes, self._msgpack.packb(message.model_dump(mode="json")))
+
+
+ProtobufT = TypeVar("ProtobufT", bound=protobuf_message.Message)
+
+
+class ProtobufMessageSerializer(MessageSerializer[ProtobufT]):
+    """Serializes protobuf messages in the protobuf wire format."""
+
+    def __init__(self, cls: type[ProtobufT]) -> None:
+        self.cls = cls
+        self._type_name = _type_name(cls)
+
+    @property
+    def data_content_type(self) -> str:
+        return PROTOBUF_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return self._type_name
+
+    def deserialize(self, payload: bytes) -> ProtobufT:
+        message = self.cls()
+        message.ParseFromString(payload)
+        return message
+
+    def serialize(self, message: ProtobufT) -> bytes:
+        return message.SerializeToString()
 
 
 @dataclass
@@ -160,21 +243,40 @@ def _type_name(cls: type[Any] | Any) -> str:
 V = TypeVar("V")
 
 
+_known_serializers: Dict[type[Any], List[MessageSerializer[Any]]] = {}
+
+
 def try_get_known_serializers_for_type(cls: type[Any]) -> list[MessageSerializer[Any]]:
-    # TODO: Support protobuf types
+    """Get the serializers for a message type. JSON serializers come first, followed by
+    msgpack serializers if the `msgpack` extra is installed. Protobuf messages use the protobuf wire format.
+    Dataclasses are decoded from JSON with orjson if the `orjson` extra is installed.
+
+    The serializers of a type are created once and shared."""
+    known = _known_serializers.get(cls)
+    if known is not None:
+        return list(known)
     serializers: List[MessageSerializer[Any]] = []
     if issubclass(cls, BaseModel):
         serializers.append(PydanticJsonMessageSerializer(cls))
+        if _MSGPACK_AVAILABLE:
+            serializers.append(PydanticMsgpackMessageSerializer(cls))
     elif isinstance(cls, IsDataclass):
         serializers.append(DataclassJsonMessageSerializer(cls))
+        if _MSGPACK_AVAILABLE:
+            serializers.append(DataclassMsgpackMessageSerializer(cls))
+    elif issubclass(cls, protobuf_message.Message):
+        serializers.append(ProtobufMessageSerializer(cls))
 
-    return serializers
+    _known_serializers[cls] = serializers
+    return list(serializers)
 
 
 class SerializationRegistry:
     def __init__(self) -> None:
-        # type_name, data_content_type -> serializer
-        self._serializers: dict[tuple[str, str], MessageSerializer[Any]] = {}
+        # type_name -> data_content_type -> serializer, so that looking up a serializer hashes no tuples.
+        self._serializers: Dict[str, Dict[str, MessageSerializer[Any]]] = {}
+        # The type names of the message classes that were serialized.
+        self._type_names: Dict[type, str] = {}
 
     def add_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSerializer[Any]]) -> None:
         if isinstance(serializer, Sequence):
@@ -182,24 +284,50 @@ def add_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSe
                 self.add_serializer(c)
             return
 
-        self._serializers[(serializer.type_name, serializer.data_content_type)] = serializer
+        self._serializers.setdefault(serializer.type_name, {})[serializer.data_content_type] = serializer
+
+    def get_serializer(self, type_name: str, data_content_type: str) -> MessageSerializer[Any] | None:
+        """Get the serializer of a type for a content type. Returns None if no such serializer is registered."""
+        serializers = self._serializers.get(type_name)
+        if serializers is None:
+            return None
+        return serializers.get(data_content_type)
 
     def deserialize(self, payload: bytes, *, type_name: str, data_content_type: str) -> Any:
-        serializer = self._serializers.get((type_name, data_content_type))
+        serializer = self.get_serializer(type_name, data_content_type)
         if serializer is None:
             return UnknownPayload(type_name, data_content_type, payload)
 
         return serializer.deserialize(payload)
 
     def serialize(self, message: Any, *, type_name: str, data_content_type: str) -> bytes:
-        serializer = self._serializers.get((type_name, data_content_type))
+        serializer = self.get_serializer(type_name, data_content_type)
         if serializer is None:
             raise ValueError(f"Unknown type {type_name} with content type {data_content_type}")
 
         return serializer.serialize(message)
 
     def is_registered(self, type_name: str, data_content_type: str) -> bool:
-        return (type_name, data_content_type) in self._serializers
+        return self.get_serializer(type_name, data_content_type) is not None
+
+    def select_data_content_type(self, type_name: str, preferred: Sequence[str]) -> str:
+        """Select the first of the preferred content types for which a serializer of the type is registered.
+        If there is none, fall back to any registered content type of the type.
+
+        Raises:
+            ValueError: If no serializer is registered for the type.
+        """
+        serializers = self._serializers.get(type_name)
+        if not serializers:
+            raise ValueError(f"Unknown type {type_name}")
+        for data_content_type in preferred:
+            if data_content_type in serializers:
+                return data_content_type
+        return next(iter(serializers))
 
     def type_name(self, message: Any) -> str:
-        return _type_name(message)
+        cls = type(message)
+        type_name = self._type_names.get(cls)
+        if type_name is None:
+            type_name = self._type_names[cls] = _type_name(message)
+        return type_name
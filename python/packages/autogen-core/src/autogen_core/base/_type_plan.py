@@ -0,0 +1,285 @@
+import enum
+import threading
+import weakref
+from collections.abc import Mapping as AbcMapping
+from collections.abc import Sequence as AbcSequence
+from collections.abc import Set as AbcSet
+from dataclasses import fields
+from types import NoneType, UnionType
+from typing import Any, Callable, Dict, List, Literal, Tuple, Union, get_args, get_origin, get_type_hints
+from weakref import WeakKeyDictionary
+
+from pydantic import BaseModel
+
+from ._type_helpers import is_union
+
+UNION_TAG_KEY = "__type__"
+"""The key that names the class of a dataclass or Pydantic model encoded in a union of several such classes."""
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _uncompiled(value: Any) -> Any:
+    raise RuntimeError("The plan is being compiled.")
+
+
+class TypePlan:
+    """Converts values of a type to and from JSON compatible values: dicts, lists, strings, numbers, booleans and None.
+
+    Dataclasses become dicts of their fields, Pydantic models dicts of their JSON fields, enums their values, and tuples and sets lists.
+    A union of several dataclasses or models encodes each of them with its class name under :data:`UNION_TAG_KEY`,
+    so that decoding knows which class to create.
+
+    Plans are compiled once per type by :func:`get_type_plan`. A plan refers to its type weakly where possible,
+    so that the cached plans do not keep the types alive.
+    """
+
+    def __init__(self, tp: Any) -> None:
+        try:
+            self._type_ref: Callable[[], Any] = weakref.ref(tp)
+        except TypeError:
+            self._type_ref = lambda: tp
+        self.encode: Callable[[Any], Any] = _identity
+        """Convert a value of the type to a JSON compatible value."""
+        self.decode: Callable[[Any], Any] = _identity
+        """Convert a JSON compatible value back to a value of the type."""
+        # The kind of JSON value of the encoded values, if known: "object" or "array".
+        self.json_kind: str | None = None
+
+    @property
+    def type(self) -> Any:
+        return self._type_ref()
+
+    @property
+    def is_identity(self) -> bool:
+        """Whether the values of the type are JSON compatible as they are."""
+        return self.encode is _identity and self.decode is _identity
+
+
+# The plans of the types that can be weakly referenced, and of the few that cannot.
+_plans: WeakKeyDictionary[Any, TypePlan] = WeakKeyDictionary()
+_unreferenceable_plans: Dict[Any, TypePlan] = {}
+_plans_lock = threading.RLock()
+
+
+def _plan_cache(tp: Any) -> Any:
+    try:
+        weakref.ref(tp)
+    except TypeError:
+        return _unreferenceable_plans
+    return _plans
+
+
+def get_type_plan(tp: Any) -> TypePlan:
+    """Get the plan of a type, compiling it the first time.
+
+    Raises:
+        ValueError: If the type contains a union whose members cannot be told apart once encoded,
+            or a dataclass with annotations that cannot be resolved, such as forward references to names local to a function.
+    """
+    if isinstance(tp, UnionType):
+        # `X | Y` unions cannot be weakly referenced, unlike the equivalent `Union[X, Y]`.
+        tp = Union[get_args(tp)]  # type: ignore[valid-type]
+    plans = _plan_cache(tp)
+    plan: TypePlan | None = plans.get(tp)
+    if plan is not None:
+        return plan
+    with _plans_lock:
+        plan = plans.get(tp)
+        if plan is not None:
+            return plan
+        plan = TypePlan(tp)
+        # The plan is cached before it is compiled, so that recursive types refer to it.
+        plans[tp] = plan
+        try:
+            _compile(plan)
+        except BaseException:
+            del plans[tp]
+            raise
+        return plan
+
+
+def is_dataclass_type(tp: Any) -> bool:
+    return isinstance(tp, type) and hasattr(tp, "__dataclass_fields__")
+
+
+def _compile(plan: TypePlan) -> None:
+    tp = plan.type
+    origin = get_origin(tp)
+    if is_dataclass_type(tp):
+        _compile_dataclass(plan)
+    elif isinstance(tp, type) and issubclass(tp, BaseModel):
+        # The functions get the class from the plan, so that they do not keep it alive.
+        plan.encode = lambda value: value.model_dump(mode="json")
+        plan.decode = lambda data: plan.type.model_validate(data)
+        plan.json_kind = "object"
+    elif isinstance(tp, type) and issubclass(tp, enum.Enum):
+        plan.encode = lambda value: value.value
+        plan.decode = lambda data: plan.type(data)
+    elif is_union(tp):
+        _compile_union(plan, get_args(tp))
+    elif origin is Literal:
+        pass
+    elif origin in (list, set, frozenset, AbcSequence, AbcSet) or (origin is tuple and _is_variadic(tp)):
+        _compile_sequence(plan, origin)
+    elif origin is tuple:
+        _compile_tuple(plan)
+    elif origin in (dict, AbcMapping):
+        _compile_mapping(plan)
+    elif tp in (list, tuple, set, frozenset):
+        plan.json_kind = "array"
+        if tp is not list:
+            plan.encode = list
+            plan.decode = tp
+    elif tp is dict:
+        plan.json_kind = "object"
+
+
+def _compile_dataclass(plan: TypePlan) -> None:
+    cls = plan.type
+    # The plans that refer to this one while its fields are compiled must not take it for an identity.
+    plan.encode = plan.decode = _uncompiled
+    plan.json_kind = "object"
+    try:
+        hints = get_type_hints(cls)
+    except NameError as e:
+        raise ValueError(f"The annotations of dataclass {cls.__name__} cannot be resolved: {e}") from e
+    field_plans = [(f.name, get_type_plan(hints.get(f.name, Any))) for f in fields(cls) if f.init]
+    names = tuple(name for name, _ in field_plans)
+    nested = [(name, field_plan) for name, field_plan in field_plans if not field_plan.is_identity]
+    if not nested:
+        plan.encode = lambda value: {name: getattr(value, name) for name in names}
+        plan.decode = lambda data: plan.type(**data)
+        return
+    nested_names = frozenset(name for name, _ in nested)
+    plain_names = tuple(name for name in names if name not in nested_names)
+
+    # The plans of the nested fields are looked up on each call, since a recursive dataclass refers to its own plan before it is compiled.
+    def encode(value: Any) -> Any:
+        data = {name: getattr(value, name) for name in plain_names}
+        for name, field_plan in nested:
+            data[name] = field_plan.encode(getattr(value, name))
+        return data
+
+    def decode(data: Any) -> Any:
+        for name, field_plan in nested:
+            if name in data:
+                data[name] = field_plan.decode(data[name])
+        return plan.type(**data)
+
+    plan.encode = encode
+    plan.decode = decode
+
+
+def _is_variadic(tp: Any) -> bool:
+    args = get_args(tp)
+    return len(args) == 2 and args[1] is Ellipsis
+
+
+def _compile_sequence(plan: TypePlan, origin: Any) -> None:
+    args = get_args(plan.type)
+    item_plan = get_type_plan(args[0] if args else Any)
+    container: Callable[[Any], Any] = list if origin in (list, AbcSequence) else origin if origin is not AbcSet else set
+    plan.json_kind = "array"
+    if item_plan.is_identity:
+        if container is not list:
+            plan.encode = list
+            plan.decode = container
+        return
+    plan.encode = lambda value: [item_plan.encode(item) for item in value]
+    plan.decode = lambda data: container(item_plan.decode(item) for item in data)
+
+
+def _compile_tuple(plan: TypePlan) -> None:
+    item_plans = [get_type_plan(arg) for arg in get_args(plan.type)]
+    plan.json_kind = "array"
+    plan.encode = lambda value: [item_plan.encode(item) for item_plan, item in zip(item_plans, value, strict=True)]
+    plan.decode = lambda data: tuple(item_plan.decode(item) for item_plan, item in zip(item_plans, data, strict=True))
+
+
+def _compile_mapping(plan: TypePlan) -> None:
+    args = get_args(plan.type)
+    value_plan = get_type_plan(args[1] if len(args) == 2 else Any)
+    plan.json_kind = "object"
+    if value_plan.is_identity:
+        return
+    plan.encode = lambda value: {key: value_plan.encode(item) for key, item in value.items()}
+    plan.decode = lambda data: {key: value_plan.decode(item) for key, item in data.items()}
+
+
+def _compile_union(plan: TypePlan, members: Tuple[Any, ...]) -> None:
+    member_plans = [get_type_plan(member) for member in members if member is not NoneType]
+    structured: Dict[str, TypePlan] = {}
+    by_kind: Dict[str, List[TypePlan]] = {"object": [], "array": []}
+    for member_plan in member_plans:
+        member = member_plan.type
+        if is_dataclass_type(member) or (isinstance(member, type) and issubclass(member, BaseModel)):
+            if member.__name__ in structured:
+                raise ValueError(f"The union {plan.type} has several classes named {member.__name__}.")
+            structured[member.__name__] = member_plan
+        elif member_plan.json_kind is not None:
+            by_kind[member_plan.json_kind].append(member_plan)
+    if len(by_kind["array"]) > 1 or (structured and by_kind["object"]):
+        raise ValueError(f"The members of the union {plan.type} cannot be told apart once encoded.")
+    if all(member_plan.is_identity for member_plan in member_plans):
+        return
+
+    tagged = len(structured) > 1
+    object_plan = by_kind["object"][0] if by_kind["object"] else None
+    if len(structured) == 1:
+        object_plan = next(iter(structured.values()))
+    array_plan = by_kind["array"][0] if by_kind["array"] else None
+    # Members that are neither objects nor arrays, such as enums, are tried in order when encoding and decoding a scalar.
+    scalar_plans = [member_plan for member_plan in member_plans if member_plan.json_kind is None]
+
+    def structured_member(value: Any) -> Tuple[str, TypePlan] | None:
+        # Instances of subclasses of a member are encoded as the member.
+        for cls in type(value).__mro__:
+            member_plan = structured.get(cls.__name__)
+            if member_plan is not None and member_plan.type is cls:
+                return cls.__name__, member_plan
+        return None
+
+    def encode(value: Any) -> Any:
+        if value is None:
+            return None
+        member = structured_member(value) if structured else None
+        if member is not None:
+            name, member_plan = member
+            data = member_plan.encode(value)
+            if tagged:
+                data[UNION_TAG_KEY] = name
+            return data
+        if object_plan is not None and isinstance(value, (dict, AbcMapping)):
+            return object_plan.encode(value)
+        if array_plan is not None and isinstance(value, (list, tuple, set, frozenset)):
+            return array_plan.encode(value)
+        for scalar_plan in scalar_plans:
+            if isinstance(scalar_plan.type, type) and isinstance(value, scalar_plan.type):
+                return scalar_plan.encode(value)
+        return value
+
+    def decode(data: Any) -> Any:
+        if isinstance(data, dict):
+            if tagged:
+                name = data.pop(UNION_TAG_KEY, None)
+                if name not in structured:
+                    raise ValueError(f"The value does not name a member of the union {plan.type}.")
+                return structured[name].decode(data)
+            return data if object_plan is None else object_plan.decode(data)
+        if isinstance(data, list):
+            return data if array_plan is None else array_plan.decode(data)
+        for scalar_plan in scalar_plans:
+            if isinstance(scalar_plan.type, type) and issubclass(scalar_plan.type, enum.Enum):
+                try:
+                    return scalar_plan.decode(data)
+                except ValueError:
+                    continue
+            elif isinstance(scalar_plan.type, type) and isinstance(data, scalar_plan.type):
+                return data
+        return data
+
+    plan.encode = encode
+    plan.decode = decode
@@ -6,7 +6,7 @@
 from ._default_subscription import DefaultSubscription, default_subscription, type_subscription
 from ._default_topic import DefaultTopicId
 from ._image import Image
-from ._routed_agent import RoutedAgent, TypeRoutedAgent, event, message_handler, rpc
+from ._routed_agent import FieldMatch, RoutedAgent, TypeRoutedAgent, event, message_handler, rpc
 from ._type_subscription import TypeSubscription
 from ._types import FunctionCall
 
@@ -18,6 +18,7 @@
     "message_handler",
     "event",
     "rpc",
+    "FieldMatch",
     "FunctionCall",
     "TypeSubscription",
     "DefaultSubscription",
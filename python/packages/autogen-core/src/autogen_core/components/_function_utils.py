@@ -1,6 +1,7 @@
 # File based from: https://github.com/microsoft/autogen/blob/47f905267245e143562abfb41fcba503a9e1d56d/autogen/function_utils.py
 # Credit to original authors
 
+import copy
 import inspect
 from logging import getLogger
 from typing import (
@@ -20,6 +21,7 @@
     get_args,
     get_origin,
 )
+from weakref import WeakKeyDictionary
 
 from pydantic import BaseModel, Field, create_model  # type: ignore
 from pydantic_core import PydanticUndefined
@@ -31,6 +33,27 @@
 
 T = TypeVar("T")
 
+# Schemas and argument models are built once per function and name, and dropped with the function.
+_function_schemas: WeakKeyDictionary[Callable[..., Any], Dict[Tuple[Optional[str], str], Dict[str, Any]]] = (
+    WeakKeyDictionary()
+)
+_args_models: WeakKeyDictionary[Callable[..., Any], Dict[str, Tuple[inspect.Signature, Type[BaseModel]]]] = (
+    WeakKeyDictionary()
+)
+
+
+def _function_cache_entries(
+    cache: WeakKeyDictionary[Callable[..., Any], Dict[Any, T]], f: Callable[..., Any]
+) -> Dict[Any, T] | None:
+    """Get the entries of a function in a cache. Returns None if the function cannot be weakly referenced or hashed."""
+    try:
+        entries = cache.get(f)
+        if entries is None:
+            entries = cache[f] = {}
+    except TypeError:
+        return None
+    return entries
+
 
 def get_typed_annotation(annotation: Any, globalns: Dict[str, Any]) -> Any:
     """Get the type annotation of a parameter.
@@ -268,6 +291,10 @@ def f(
             #           'required': ['a']}}}
 
     """
+    entries = _function_cache_entries(_function_schemas, f)
+    if entries is not None and (name, description) in entries:
+        return copy.deepcopy(entries[(name, description)])
+
     typed_signature = get_typed_signature(f)
     required = get_required_params(typed_signature)
     default_values = get_default_values(typed_signature)
@@ -307,7 +334,10 @@ def f(
         )
     )
 
-    return model_dump(function)
+    schema = model_dump(function)
+    if entries is not None:
+        entries[(name, description)] = copy.deepcopy(schema)
+    return schema
 
 
 def normalize_annotated_type(type_hint: Type[Any]) -> Type[Any]:
@@ -335,3 +365,23 @@ def args_base_model_from_signature(name: str, sig: inspect.Signature) -> Type[Ba
         fields[name] = (type, Field(default=default_value, description=description))
 
     return cast(BaseModel, create_model(name, **fields))  # type: ignore
+
+
+def get_function_args_model(f: Callable[..., Any], name: str) -> Tuple[inspect.Signature, Type[BaseModel]]:
+    """Get the typed signature of a function and a Pydantic model of its arguments, building them the first time.
+
+    Args:
+        f: The function
+        name: The name of the model
+
+    Returns:
+        The typed signature of the function and the model of its arguments, other than `cancellation_token`
+    """
+    entries = _function_cache_entries(_args_models, f)
+    if entries is not None and name in entries:
+        return entries[name]
+    signature = get_typed_signature(f)
+    result = (signature, args_base_model_from_signature(name, signature))
+    if entries is not None:
+        entries[name] = result
+    return result
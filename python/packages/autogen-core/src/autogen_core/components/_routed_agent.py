@@ -1,13 +1,17 @@
 import logging
 import warnings
+import weakref
 from functools import wraps
+from types import MappingProxyType
 from typing import (
     Any,
     Callable,
+    ClassVar,
     Coroutine,
-    DefaultDict,
+    Dict,
     List,
     Literal,
+    Mapping,
     Protocol,
     Sequence,
     Tuple,
@@ -47,7 +51,89 @@ class MessageHandler(Protocol[AgentT, ReceivesT, ProducesT]):  # type: ignore
     async def __call__(agent_instance: AgentT, message: ReceivesT, ctx: MessageContext) -> ProducesT: ...
 
 
-# NOTE: this works on concrete types and not inheritance
+_MISSING = object()
+
+
+class FieldMatch:
+    """A `match` condition for message handlers that is true when fields of the message have the given values.
+
+    Unlike an arbitrary function, this condition is known to the agent, so a :class:`RoutedAgent` finds the handlers of
+    a message by looking up the values of its fields instead of trying the condition of every handler in turn.
+
+    .. code-block:: python
+
+        from autogen_core.base import MessageContext
+        from autogen_core.components import FieldMatch, RoutedAgent, rpc
+
+
+        class MyAgent(RoutedAgent):
+            @rpc(match=FieldMatch(command="start"))
+            async def on_start(self, message: Command, ctx: MessageContext) -> Response: ...
+
+            @rpc(match=FieldMatch(command="stop"))
+            async def on_stop(self, message: Command, ctx: MessageContext) -> Response: ...
+
+    Args:
+        **values: The values of the fields, by field name.
+    """
+
+    def __init__(self, **values: Any) -> None:
+        if not values:
+            raise ValueError("FieldMatch needs at least one field.")
+        self._values = values
+
+    @property
+    def values(self) -> Mapping[str, Any]:
+        return MappingProxyType(self._values)
+
+    def __call__(self, message: Any, ctx: MessageContext) -> bool:
+        return all(getattr(message, name, _MISSING) == value for name, value in self._values.items())
+
+    def __repr__(self) -> str:
+        return f"FieldMatch({', '.join(f'{name}={value!r}' for name, value in self._values.items())})"
+
+
+class _Route:
+    """The handlers of a message type in the order in which their routers are tried, with an index of the handlers
+    whose `match` is a :class:`FieldMatch` by the values of their fields."""
+
+    def __init__(self, handlers: Sequence["MessageHandler[Any, Any, Any]"]) -> None:
+        self.handlers = tuple(handlers)
+        # The positions of the handlers by the values of their fields, for each set of field names.
+        indexes: Dict[Tuple[str, ...], Dict[Tuple[Any, ...], List[int]]] = {}
+        unindexed: List[int] = []
+        for position, handler in enumerate(self.handlers):
+            match_fields: FieldMatch | None = getattr(handler, "match_fields", None)
+            if match_fields is not None:
+                names = tuple(match_fields.values)
+                key = tuple(match_fields.values.values())
+                try:
+                    indexes.setdefault(names, {}).setdefault(key, []).append(position)
+                    continue
+                except TypeError:
+                    # The values cannot be hashed.
+                    pass
+            unindexed.append(position)
+        self._indexes = tuple(indexes.items())
+        self._unindexed = tuple(unindexed)
+
+    def candidates(self, message: Any) -> Sequence["MessageHandler[Any, Any, Any]"]:
+        """Get the handlers that may handle a message, in order. Their routers must still be tried."""
+        if not self._indexes:
+            return self.handlers
+        positions = list(self._unindexed)
+        for names, index in self._indexes:
+            try:
+                hits = index.get(tuple(getattr(message, name) for name in names))
+            except (AttributeError, TypeError):
+                # A field is missing or cannot be hashed, so the conditions are tried one by one.
+                return self.handlers
+            if hits is not None:
+                positions.extend(hits)
+        positions.sort()
+        return [self.handlers[position] for position in positions]
+
+
 # TODO: Use a protocol for the outer function to check checked arg names
 
 
@@ -135,11 +221,14 @@ def decorator(
         if return_types is None:
             raise AssertionError("Return type not found")
 
-        # Convert target_types to list and stash
+        # The type checks are done against sets, which are built once per handler.
+        target_type_set = frozenset(target_types)
+        target_type_tuple = tuple(target_types)
+        return_type_set = None if AnyType in return_types else frozenset(return_types)
 
         @wraps(func)
         async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> ProducesT:
-            if type(message) not in target_types:
+            if type(message) not in target_type_set and not isinstance(message, target_type_tuple):
                 if strict:
                     raise CantHandleException(f"Message type {type(message)} not in target types {target_types}")
                 else:
@@ -147,7 +236,7 @@ async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> Prod
 
             return_value = await func(self, message, ctx)
 
-            if AnyType not in return_types and type(return_value) not in return_types:
+            if return_type_set is not None and type(return_value) not in return_type_set:
                 if strict:
                     raise ValueError(f"Return type {type(return_value)} not in return types {return_types}")
                 else:
@@ -160,6 +249,7 @@ async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> Prod
         wrapper_handler.produces_types = list(return_types)
         wrapper_handler.is_message_handler = True
         wrapper_handler.router = match or (lambda _message, _ctx: True)
+        wrapper_handler.match_fields = match if isinstance(match, FieldMatch) else None  # type: ignore[attr-defined]
 
         return wrapper_handler
 
@@ -254,11 +344,12 @@ def decorator(
         if return_types is None:
             raise AssertionError("Return type not found. Please use `None` as the type hint of the return type.")
 
-        # Convert target_types to list and stash
+        target_type_set = frozenset(target_types)
+        target_type_tuple = tuple(target_types)
 
         @wraps(func)
         async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> None:
-            if type(message) not in target_types:
+            if type(message) not in target_type_set and not isinstance(message, target_type_tuple):
                 if strict:
                     raise CantHandleException(f"Message type {type(message)} not in target types {target_types}")
                 else:
@@ -280,6 +371,7 @@ async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> None
         wrapper_handler.is_message_handler = True
         # Wrap the match function with a check on the is_rpc flag.
         wrapper_handler.router = lambda _message, _ctx: (not _ctx.is_rpc) and (match(_message, _ctx) if match else True)
+        wrapper_handler.match_fields = match if isinstance(match, FieldMatch) else None  # type: ignore[attr-defined]
 
         return wrapper_handler
 
@@ -375,11 +467,14 @@ def decorator(
         if return_types is None:
             raise AssertionError("Return type not found")
 
-        # Convert target_types to list and stash
+        # The type checks are done against sets, which are built once per handler.
+        target_type_set = frozenset(target_types)
+        target_type_tuple = tuple(target_types)
+        return_type_set = None if AnyType in return_types else frozenset(return_types)
 
         @wraps(func)
         async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> ProducesT:
-            if type(message) not in target_types:
+            if type(message) not in target_type_set and not isinstance(message, target_type_tuple):
                 if strict:
                     raise CantHandleException(f"Message type {type(message)} not in target types {target_types}")
                 else:
@@ -387,7 +482,7 @@ async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> Prod
 
             return_value = await func(self, message, ctx)
 
-            if AnyType not in return_types and type(return_value) not in return_types:
+            if return_type_set is not None and type(return_value) not in return_type_set:
                 if strict:
                     raise ValueError(f"Return type {type(return_value)} not in return types {return_types}")
                 else:
@@ -400,6 +495,7 @@ async def wrapper(self: AgentT, message: ReceivesT, ctx: MessageContext) -> Prod
         wrapper_handler.produces_types = list(return_types)
         wrapper_handler.is_message_handler = True
         wrapper_handler.router = lambda _message, _ctx: (_ctx.is_rpc) and (match(_message, _ctx) if match else True)
+        wrapper_handler.match_fields = match if isinstance(match, FieldMatch) else None  # type: ignore[attr-defined]
 
         return wrapper_handler
 
@@ -418,6 +514,10 @@ class RoutedAgent(BaseAgent):
     To create a routed agent, subclass this class and add message handlers as methods decorated with
     either :func:`event` or :func:`rpc` decorator.
 
+    A message is routed to the handlers of its type and then to those of the classes it derives from, most specific first.
+    Among these, the first handler whose `match` condition is true handles the message. Handlers whose condition is a
+    :class:`FieldMatch` are found by looking up the fields of the message, so an agent with many of them does not try every condition.
+
     Example:
 
     .. code-block:: python
@@ -440,27 +540,47 @@ async def handle_special_rpc_message(self, message: MessageWithContent, ctx: Mes
                 return Response()
     """
 
-    def __init__(self, description: str) -> None:
-        # Self is already bound to the handlers
-        self._handlers: DefaultDict[
-            Type[Any],
-            List[MessageHandler[RoutedAgent, Any, Any]],
-        ] = DefaultDict(list)
+    # The handlers of the class in alphabetical order, and the handlers of each message type in the order in which
+    # their routers are tried. Both are built once per class, when the class is created, and shared by its instances.
+    _message_handlers: ClassVar[Tuple[MessageHandler[Any, Any, Any], ...]] = ()
+    _handler_table: ClassVar[Mapping[Type[Any], Tuple[MessageHandler[Any, Any, Any], ...]]] = MappingProxyType({})
+    # The route of each message type that was received, including subclasses of the handled types. None if there is no handler.
+    # The message types are held weakly, so that the routes of classes that are created at runtime do not keep them alive.
+    _routes: ClassVar[weakref.WeakKeyDictionary[Type[Any], _Route | None]] = weakref.WeakKeyDictionary()
 
-        handlers = self._discover_handlers()
-        for message_handler in handlers:
-            for target_type in message_handler.target_types:
-                self._handlers[target_type].append(message_handler)
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        handlers: List[MessageHandler[Any, Any, Any]] = []
+        for attr in dir(cls):
+            if callable(getattr(cls, attr, None)):
+                # Since we are getting it from the class, self is not bound
+                handler = getattr(cls, attr)
+                if hasattr(handler, "is_message_handler"):
+                    handlers.append(cast(MessageHandler[Any, Any, Any], handler))
+        table: Dict[Type[Any], List[MessageHandler[Any, Any, Any]]] = {}
+        for handler in handlers:
+            for target_type in handler.target_types:
+                table.setdefault(target_type, []).append(handler)
+        cls._message_handlers = tuple(handlers)
+        cls._handler_table = MappingProxyType({key: tuple(value) for key, value in table.items()})
+        cls._routes = weakref.WeakKeyDictionary()
 
+    def __init__(self, description: str) -> None:
+        # The handlers are not bound to the instance, so the table of the class is used as it is.
+        self._handlers = type(self)._handler_table
         super().__init__(description)
 
     async def on_message(self, message: Any, ctx: MessageContext) -> Any | None:
         """Handle a message by routing it to the appropriate message handler.
         Do not override this method in subclasses. Instead, add message handlers as methods decorated with
         either the :func:`event` or :func:`rpc` decorator."""
-        key_type: Type[Any] = type(message)  # type: ignore
-        handlers = self._handlers.get(key_type)  # type: ignore
-        if handlers is not None:
+        message_type: Type[Any] = type(message)
+        try:
+            route = self._routes[message_type]
+        except KeyError:
+            route = self._resolve_route(message_type)
+        if route is not None:
+            handlers = route.candidates(message)
             # Iterate over all handlers for this matching message type.
             # Call the first handler whose router returns True and then return the result.
             for h in handlers:
@@ -474,15 +594,18 @@ async def on_unhandled_message(self, message: Any, ctx: MessageContext) -> None:
         logger.info(f"Unhandled message: {message}")
 
     @classmethod
-    def _discover_handlers(cls) -> Sequence[MessageHandler[Any, Any, Any]]:
+    def _resolve_route(cls, message_type: Type[Any]) -> _Route | None:
+        """Find the handlers of a message type and of the classes it derives from, most specific class first, and cache them."""
         handlers: List[MessageHandler[Any, Any, Any]] = []
-        for attr in dir(cls):
-            if callable(getattr(cls, attr, None)):
-                # Since we are getting it from the class, self is not bound
-                handler = getattr(cls, attr)
-                if hasattr(handler, "is_message_handler"):
-                    handlers.append(cast(MessageHandler[Any, Any, Any], handler))
-        return handlers
+        for base in message_type.__mro__:
+            handlers.extend(cls._handler_table.get(base, ()))
+        route = _Route(handlers) if handlers else None
+        cls._routes[message_type] = route
+        return route
+
+    @classmethod
+    def _discover_handlers(cls) -> Sequence[MessageHandler[Any, Any, Any]]:
+        return cls._message_handlers
 
     @classmethod
     def _handles_types(cls) -> List[Tuple[Type[Any], List[MessageSerializer[Any]]]]:
@@ -497,7 +620,7 @@ def _handles_types(cls) -> List[Tuple[Type[Any], List[MessageSerializer[Any]]]]:
                 if len(serializers) == 0:
                     raise ValueError(f"No serializers found for type {t}.")
 
-                types.append((t, try_get_known_serializers_for_type(t)))
+                types.append((t, serializers))
         return types
 
 
@@ -1,7 +1,9 @@
+import copy
 import json
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
 from typing import Any, Dict, Generic, Mapping, Protocol, Type, TypedDict, TypeVar, runtime_checkable
+from weakref import WeakKeyDictionary
 
 from pydantic import BaseModel
 from typing_extensions import NotRequired
@@ -54,6 +56,17 @@ def load_state_json(self, state: Mapping[str, Any]) -> None: ...
 ReturnT = TypeVar("ReturnT", bound=BaseModel, covariant=True)
 StateT = TypeVar("StateT", bound=BaseModel)
 
+# The JSON schemas of argument models, which are shared by the tools created from the same function.
+_args_schemas: WeakKeyDictionary[Type[BaseModel], Dict[str, Any]] = WeakKeyDictionary()
+
+
+def _args_json_schema(args_type: Type[BaseModel]) -> Dict[str, Any]:
+    model_schema = _args_schemas.get(args_type)
+    if model_schema is None:
+        model_schema = args_type.model_json_schema()
+        _args_schemas[args_type] = model_schema
+    return model_schema
+
 
 class BaseTool(ABC, Tool, Generic[ArgsT, ReturnT]):
     def __init__(
@@ -68,10 +81,18 @@ def __init__(
         self._return_type = normalize_annotated_type(return_type)
         self._name = name
         self._description = description
+        self._schema: ToolSchema | None = None
 
     @property
     def schema(self) -> ToolSchema:
-        model_schema = self._args_type.model_json_schema()
+        # The schema is built once and shares its parts with the tools of the same argument model,
+        # so each access returns a copy that the caller may modify.
+        if self._schema is None:
+            self._schema = self._build_schema()
+        return copy.deepcopy(self._schema)
+
+    def _build_schema(self) -> ToolSchema:
+        model_schema = _args_json_schema(self._args_type)
 
         tool_schema = ToolSchema(
             name=self._name,
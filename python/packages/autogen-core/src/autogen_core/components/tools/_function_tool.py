@@ -5,10 +5,7 @@
 from pydantic import BaseModel
 
 from ...base import CancellationToken
-from .._function_utils import (
-    args_base_model_from_signature,
-    get_typed_signature,
-)
+from .._function_utils import get_function_args_model
 from ._base import BaseTool
 
 
@@ -61,9 +58,8 @@ async def get_stock_price(ticker: str, date: Annotated[str, "Date in YYYY/MM/DD"
 
     def __init__(self, func: Callable[..., Any], description: str, name: str | None = None) -> None:
         self._func = func
-        signature = get_typed_signature(func)
         func_name = name or func.__name__
-        args_model = args_base_model_from_signature(func_name + "args", signature)
+        signature, args_model = get_function_args_model(func, func_name + "args")
         return_type = signature.return_annotation
         self._has_cancellation_support = "cancellation_token" in signature.parameters
 
@@ -1,9 +1,11 @@
+import asyncio
+
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
 from autogen_core.base import AgentId
 from autogen_core.base.exceptions import MessageDroppedException
 from autogen_core.base.intervention import DefaultInterventionHandler, DropMessage
-from test_utils import LoopbackAgent, MessageType
+from test_utils import ContentMessage, LoopbackAgent, MessageType
 
 
 @pytest.mark.asyncio
@@ -127,3 +129,51 @@ async def on_response(
 
     long_running_agent = await runtime.try_get_underlying_agent_instance(loopback, type=LoopbackAgent)
     assert long_running_agent.num_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_intervention_does_not_block_other_messages() -> None:
+    release = asyncio.Event()
+
+    class SlowInterventionHandler(DefaultInterventionHandler):
+        async def on_send(
+            self, message: ContentMessage, *, sender: AgentId | None, recipient: AgentId
+        ) -> ContentMessage:
+            if message.content == "slow":
+                await release.wait()
+            return message
+
+    runtime = SingleThreadedAgentRuntime(intervention_handlers=[SlowInterventionHandler()])
+    await runtime.register("name", LoopbackAgent)
+    loopback = AgentId("name", key="default")
+    runtime.start()
+
+    slow = asyncio.create_task(runtime.send_message(ContentMessage("slow"), recipient=loopback))
+    fast = await asyncio.wait_for(runtime.send_message(ContentMessage("fast"), recipient=loopback), timeout=5)
+    assert fast == ContentMessage("fast")
+    assert not slow.done()
+
+    release.set()
+    assert await slow == ContentMessage("slow")
+    await runtime.stop_when_idle()
+
+
+@pytest.mark.asyncio
+async def test_intervention_metrics_skip_inherited_hooks() -> None:
+    class SendOnlyInterventionHandler(DefaultInterventionHandler):
+        async def on_send(self, message: MessageType, *, sender: AgentId | None, recipient: AgentId) -> MessageType:
+            return message
+
+    runtime = SingleThreadedAgentRuntime(intervention_handlers=[SendOnlyInterventionHandler()])
+    await runtime.register("name", LoopbackAgent)
+    loopback = AgentId("name", key="default")
+    runtime.start()
+
+    await runtime.send_message(MessageType(), recipient=loopback)
+    await runtime.send_message(MessageType(), recipient=loopback)
+    await runtime.stop_when_idle()
+
+    # on_publish and on_response are inherited from DefaultInterventionHandler, so they are not called.
+    metrics = runtime.intervention_metrics
+    assert [(m.handler, m.hook, m.calls) for m in metrics] == [("SendOnlyInterventionHandler", "on_send", 2)]
+    assert metrics[0].total_time >= metrics[0].max_time >= 0
@@ -1,11 +1,13 @@
+import gc
 import logging
+import weakref
 from dataclasses import dataclass
-from typing import Callable, cast
+from typing import Any, Callable, cast
 
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
 from autogen_core.base import AgentId, MessageContext, TopicId
-from autogen_core.components import RoutedAgent, TypeSubscription, event, message_handler, rpc
+from autogen_core.components import FieldMatch, RoutedAgent, TypeSubscription, event, message_handler, rpc
 from test_utils import LoopbackAgent
 
 
@@ -207,3 +209,115 @@ async def test_rpc() -> None:
     agent = await runtime.try_get_underlying_agent_instance(agent_id, type=RPCAgent)
     assert agent.num_calls[0] == 1
     assert agent.num_calls[1] == 1
+
+
+class OverridingRPCAgent(RPCAgent):
+    @rpc(match=lambda msg, ctx: msg.value == "one")  # type: ignore
+    async def on_rpc_one(self, message: TestMessage, ctx: MessageContext) -> TestMessage:
+        return TestMessage("overridden")
+
+
+@pytest.mark.asyncio
+async def test_handler_table_is_built_per_class() -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await runtime.register("base", RPCAgent)
+    await runtime.register("overriding", OverridingRPCAgent)
+
+    base = await runtime.try_get_underlying_agent_instance(AgentId("base", "a"), type=RPCAgent)
+    other = await runtime.try_get_underlying_agent_instance(AgentId("base", "b"), type=RPCAgent)
+    # The instances of a class share the handler table of the class.
+    assert base._handlers is other._handlers  # type: ignore[reportPrivateUsage]
+
+    runtime.start()
+    assert await runtime.send_message(TestMessage("one"), recipient=AgentId("base", "a")) == TestMessage("one")
+    assert await runtime.send_message(TestMessage("one"), recipient=AgentId("overriding", "a")) == TestMessage(
+        "overridden"
+    )
+    assert await runtime.send_message(TestMessage("two"), recipient=AgentId("overriding", "a")) == TestMessage("two")
+    await runtime.stop_when_idle()
+
+
+@dataclass
+class SpecialTestMessage(TestMessage):
+    extra: int = 0
+
+
+@dataclass
+class CommandMessage:
+    command: Any
+    target: str = ""
+
+
+class FieldMatchAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent with field matched handlers.")
+
+    @rpc(match=FieldMatch(command="start"))
+    async def a_on_start(self, message: CommandMessage, ctx: MessageContext) -> str:
+        return "start"
+
+    @rpc(match=lambda msg, ctx: msg.target == "any")  # type: ignore
+    async def b_on_any_target(self, message: CommandMessage, ctx: MessageContext) -> str:
+        return "any"
+
+    @rpc(match=FieldMatch(command="stop", target="all"))
+    async def c_on_stop_all(self, message: CommandMessage, ctx: MessageContext) -> str:
+        return "stop all"
+
+    @rpc(match=FieldMatch(command="stop"))
+    async def d_on_stop(self, message: CommandMessage, ctx: MessageContext) -> str:
+        return "stop"
+
+    @rpc
+    async def e_on_other(self, message: CommandMessage, ctx: MessageContext) -> str:
+        return "other"
+
+    @rpc
+    async def on_test_message(self, message: TestMessage, ctx: MessageContext) -> str:
+        return f"test {type(message).__name__}"
+
+    @rpc
+    async def on_special_test_message(self, message: SpecialTestMessage, ctx: MessageContext) -> str:
+        return "special" if message.extra else "not special"
+
+
+@pytest.mark.asyncio
+async def test_field_match_and_subclass_routing() -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await runtime.register("agent", FieldMatchAgent)
+    agent_id = AgentId("agent", "default")
+    runtime.start()
+
+    # The first handler in alphabetical order whose condition is true handles the message.
+    expected = [
+        (CommandMessage("start"), "start"),
+        (CommandMessage("start", target="any"), "start"),
+        (CommandMessage("stop", target="any"), "any"),
+        (CommandMessage("stop", target="all"), "stop all"),
+        (CommandMessage("stop"), "stop"),
+        (CommandMessage("pause"), "other"),
+        # Values that cannot be hashed are matched by trying each condition.
+        (CommandMessage(["start"]), "other"),
+    ]
+    for message, result in expected:
+        assert await runtime.send_message(message, recipient=agent_id) == result
+
+    # A message of a subclass of a handled type is routed to the handler of the most specific type.
+    @dataclass
+    class DerivedTestMessage(TestMessage):
+        pass
+
+    assert await runtime.send_message(DerivedTestMessage("one"), recipient=agent_id) == "test DerivedTestMessage"
+    assert await runtime.send_message(SpecialTestMessage("one", extra=1), recipient=agent_id) == "special"
+    await runtime.stop_when_idle()
+
+
+def test_routes_do_not_keep_message_types_alive() -> None:
+    # The route of a message type that is created at runtime is dropped with the type.
+    message_type = type("RuntimeTestMessage", (TestMessage,), {})
+    assert FieldMatchAgent._resolve_route(message_type) is not None  # type: ignore[reportPrivateUsage]
+    assert message_type in FieldMatchAgent._routes  # type: ignore[reportPrivateUsage]
+    message_type_ref = weakref.ref(message_type)
+    del message_type
+    gc.collect()
+    assert message_type_ref() is None
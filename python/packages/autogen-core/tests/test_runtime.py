@@ -1,17 +1,26 @@
 import asyncio
+import json
 import logging
+from typing import Any, List
 
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application._single_threaded_agent_runtime import PublishMessageEnvelope, ResponseMessageEnvelope
+from autogen_core.application.logging import EVENT_LOGGER_NAME
+from autogen_core.application.logging.events import DeliveryStage, MessageEvent, MessageKind
 from autogen_core.base import (
     AgentId,
     AgentInstantiationContext,
+    AgentRuntime,
     AgentType,
+    BaseAgent,
+    MessageContext,
     Subscription,
     SubscriptionInstantiationContext,
     TopicId,
     try_get_known_serializers_for_type,
 )
+from autogen_core.base.exceptions import MessageDroppedException
 from autogen_core.components import (
     DefaultTopicId,
     TypeSubscription,
@@ -112,6 +121,36 @@ async def agent_factory() -> LoopbackAgent:
         assert any("Error processing publish message" in e.message for e in caplog.records)
 
 
+@pytest.mark.asyncio
+async def test_publish_logs_message_events(caplog: pytest.LogCaptureFixture) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await runtime.register_factory(
+        type=AgentType("name"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await runtime.add_subscription(TypeSubscription("default", "name"))
+
+    with caplog.at_level(logging.INFO, logger=EVENT_LOGGER_NAME):
+        runtime.start()
+        # The sender does not need to be an agent of this runtime.
+        await runtime.publish_message(
+            MessageType(), topic_id=TopicId("default", "default"), sender=AgentId("external", "default")
+        )
+        await runtime.stop_when_idle()
+
+    agent = await runtime.try_get_underlying_agent_instance(AgentId("name", "default"), type=LoopbackAgent)
+    assert agent.num_calls == 1
+
+    events = [record.msg for record in caplog.records if isinstance(record.msg, MessageEvent)]
+    assert [(event.kwargs["kind"], event.kwargs["delivery_stage"]) for event in events] == [
+        (MessageKind.PUBLISH, DeliveryStage.SEND),
+        (MessageKind.PUBLISH, DeliveryStage.DELIVER),
+    ]
+    delivered = json.loads(str(events[1]))
+    assert delivered["sender"] == "external/default"
+    assert delivered["receiver"] == "name/default"
+    assert delivered["kind"] == "PUBLISH"
+
+
 @pytest.mark.asyncio
 async def test_register_receives_publish_cascade() -> None:
     num_agents = 5
@@ -165,6 +204,55 @@ async def test_register_factory_explicit_name() -> None:
     assert other_long_running_agent.num_calls == 0
 
 
+@pytest.mark.asyncio
+async def test_register_resolves_factory_signature_once() -> None:
+    runtime = SingleThreadedAgentRuntime()
+
+    created: list[AgentId] = []
+
+    def two_arg_factory(runtime: AgentRuntime, agent_id: AgentId) -> LoopbackAgent:
+        created.append(agent_id)
+        return LoopbackAgent()
+
+    with pytest.warns(UserWarning, match="two arguments are deprecated"):
+        await runtime.register("two_args", two_arg_factory)
+
+    with pytest.raises(ValueError, match="must take 0 or 2 arguments"):
+        await runtime.register("one_arg", lambda x: LoopbackAgent())  # type: ignore
+    # The invalid factory was not registered, so the type is still available.
+    await runtime.register("one_arg", LoopbackAgent)
+
+    runtime.start()
+    await runtime.send_message(MessageType(), AgentId("two_args", "a"))
+    await runtime.send_message(MessageType(), AgentId("two_args", "b"))
+    await runtime.stop_when_idle()
+    assert created == [AgentId("two_args", "a"), AgentId("two_args", "b")]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_instantiates_agents() -> None:
+    runtime = SingleThreadedAgentRuntime()
+
+    num_created = 0
+
+    def factory() -> LoopbackAgent:
+        nonlocal num_created
+        num_created += 1
+        return LoopbackAgent()
+
+    await LoopbackAgent.register(runtime, "name", factory)
+    await runtime.warm_up("name", ["a", "b"])
+    assert num_created == 2
+
+    runtime.start()
+    await runtime.send_message(MessageType(), AgentId("name", "a"))
+    await runtime.stop_when_idle()
+    assert num_created == 2
+
+    with pytest.raises(LookupError):
+        await runtime.warm_up("unknown", ["a"])
+
+
 @pytest.mark.asyncio
 async def test_register_factory_context_var_name() -> None:
     runtime = SingleThreadedAgentRuntime()
@@ -306,3 +394,210 @@ async def test_default_subscription_publish_to_other_source() -> None:
         AgentId("name", key="other"), type=LoopbackAgentWithDefaultSubscription
     )
     assert other_long_running_agent.num_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_bounded_message_queue_backpressure() -> None:
+    runtime = SingleThreadedAgentRuntime(max_queue_size=2)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    assert len(runtime.unprocessed_messages) == 2
+
+    # The queue is full, so publishing waits until the runtime processes a message.
+    blocked_publish = asyncio.create_task(runtime.publish_message(MessageType(), topic_id=DefaultTopicId()))
+    await asyncio.sleep(0.1)
+    assert not blocked_publish.done()
+
+    await runtime.process_next()
+    await blocked_publish
+    assert len(runtime.unprocessed_messages) == 2
+
+    runtime.start()
+    await runtime.stop_when_idle()
+
+    agent = await runtime.try_get_underlying_agent_instance(
+        AgentId("name", key="default"), type=LoopbackAgentWithDefaultSubscription
+    )
+    assert agent.num_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_prioritize_responses() -> None:
+    runtime = SingleThreadedAgentRuntime(prioritize_responses=True)
+    await LoopbackAgent.register(runtime, "name", LoopbackAgent)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "subscriber", LoopbackAgentWithDefaultSubscription)
+
+    send_task = asyncio.create_task(runtime.send_message(MessageType(), AgentId("name", "default")))
+    while len(runtime.unprocessed_messages) == 0:
+        await asyncio.sleep(0.01)
+    await runtime.process_next()
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    while not any(isinstance(m, ResponseMessageEnvelope) for m in runtime.unprocessed_messages):
+        await asyncio.sleep(0.01)
+
+    # The response is queued after the publish, but is dequeued first.
+    assert isinstance(runtime.unprocessed_messages[0], ResponseMessageEnvelope)
+    assert isinstance(runtime.unprocessed_messages[1], PublishMessageEnvelope)
+    await runtime.process_next()
+    assert isinstance(await send_task, MessageType)
+
+    runtime.start()
+    await runtime.stop_when_idle()
+
+
+@pytest.mark.asyncio
+async def test_idle_runtime_does_not_poll() -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+
+    num_process_next_calls = 0
+    process_next = runtime.process_next
+
+    async def counting_process_next() -> None:
+        nonlocal num_process_next_calls
+        num_process_next_calls += 1
+        await process_next()
+
+    runtime.process_next = counting_process_next  # type: ignore[method-assign]
+    runtime.start()
+    await asyncio.sleep(0.1)
+    assert num_process_next_calls == 0
+
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    await runtime.stop_when_idle()
+    assert num_process_next_calls == 1
+
+    agent = await runtime.try_get_underlying_agent_instance(
+        AgentId("name", key="default"), type=LoopbackAgentWithDefaultSubscription
+    )
+    assert agent.num_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_batched_dispatch() -> None:
+    runtime = SingleThreadedAgentRuntime(max_batch_size=3)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+
+    for _ in range(5):
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    assert len(runtime.unprocessed_messages) == 5
+
+    await runtime.process_next()
+    assert len(runtime.unprocessed_messages) == 2
+    await runtime.process_next()
+    assert len(runtime.unprocessed_messages) == 0
+
+    runtime.start()
+    await runtime.stop_when_idle()
+    agent = await runtime.try_get_underlying_agent_instance(
+        AgentId("name", key="default"), type=LoopbackAgentWithDefaultSubscription
+    )
+    assert agent.num_calls == 5
+
+
+@pytest.mark.asyncio
+async def test_batched_dispatch_isolates_failures() -> None:
+    runtime = SingleThreadedAgentRuntime(max_batch_size=3)
+    await LoopbackAgent.register(runtime, "name", LoopbackAgent)
+    failing = MessageType()
+    dispatch = runtime._dispatch  # type: ignore[reportPrivateUsage]
+
+    def dispatch_or_fail(message_envelope: Any) -> None:
+        if message_envelope.message is failing:
+            raise RuntimeError("Dispatch failed.")
+        dispatch(message_envelope)
+
+    runtime._dispatch = dispatch_or_fail  # type: ignore
+    runtime.start()
+    recipient = AgentId("name", key="default")
+    results = await asyncio.gather(
+        runtime.send_message(MessageType(), recipient),
+        runtime.send_message(failing, recipient),
+        runtime.send_message(MessageType(), recipient),
+        return_exceptions=True,
+    )
+    await runtime.stop_when_idle()
+
+    # The failed message does not take the rest of its batch down with it.
+    assert isinstance(results[0], MessageType)
+    assert isinstance(results[1], RuntimeError)
+    assert isinstance(results[2], MessageType)
+    agent = await runtime.try_get_underlying_agent_instance(recipient, type=LoopbackAgent)
+    assert agent.num_calls == 2
+
+
+class GatedAgent(BaseAgent):
+    """Records the messages it handles and holds each one until the gate is opened."""
+
+    def __init__(self, gate: asyncio.Event) -> None:
+        super().__init__("A gated agent.")
+        self.gate = gate
+        self.handled: List[Any] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.gate.wait()
+            self.handled.append(message)
+            return message
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_agent_concurrency", [None, 1, 2])
+async def test_agent_mailbox_concurrency(max_agent_concurrency: int | None) -> None:
+    gate = asyncio.Event()
+    runtime = SingleThreadedAgentRuntime(max_agent_concurrency=max_agent_concurrency)
+    await GatedAgent.register(runtime, "gated", lambda: GatedAgent(gate))
+    recipient = AgentId("gated", "default")
+    runtime.start()
+
+    responses = [asyncio.create_task(runtime.send_message(i, recipient)) for i in range(5)]
+    await asyncio.sleep(0.05)
+    agent = await runtime.try_get_underlying_agent_instance(recipient, type=GatedAgent)
+    if max_agent_concurrency is None:
+        assert agent.active == 5
+        assert runtime.mailbox_metrics == {}
+    else:
+        assert agent.active == max_agent_concurrency
+        assert runtime.mailbox_metrics[recipient].queue_depth == 5 - max_agent_concurrency
+
+    gate.set()
+    assert await asyncio.gather(*responses) == list(range(5))
+    await runtime.stop_when_idle()
+    if max_agent_concurrency == 1:
+        # Messages are handled one at a time in the order they were sent.
+        assert agent.handled == list(range(5))
+    assert runtime.mailbox_metrics == {}
+    assert runtime.total_mailbox_metrics.admitted == (0 if max_agent_concurrency is None else 5)
+
+
+@pytest.mark.asyncio
+async def test_agent_mailbox_sheds_when_full() -> None:
+    gate = asyncio.Event()
+    runtime = SingleThreadedAgentRuntime(max_agent_concurrency=1, max_mailbox_size=1)
+    await GatedAgent.register(runtime, "gated", lambda: GatedAgent(gate))
+    recipient = AgentId("gated", "default")
+    runtime.start()
+
+    first = asyncio.create_task(runtime.send_message("first", recipient))
+    second = asyncio.create_task(runtime.send_message("second", recipient))
+    await asyncio.sleep(0.05)
+    with pytest.raises(MessageDroppedException):
+        await runtime.send_message("third", recipient)
+    metrics = runtime.mailbox_metrics[recipient]
+    assert (metrics.active, metrics.queue_depth, metrics.rejected) == (1, 1, 1)
+
+    gate.set()
+    assert await first == "first"
+    assert await second == "second"
+    await runtime.stop_when_idle()
+    totals = runtime.total_mailbox_metrics
+    assert (totals.admitted, totals.rejected, totals.queue_depth) == (2, 1, 0)
+    assert totals.max_wait_time > 0
@@ -1,9 +1,19 @@
-from dataclasses import dataclass
-from typing import Union
+import gc
+import json as stdlib_json
+import math
+import uuid
+import weakref
+from dataclasses import dataclass, make_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Tuple, Union
 
 import pytest
+from autogen_core.application.protos import agent_worker_pb2
 from autogen_core.base import (
     JSON_DATA_CONTENT_TYPE,
+    MSGPACK_DATA_CONTENT_TYPE,
+    PROTOBUF_DATA_CONTENT_TYPE,
     MessageSerializer,
     SerializationRegistry,
     try_get_known_serializers_for_type,
@@ -77,10 +87,90 @@ def test_dataclass() -> None:
     assert deserialized == message
 
 
-def test_nesting_dataclass_dataclass() -> None:
+@dataclass
+class DataclassListMessage:
+    values: List[int]
+    messages: List[DataclassMessage]
+
+
+def test_dataclass_values() -> None:
     serde = SerializationRegistry()
-    with pytest.raises(ValueError):
-        serde.add_serializer(try_get_known_serializers_for_type(NestingDataclassMessage))
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassListMessage))
+
+    # Dataclasses in containers are encoded as objects, and integers of any size are supported.
+    message = DataclassListMessage(values=[1, 2**70], messages=[DataclassMessage(message="hello")])
+    name = serde.type_name(message)
+    json = serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE)
+    assert json == b'{"values": [1, 1180591620717411303424], "messages": [{"message": "hello"}]}'
+    assert serde.deserialize(json, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE) == message
+    message = DataclassListMessage(values=[1, 2], messages=[DataclassMessage(message="hello")])
+    data = serde.serialize(message, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    deserialized = serde.deserialize(data, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    assert deserialized == message
+
+
+@dataclass
+class DataclassFloatMessage:
+    values: List[float]
+
+
+def test_dataclass_non_finite_floats() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassFloatMessage))
+
+    # Non-finite floats are encoded like json.dumps does, rather than as null.
+    message = DataclassFloatMessage(values=[1.5, math.inf, -math.inf, math.nan])
+    name = serde.type_name(message)
+    json = serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE)
+    assert json == stdlib_json.dumps({"values": message.values}).encode("utf-8")
+    assert json == b'{"values": [1.5, Infinity, -Infinity, NaN]}'
+    deserialized = serde.deserialize(json, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE)
+    assert deserialized.values[:3] == [1.5, math.inf, -math.inf]
+    assert math.isnan(deserialized.values[3])
+
+
+@dataclass
+class DataclassAnyMessage:
+    value: Any
+
+
+def test_dataclass_unsupported_values() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassAnyMessage))
+
+    # Values that json.dumps rejects are rejected whether or not orjson is installed.
+    for value in [datetime(2024, 1, 1), uuid.UUID(int=0)]:
+        message = DataclassAnyMessage(value=value)
+        with pytest.raises(TypeError):
+            serde.serialize(message, type_name=serde.type_name(message), data_content_type=JSON_DATA_CONTENT_TYPE)
+    # Non-ASCII characters are escaped.
+    message = DataclassAnyMessage(value="héllo")
+    json = serde.serialize(message, type_name=serde.type_name(message), data_content_type=JSON_DATA_CONTENT_TYPE)
+    assert json == b'{"value": "h\\u00e9llo"}'
+
+
+@dataclass
+class DataclassUnresolvedMessage:
+    nested: "MissingMessage"  # type: ignore[name-defined] # noqa: F821
+
+
+def test_dataclass_unresolved_annotations() -> None:
+    # An annotation that cannot be resolved is not taken for a value that is encoded as it is.
+    with pytest.raises(ValueError, match="cannot be resolved"):
+        DataclassJsonMessageSerializer(DataclassUnresolvedMessage)
+
+
+@pytest.mark.parametrize("data_content_type", [JSON_DATA_CONTENT_TYPE, MSGPACK_DATA_CONTENT_TYPE])
+def test_nesting_dataclass_dataclass(data_content_type: str) -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(NestingDataclassMessage))
+
+    message = NestingDataclassMessage(message="hello", nested=DataclassMessage(message="world"))
+    name = serde.type_name(message)
+    data = serde.serialize(message, type_name=name, data_content_type=data_content_type)
+    if data_content_type == JSON_DATA_CONTENT_TYPE:
+        assert data == b'{"message": "hello", "nested": {"message": "world"}}'
+    assert serde.deserialize(data, type_name=name, data_content_type=data_content_type) == message
 
 
 @dataclass
@@ -97,14 +187,105 @@ class DataclassNestedUnionSyntaxNewMessage:
 def test_nesting_union_old_syntax_dataclass(
     cls: type[DataclassNestedUnionSyntaxOldMessage | DataclassNestedUnionSyntaxNewMessage],
 ) -> None:
-    with pytest.raises(ValueError):
-        _serializer = DataclassJsonMessageSerializer(cls)
+    serializer = DataclassJsonMessageSerializer(cls)
+    values: List[str | int] = ["hello", 1]
+    for value in values:
+        assert serializer.deserialize(serializer.serialize(cls(message=value))) == cls(message=value)
 
 
 def test_nesting_dataclass_pydantic() -> None:
     serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(NestingPydanticDataclassMessage))
+
+    message = NestingPydanticDataclassMessage(message="hello", nested=PydanticMessage(message="world"))
+    name = serde.type_name(message)
+    data = serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE)
+    assert serde.deserialize(data, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE) == message
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+@dataclass
+class DataclassTaggedUnionMessage:
+    content: DataclassMessage | PydanticMessage | None
+    contents: List[DataclassMessage | NestingDataclassMessage]
+    colors: Dict[str, Color]
+    point: Tuple[int, DataclassMessage]
+
+
+def test_dataclass_tagged_union() -> None:
+    serializer = DataclassJsonMessageSerializer(DataclassTaggedUnionMessage)
+    message = DataclassTaggedUnionMessage(
+        content=PydanticMessage(message="a"),
+        contents=[DataclassMessage(message="b"), NestingDataclassMessage(message="c", nested=DataclassMessage("d"))],
+        colors={"x": Color.RED},
+        point=(1, DataclassMessage(message="e")),
+    )
+    data = serializer.serialize(message)
+    assert b'"content": {"message": "a", "__type__": "PydanticMessage"}' in data
+    assert serializer.deserialize(data) == message
+    message.content = None
+    assert serializer.deserialize(serializer.serialize(message)) == message
+
+
+@dataclass
+class DataclassAmbiguousUnionMessage:
+    content: List[str] | Tuple[int, ...]
+
+
+def test_dataclass_ambiguous_union() -> None:
     with pytest.raises(ValueError):
-        serde.add_serializer(try_get_known_serializers_for_type(NestingPydanticDataclassMessage))
+        DataclassJsonMessageSerializer(DataclassAmbiguousUnionMessage)
+
+
+@dataclass
+class DataclassTreeMessage:
+    value: int
+    children: List["DataclassTreeMessage"]
+
+
+def test_recursive_dataclass() -> None:
+    serializer = DataclassJsonMessageSerializer(DataclassTreeMessage)
+    message = DataclassTreeMessage(
+        1, [DataclassTreeMessage(2, []), DataclassTreeMessage(3, [DataclassTreeMessage(4, [])])]
+    )
+    assert serializer.deserialize(serializer.serialize(message)) == message
+
+
+@dataclass
+class DerivedDataclassMessage(DataclassMessage):
+    extra: int = 0
+
+
+def test_dataclass_tagged_union_subclass() -> None:
+    serializer = DataclassJsonMessageSerializer(DataclassTaggedUnionMessage)
+    message = DataclassTaggedUnionMessage(
+        content=None,
+        contents=[DerivedDataclassMessage(message="a", extra=1)],
+        colors={},
+        point=(1, DataclassMessage("b")),
+    )
+    data = serializer.serialize(message)
+    # The instance of a subclass is encoded as the member of the union that it derives from.
+    assert b'"contents": [{"message": "a", "__type__": "DataclassMessage"}]' in data
+    assert serializer.deserialize(data).contents == [DataclassMessage(message="a")]
+
+
+def test_dataclass_plans_do_not_keep_classes_alive() -> None:
+    child = make_dataclass("DynamicChildMessage", [("value", int)])
+    # The fields avoid `typing` constructs such as `List[...]` and `Union[...]`, which `typing` itself caches.
+    parent = make_dataclass("DynamicParentMessage", [("child", child), ("children", list[child])])  # type: ignore[valid-type]
+    serializer: DataclassJsonMessageSerializer[Any] = DataclassJsonMessageSerializer(parent)
+    message = parent(child=child(1), children=[child(2)])
+    assert serializer.deserialize(serializer.serialize(message)) == message
+
+    classes = [weakref.ref(child), weakref.ref(parent)]
+    del child, parent, serializer, message
+    gc.collect()
+    assert [cls() for cls in classes] == [None, None]
 
 
 def test_invalid_type() -> None:
@@ -159,3 +340,53 @@ class PydanticImageMessage(BaseModel):
     assert deserialized.image.image.size == (100, 100)
     assert deserialized.image.image.mode == "RGB"
     assert deserialized.image.image == image.image
+
+
+def test_msgpack_dataclass() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassMessage))
+
+    message = DataclassMessage(message="hello")
+    name = serde.type_name(message)
+    data = serde.serialize(message, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    assert data == b"\x81\xa7message\xa5hello"
+    deserialized = serde.deserialize(data, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    assert deserialized == message
+
+
+def test_msgpack_nested_pydantic() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(NestingPydanticMessage))
+
+    message = NestingPydanticMessage(message="hello", nested=PydanticMessage(message="world"))
+    name = serde.type_name(message)
+    data = serde.serialize(message, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    deserialized = serde.deserialize(data, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    assert deserialized == message
+
+
+def test_protobuf() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(agent_worker_pb2.AgentId))
+
+    message = agent_worker_pb2.AgentId(type="agent", key="default")
+    name = serde.type_name(message)
+    assert name == "AgentId"
+    data = serde.serialize(message, type_name=name, data_content_type=PROTOBUF_DATA_CONTENT_TYPE)
+    assert data == message.SerializeToString()
+    deserialized = serde.deserialize(data, type_name=name, data_content_type=PROTOBUF_DATA_CONTENT_TYPE)
+    assert deserialized == message
+
+
+def test_select_data_content_type() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassMessage))
+    serde.add_serializer(try_get_known_serializers_for_type(agent_worker_pb2.AgentId))
+
+    preferred = [MSGPACK_DATA_CONTENT_TYPE, JSON_DATA_CONTENT_TYPE]
+    assert serde.select_data_content_type("DataclassMessage", preferred) == MSGPACK_DATA_CONTENT_TYPE
+    assert serde.select_data_content_type("DataclassMessage", [JSON_DATA_CONTENT_TYPE]) == JSON_DATA_CONTENT_TYPE
+    # Falls back to a registered content type that was not requested.
+    assert serde.select_data_content_type("AgentId", preferred) == PROTOBUF_DATA_CONTENT_TYPE
+    with pytest.raises(ValueError):
+        serde.select_data_content_type("UnknownMessage", preferred)
@@ -1,7 +1,16 @@
+import asyncio
+from pathlib import Path
 from typing import Any, Mapping
 
 import pytest
-from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application import (
+    AgentStateStore,
+    FileAgentStateStore,
+    InMemoryAgentStateStore,
+    SingleThreadedAgentRuntime,
+    SqliteAgentStateStore,
+)
+from autogen_core.application._agent_state_service import AgentStateService, state_etag
 from autogen_core.base import AgentId, BaseAgent, MessageContext
 
 
@@ -20,6 +29,22 @@ def load_state(self, state: Mapping[str, Any]) -> None:
         self.state = state["state"]
 
 
+class CounterAgent(BaseAgent):
+    def __init__(self) -> None:
+        super().__init__("A counter agent")
+        self.state = 0
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> int:
+        self.state += 1
+        return self.state
+
+    def save_state(self) -> Mapping[str, Any]:
+        return {"state": self.state}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        self.state = state["state"]
+
+
 @pytest.mark.asyncio
 async def test_agent_can_save_state() -> None:
     runtime = SingleThreadedAgentRuntime()
@@ -60,3 +85,197 @@ async def test_runtime_can_save_state() -> None:
 
     await runtime2.load_state(runtime_state)
     assert agent2.state == 1
+
+
+@pytest.mark.asyncio
+async def test_runtime_passivates_least_recently_used_agents() -> None:
+    store = InMemoryAgentStateStore()
+    runtime = SingleThreadedAgentRuntime(max_resident_agents=2, agent_state_store=store)
+    await CounterAgent.register(runtime, "counter", CounterAgent)
+    runtime.start()
+
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 1
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 1
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 2
+    # "b" is the least recently used agent, so it is passivated.
+    assert await runtime.send_message("inc", AgentId("counter", "c")) == 1
+    metrics = runtime.agent_lifecycle_metrics
+    assert (metrics.resident, metrics.evicted, metrics.rehydrated) == (2, 1, 0)
+    assert await store.load_state(AgentId("counter", "b")) == {"state": 1}
+
+    # "b" is rehydrated with its saved state, and "a" is passivated.
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 2
+    metrics = runtime.agent_lifecycle_metrics
+    assert (metrics.resident, metrics.evicted, metrics.rehydrated) == (2, 2, 1)
+    # The resident instance holds the state of "b", so it is deleted from the store.
+    assert await store.load_state(AgentId("counter", "b")) is None
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 3
+
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+async def test_runtime_passivates_idle_agents() -> None:
+    runtime = SingleThreadedAgentRuntime(agent_idle_timeout=0.05)
+    await CounterAgent.register(runtime, "counter", CounterAgent)
+    runtime.start()
+
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 1
+    await asyncio.sleep(0.1)
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 1
+    metrics = runtime.agent_lifecycle_metrics
+    assert (metrics.resident, metrics.evicted, metrics.rehydrated) == (1, 1, 0)
+
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 2
+    assert runtime.agent_lifecycle_metrics.rehydrated == 1
+
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+async def test_runtime_save_state_does_not_evict_agents() -> None:
+    runtime = SingleThreadedAgentRuntime(agent_idle_timeout=0.05)
+    await CounterAgent.register(runtime, "counter", CounterAgent)
+    runtime.start()
+
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 1
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 1
+    await asyncio.sleep(0.1)
+    # Both agents are idle, but saving the state of one does not evict the other, only for it to be rehydrated next.
+    state = await runtime.save_state()
+    assert state == {"counter/a": {"state": 1}, "counter/b": {"state": 1}}
+    metrics = runtime.agent_lifecycle_metrics
+    assert (metrics.resident, metrics.evicted, metrics.rehydrated) == (2, 0, 0)
+
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("store_type", ["sqlite", "file"])
+async def test_persistent_agent_state_stores(store_type: str, tmp_path: Path) -> None:
+    def make_store() -> AgentStateStore:
+        if store_type == "sqlite":
+            return SqliteAgentStateStore(tmp_path / "state.db")
+        return FileAgentStateStore(tmp_path / "state")
+
+    store = make_store()
+    assert await store.load_state(AgentId("counter", "a")) is None
+    await store.save_state(AgentId("counter", "a"), {"state": 1})
+    await store.save_states({AgentId("counter", "a"): {"state": 2}, AgentId("counter", "b"): {"state": [1, "x"]}})
+    await store.delete_state(AgentId("counter", "missing"))
+    if isinstance(store, SqliteAgentStateStore):
+        store.close()
+
+    # The states outlive the store.
+    store = make_store()
+    assert await store.load_state(AgentId("counter", "a")) == {"state": 2}
+    assert await store.load_state(AgentId("counter", "b")) == {"state": [1, "x"]}
+    await store.delete_state(AgentId("counter", "a"))
+    assert await store.load_state(AgentId("counter", "a")) is None
+
+
+class SlowAgentStateStore(InMemoryAgentStateStore):
+    async def load_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        await asyncio.sleep(0.01)
+        return await super().load_state(agent_id)
+
+
+@pytest.mark.asyncio
+async def test_state_service_saves_with_the_same_etag_one_at_a_time() -> None:
+    store = SlowAgentStateStore()
+    await store.save_state(AgentId("counter", "a"), {"state": 0})
+    service = AgentStateService(store)
+    etag = state_etag({"state": 0})
+
+    # Both saves replace the same state, so only the first succeeds.
+    results = await asyncio.gather(
+        service.save(AgentId("counter", "a"), {"state": 1}, etag),
+        service.save(AgentId("counter", "a"), {"state": 2}, etag),
+        return_exceptions=True,
+    )
+    assert results[0] == state_etag({"state": 1})
+    assert isinstance(results[1], ValueError)
+    assert await store.load_state(AgentId("counter", "a")) == {"state": 1}
+
+
+@pytest.mark.asyncio
+async def test_runtime_rehydrates_an_agent_once_for_concurrent_messages() -> None:
+    runtime = SingleThreadedAgentRuntime(max_resident_agents=1, agent_state_store=SlowAgentStateStore())
+    await CounterAgent.register(runtime, "counter", CounterAgent)
+    runtime.start()
+
+    for _ in range(3):
+        await runtime.send_message("inc", AgentId("counter", "a"))
+    # "a" is passivated.
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 1
+
+    # Both messages wait for the same rehydration, instead of the second replacing the agent with a blank instance.
+    results = await asyncio.gather(
+        runtime.send_message("inc", AgentId("counter", "a")), runtime.send_message("inc", AgentId("counter", "a"))
+    )
+    assert sorted(results) == [4, 5]
+    assert runtime.agent_lifecycle_metrics.rehydrated == 1
+
+    await runtime.stop()
+
+
+@pytest.mark.asyncio
+async def test_runtime_save_state_includes_passivated_agents() -> None:
+    runtime = SingleThreadedAgentRuntime(max_resident_agents=1)
+    await CounterAgent.register(runtime, "counter", CounterAgent)
+    runtime.start()
+
+    assert await runtime.send_message("inc", AgentId("counter", "a")) == 1
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 1
+    assert await runtime.send_message("inc", AgentId("counter", "b")) == 2
+    # "a" is passivated, and saving its state does not rehydrate it.
+    state = await runtime.save_state()
+    assert state == {"counter/a": {"state": 1}, "counter/b": {"state": 2}}
+    metrics = runtime.agent_lifecycle_metrics
+    assert (metrics.resident, metrics.evicted, metrics.rehydrated) == (1, 1, 0)
+    await runtime.stop()
+
+    runtime2 = SingleThreadedAgentRuntime()
+    await CounterAgent.register(runtime2, "counter", CounterAgent)
+    await runtime2.load_state(state)
+    runtime2.start()
+    assert await runtime2.send_message("inc", AgentId("counter", "a")) == 2
+    assert await runtime2.send_message("inc", AgentId("counter", "b")) == 3
+    await runtime2.stop()
+
+
+class BlockingAgentStateStore(InMemoryAgentStateStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writing = asyncio.Event()
+
+    async def save_states(self, states: Mapping[AgentId, Mapping[str, Any]]) -> None:
+        self.writing.set()
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_state_service_cancels_saves_when_the_flush_is_cancelled() -> None:
+    store = BlockingAgentStateStore()
+    service = AgentStateService(store)
+    save = asyncio.create_task(service.save(AgentId("counter", "a"), {"state": 1}))
+    await asyncio.wait_for(store.writing.wait(), timeout=1)
+    # The next save waits for the next batch, whose flush waits for the write in progress.
+    next_save = asyncio.create_task(service.save(AgentId("counter", "b"), {"state": 1}))
+    await asyncio.sleep(0.01)
+
+    for task in list(service._flush_tasks):  # type: ignore[reportPrivateUsage]
+        task.cancel()
+    for save_task in [save, next_save]:
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(save_task, timeout=1)
+    # The states were not written, so they are written by the next save.
+    assert service._etags == {}  # type: ignore[reportPrivateUsage]
+
+
+@pytest.mark.asyncio
+async def test_state_service_bounds_the_cached_etags() -> None:
+    service = AgentStateService(InMemoryAgentStateStore(), max_cached_etags=2)
+    for key in ["a", "b", "c"]:
+        await service.save(AgentId("counter", key), {"state": 1})
+    assert list(service._etags) == [AgentId("counter", "b"), AgentId("counter", "c")]  # type: ignore[reportPrivateUsage]
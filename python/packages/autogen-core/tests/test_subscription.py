@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application._helpers import SubscriptionManager
 from autogen_core.base import AgentId, TopicId
 from autogen_core.base.exceptions import CantHandleException
 from autogen_core.components import DefaultSubscription, DefaultTopicId, TypeSubscription
@@ -115,3 +118,110 @@ async def test_subscription_deduplication() -> None:
     default_subscription = DefaultSubscription(agent_type=agent_type)
     with pytest.raises(ValueError, match="Subscription already exists"):
         await runtime.add_subscription(default_subscription)
+
+
+class SourcePrefixSubscription:
+    """A custom subscription that is not indexed by the subscription manager."""
+
+    def __init__(self, source_prefix: str, agent_type: str) -> None:
+        self._source_prefix = source_prefix
+        self._agent_type = agent_type
+
+    @property
+    def id(self) -> str:
+        return f"{self._source_prefix}-{self._agent_type}"
+
+    def is_match(self, topic_id: TopicId) -> bool:
+        return topic_id.source.startswith(self._source_prefix)
+
+    def map_to_agent(self, topic_id: TopicId) -> AgentId:
+        if not self.is_match(topic_id):
+            raise CantHandleException("TopicId does not match the subscription")
+        return AgentId(type=self._agent_type, key="default")
+
+
+@pytest.mark.asyncio
+async def test_subscription_manager_incremental_updates() -> None:
+    manager = SubscriptionManager()
+    topic_1 = TopicId("t1", "s1")
+    topic_2 = TopicId("t2", "s1")
+    other_topic = TopicId("t1", "other")
+
+    sub_a = TypeSubscription("t1", "a")
+    await manager.add_subscription(sub_a)
+    assert await manager.get_subscribed_recipients(topic_1) == [AgentId("a", "s1")]
+    assert await manager.get_subscribed_recipients(topic_2) == []
+    assert await manager.get_subscribed_recipients(other_topic) == [AgentId("a", "other")]
+
+    # A custom subscription is matched against all topics that have been seen.
+    custom = SourcePrefixSubscription("s", "c")
+    await manager.add_subscription(custom)
+    assert await manager.get_subscribed_recipients(topic_1) == [AgentId("a", "s1"), AgentId("c", "default")]
+    assert await manager.get_subscribed_recipients(topic_2) == [AgentId("c", "default")]
+    assert await manager.get_subscribed_recipients(other_topic) == [AgentId("a", "other")]
+
+    # Recipients keep the order in which subscriptions were added.
+    sub_b = DefaultSubscription("t1", "b")
+    await manager.add_subscription(sub_b)
+    assert await manager.get_subscribed_recipients(topic_1) == [
+        AgentId("a", "s1"),
+        AgentId("c", "default"),
+        AgentId("b", "s1"),
+    ]
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s2")) == [
+        AgentId("a", "s2"),
+        AgentId("c", "default"),
+        AgentId("b", "s2"),
+    ]
+
+    with pytest.raises(ValueError, match="Subscription already exists"):
+        await manager.add_subscription(custom)
+
+    await manager.remove_subscription(sub_a.id)
+    assert await manager.get_subscribed_recipients(topic_1) == [AgentId("c", "default"), AgentId("b", "s1")]
+    assert await manager.get_subscribed_recipients(other_topic) == [AgentId("b", "other")]
+
+    await manager.remove_subscription(custom.id)
+    assert await manager.get_subscribed_recipients(topic_1) == [AgentId("b", "s1")]
+    assert await manager.get_subscribed_recipients(topic_2) == []
+
+    with pytest.raises(ValueError, match="Subscription does not exist"):
+        await manager.remove_subscription(custom.id)
+
+
+@pytest.mark.asyncio
+async def test_subscription_manager_bounded_cache() -> None:
+    manager = SubscriptionManager(max_cached_topics=2)
+    await manager.add_subscription(TypeSubscription("t1", "a"))
+
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1")]
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s2")) == [AgentId("a", "s2")]
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1")]
+    assert (manager.cache_hits, manager.cache_misses, manager.cache_size) == (1, 2, 2)
+
+    # The least recently used topic is evicted.
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s3")) == [AgentId("a", "s3")]
+    assert manager.cache_size == 2
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1")]
+    assert (manager.cache_hits, manager.cache_misses) == (2, 3)
+
+    # Cached and evicted topics both reflect the new subscription.
+    await manager.add_subscription(TypeSubscription("t1", "b"))
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s2")) == [AgentId("a", "s2"), AgentId("b", "s2")]
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1"), AgentId("b", "s1")]
+    assert (manager.cache_hits, manager.cache_misses) == (3, 4)
+
+
+@pytest.mark.asyncio
+async def test_subscription_manager_cache_ttl() -> None:
+    manager = SubscriptionManager(cached_topic_ttl=0.05)
+    await manager.add_subscription(TypeSubscription("t1", "a"))
+
+    topic = TopicId("t1", "s1")
+    assert await manager.get_subscribed_recipients(topic) == [AgentId("a", "s1")]
+    assert await manager.get_subscribed_recipients(topic) == [AgentId("a", "s1")]
+    assert (manager.cache_hits, manager.cache_misses) == (1, 1)
+
+    await asyncio.sleep(0.1)
+    assert await manager.get_subscribed_recipients(topic) == [AgentId("a", "s1")]
+    assert (manager.cache_hits, manager.cache_misses) == (1, 2)
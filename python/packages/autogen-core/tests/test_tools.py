@@ -1,10 +1,15 @@
+import gc
 import inspect
-from typing import Annotated, List
+import weakref
+from typing import Annotated, Callable, List
 
 import pytest
 from autogen_core.base import CancellationToken
-from autogen_core.components._function_utils import get_typed_signature
-from autogen_core.components.models._openai_client import convert_tools
+from autogen_core.components._function_utils import get_function_schema, get_typed_signature
+from autogen_core.components.models._openai_client import (
+    _convert_request_tools,  # type: ignore[reportPrivateUsage]
+    convert_tools,
+)
 from autogen_core.components.tools import BaseTool, FunctionTool
 from pydantic import BaseModel, Field, model_serializer
 from pydantic_core import PydanticUndefined
@@ -316,6 +321,54 @@ def my_function(arg: str, other: Annotated[int, "int arg"], nonrequired: int = 5
     assert converted_tool_schema[0] == converted_tool_schema[1]
 
 
+def test_tool_schemas_are_cached() -> None:
+    def make_function() -> Callable[..., str]:
+        class Options(BaseModel):
+            count: int
+
+        def my_function(arg: str, options: Options) -> str:
+            return arg * options.count
+
+        return my_function
+
+    function = make_function()
+    first = FunctionTool(function, description="Function tool.")
+    # The tools of the same function share their argument model.
+    assert FunctionTool(function, description="Function tool.").args_type() is first.args_type()
+    renamed = FunctionTool(function, description="Function tool.", name="renamed")
+    assert renamed.args_type() is not first.args_type()
+    # Closures of the same definition have the same signature, but their local annotation classes differ.
+    other = FunctionTool(make_function(), description="Function tool.")
+    assert other.args_type() is not first.args_type()
+    assert (
+        other.args_type().model_fields["options"].annotation is not first.args_type().model_fields["options"].annotation
+    )
+
+    # Schemas are copies, so changing one does not change the schemas of the tool or of other tools.
+    schema = first.schema
+    assert schema == first.schema
+    assert "parameters" in schema
+    schema["parameters"]["properties"].clear()
+    assert first.schema == FunctionTool(function, description="Function tool.").schema
+    assert "arg" in FunctionTool(function, description="Function tool.").schema["parameters"]["properties"]
+    converted = convert_tools([first])
+    converted[0]["function"]["parameters"]["properties"] = {}  # type: ignore
+    assert convert_tools([first])[0]["function"]["parameters"]["properties"] != {}  # type: ignore
+    # The tools of requests are converted once, and are only passed to the API.
+    assert _convert_request_tools([first])[0] is _convert_request_tools([first, schema])[0]
+    assert _convert_request_tools([first]) == convert_tools([first])
+
+    function_schema = get_function_schema(function, description="Function.")
+    function_schema["function"]["name"] = "changed"
+    assert get_function_schema(function, description="Function.")["function"]["name"] == "my_function"
+
+    # The cached models and schemas do not keep the function alive.
+    function_ref = weakref.ref(function)
+    del function, first, renamed, schema
+    gc.collect()
+    assert function_ref() is None
+
+
 def test_convert_tools_accepts_both_tool_and_schema() -> None:
     tool = MyTool()
     schema = tool.schema
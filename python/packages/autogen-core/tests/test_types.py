@@ -3,7 +3,7 @@
 from typing import Any, List, Optional, Union
 
 from autogen_core.base import MessageContext
-from autogen_core.base._serialization import has_nested_base_model
+from autogen_core.base._serialization import DataclassJsonMessageSerializer
 from autogen_core.base._type_helpers import AnyType, get_types
 from autogen_core.components._routed_agent import message_handler
 from pydantic import BaseModel
@@ -75,10 +75,16 @@ class NestedBaseModelUnion:
     class NestedBaseModelUnion2:
         nested: MyBaseModel | str
 
-    assert has_nested_base_model(NestedBaseModel)
-    assert has_nested_base_model(NestedBaseModelList)
-    assert has_nested_base_model(NestedBaseModelList2)
-    assert has_nested_base_model(NestedBaseModelList3)
-    assert has_nested_base_model(NestedBaseModelList4)
-    assert has_nested_base_model(NestedBaseModelUnion)
-    assert has_nested_base_model(NestedBaseModelUnion2)
+    messages: List[Any] = [
+        NestedBaseModel(nested=MyBaseModel(message="a")),
+        NestedBaseModelList(nested=[MyBaseModel(message="a")]),
+        NestedBaseModelList2(nested=[MyBaseModel(message="a")]),
+        NestedBaseModelList3(nested=[[MyBaseModel(message="a")]]),
+        NestedBaseModelList4(nested=[[[[[[MyBaseModel(message="a")]]]]]]),
+        NestedBaseModelUnion(nested=MyBaseModel(message="a")),
+        NestedBaseModelUnion(nested="a"),
+        NestedBaseModelUnion2(nested=MyBaseModel(message="a")),
+    ]
+    for message in messages:
+        serializer = DataclassJsonMessageSerializer(type(message))
+        assert serializer.deserialize(serializer.serialize(message)) == message
@@ -1,20 +1,36 @@
 import asyncio
 import logging
 import os
-from typing import List
+import time
+from pathlib import Path
+from typing import Any, List, Mapping
 
 import pytest
-from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.application import (
+    FileBlobStore,
+    InMemoryBlobStore,
+    SqliteAgentStateStore,
+    WorkerAgentRuntime,
+    WorkerAgentRuntimeHost,
+)
+from autogen_core.application._worker_runtime_host_servicer import WorkerAgentRuntimeHostServicer
+from autogen_core.application.protos import agent_worker_pb2
 from autogen_core.base import (
+    MSGPACK_DATA_CONTENT_TYPE,
     AgentId,
+    AgentInstantiationContext,
     AgentType,
+    CancellationToken,
+    MessageContext,
     TopicId,
     try_get_known_serializers_for_type,
 )
 from autogen_core.base._subscription import Subscription
 from autogen_core.components import (
     DefaultTopicId,
+    RoutedAgent,
     TypeSubscription,
+    message_handler,
     type_subscription,
 )
 from test_utils import (
@@ -28,6 +44,52 @@
 )
 
 
+class SlowAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent that does not respond in time.")
+        self.cancelled = asyncio.Event()
+
+    @message_handler
+    async def on_message_type(self, message: MessageType, ctx: MessageContext) -> MessageType:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+        return message
+
+
+class FailingAgent(RoutedAgent):
+    def __init__(self, error: str) -> None:
+        super().__init__("An agent that fails to handle messages.")
+        self._error = error
+
+    @message_handler
+    async def on_message_type(self, message: MessageType, ctx: MessageContext) -> MessageType:
+        raise RuntimeError(self._error)
+
+
+class CountingAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent that counts the messages it handles.")
+        self.num_calls = 0
+
+    @message_handler
+    async def on_content_message(self, message: ContentMessage, ctx: MessageContext) -> None:
+        self.num_calls += 1
+
+
+class NestingAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent that forwards requests to a loopback agent and waits for the response.")
+
+    @message_handler
+    async def on_message_type(self, message: MessageType, ctx: MessageContext) -> MessageType:
+        response = await self.send_message(message, AgentId("loopback", self.id.key))
+        assert isinstance(response, MessageType)
+        return response
+
+
 @pytest.mark.asyncio
 async def test_agent_types_must_be_unique_single_worker() -> None:
     host_address = "localhost:50051"
@@ -368,9 +430,9 @@ async def get_subscribed_recipients() -> List[AgentId]:
 
         await worker1.publish_message(ContentMessage(content="Hello!"), DefaultTopicId())
         # This is a simple simulation of worker disconnct
-        if worker1._host_connection is not None:  # type: ignore[reportPrivateUsage]
+        for host_connection in worker1._host_connections:  # type: ignore[reportPrivateUsage]
             try:
-                await worker1._host_connection.close()  # type: ignore[reportPrivateUsage]
+                await host_connection.close()
             except asyncio.CancelledError:
                 pass
 
@@ -460,9 +522,721 @@ async def test_grpc_max_message_size() -> None:
         await host.stop()
 
 
+@pytest.mark.asyncio
+async def test_msgpack_data_content_type() -> None:
+    host_address = "localhost:50062"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+    worker1.set_data_content_types("name2", [MSGPACK_DATA_CONTENT_TYPE])
+    await worker1.register_factory(
+        type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker1.add_subscription(TypeSubscription("default", "name1"))
+
+    worker2 = WorkerAgentRuntime(host_address=host_address, data_content_types=[MSGPACK_DATA_CONTENT_TYPE])
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+    await worker2.register_factory(
+        type=AgentType("name2"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+
+    # The request to name2 is encoded with msgpack, and so is the response.
+    result = await worker1.send_message(ContentMessage(content="hello"), AgentId("name2", "default"))
+    assert result == ContentMessage(content="hello")
+
+    # Worker 2 publishes with msgpack to the agent on worker 1.
+    await worker2.publish_message(ContentMessage(content="world"), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(1)
+    worker1_agent = await worker1.try_get_underlying_agent_instance(AgentId("name1", "default"), LoopbackAgent)
+    assert worker1_agent.num_calls == 1
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_data_content_types_are_negotiated() -> None:
+    host_address = "localhost:50089"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+
+    # Worker 2 only decodes msgpack, and advertises it for its agent type.
+    worker2 = WorkerAgentRuntime(host_address=host_address, data_content_types=[MSGPACK_DATA_CONTENT_TYPE])
+    worker2.start()
+    worker2.add_message_serializer(
+        [
+            serializer
+            for serializer in try_get_known_serializers_for_type(ContentMessage)
+            if serializer.data_content_type == MSGPACK_DATA_CONTENT_TYPE
+        ]
+    )
+    await worker2.register_factory(
+        type=AgentType("name2"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await asyncio.sleep(0.5)
+
+    # Worker 1 prefers JSON, but encodes the request with msgpack, which the recipient accepts.
+    result = await worker1.send_message(ContentMessage(content="hello"), AgentId("name2", "default"))
+    assert result == ContentMessage(content="hello")
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_large_payloads_use_blob_store(tmp_path: Path) -> None:
+    host_address = "localhost:50063"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    blob_path = tmp_path / "blobs"
+    workers: List[WorkerAgentRuntime] = []
+    for name in ["name1", "name2"]:
+        worker = WorkerAgentRuntime(
+            host_address=host_address, blob_store=FileBlobStore(blob_path), blob_threshold=1024, blob_ttl=0.5
+        )
+        worker.start()
+        worker.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await worker.register_factory(
+            type=AgentType(name), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+        )
+        await worker.add_subscription(TypeSubscription("default", name))
+        workers.append(worker)
+    worker1, worker2 = workers
+
+    # Small payloads are sent inline.
+    small_message = ContentMessage(content="small message")
+    assert await worker1.send_message(small_message, AgentId("name2", "default")) == small_message
+    assert list(blob_path.iterdir()) == []
+
+    # The blobs of the request and the response are deleted once they are fetched.
+    big_message = ContentMessage(content="." * 4096)
+    assert await worker1.send_message(big_message, AgentId("name2", "default")) == big_message
+    await asyncio.sleep(0.1)
+    assert list(blob_path.iterdir()) == []
+
+    # The blob of an event is deleted once its receivers had the time to fetch it.
+    await worker1.publish_message(big_message, topic_id=TopicId("default", "default"))
+    await asyncio.sleep(0.2)
+    assert list(blob_path.iterdir()) != []
+    await asyncio.sleep(0.8)
+    worker2_agent = await worker2.try_get_underlying_agent_instance(AgentId("name2", "default"), LoopbackAgent)
+    assert worker2_agent.num_calls == 3
+    assert list(blob_path.iterdir()) == []
+
+    # The same data is stored once, with a link for each reference, until the last reference is deleted.
+    store = FileBlobStore(tmp_path / "store")
+    refs = [await store.put(b"data"), await store.put(b"data")]
+    assert refs[0] != refs[1]
+    assert len({path.stat().st_ino for path in (tmp_path / "store").iterdir()}) == 1
+    await store.delete(refs[0])
+    assert await store.get(refs[1]) == b"data"
+    await store.delete(refs[1])
+    assert list((tmp_path / "store").iterdir()) == []
+    with pytest.raises(KeyError):
+        await store.get(refs[1])
+    memory_store = InMemoryBlobStore()
+    refs = [await memory_store.put(b"data"), await memory_store.put(b"data")]
+    assert len(memory_store) == 1
+    for ref in refs:
+        await memory_store.delete(ref)
+    assert len(memory_store) == 0
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_missing_blob_fails_request(tmp_path: Path) -> None:
+    host_address = "localhost:50090"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    # The workers do not share a blob store, so the recipient cannot fetch the payload of a large request.
+    workers: List[WorkerAgentRuntime] = []
+    for name in ["name1", "name2"]:
+        worker = WorkerAgentRuntime(
+            host_address=host_address, blob_store=FileBlobStore(tmp_path / name), blob_threshold=1024
+        )
+        worker.start()
+        worker.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await worker.register_factory(
+            type=AgentType(name), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+        )
+        workers.append(worker)
+    worker1, worker2 = workers
+
+    with pytest.raises(Exception, match="not in the blob store"):
+        await worker1.send_message(ContentMessage(content="." * 4096), AgentId("name2", "default"), timeout=5)
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "port, max_batch_size, batch_flush_interval", [(50065, 1, 0.0), (50072, 8, 0.0), (50091, 8, 0.01)]
+)
+async def test_publish_burst(port: int, max_batch_size: int, batch_flush_interval: float) -> None:
+    host_address = f"localhost:{port}"
+    host = WorkerAgentRuntimeHost(
+        address=host_address, max_batch_size=max_batch_size, batch_flush_interval=batch_flush_interval
+    )
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address, max_batch_size=max_batch_size)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    worker2 = WorkerAgentRuntime(host_address=host_address, max_batch_size=max_batch_size)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    for worker, name in [(worker1, "name1"), (worker2, "name2")]:
+        await worker.register_factory(
+            type=AgentType(name), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+        )
+        await worker.add_subscription(TypeSubscription("default", name))
+
+    # Messages that are published together are written to the host and to the workers in batches.
+    for _ in range(50):
+        await worker1.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(1)
+
+    for worker, name in [(worker1, "name1"), (worker2, "name2")]:
+        agent = await worker.try_get_underlying_agent_instance(AgentId(name, "default"), LoopbackAgent)
+        assert agent.num_calls == 50
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_routing_updates_after_new_subscription() -> None:
+    host_address = "localhost:50070"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(
+        type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker1.add_subscription(TypeSubscription("default", "name1"))
+
+    # The host caches the clients that the topic is routed to.
+    await worker1.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(0.5)
+
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker2.register_factory(
+        type=AgentType("name2"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker2.add_subscription(TypeSubscription("default", "name2"))
+
+    await worker1.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(0.5)
+
+    worker1_agent = await worker1.try_get_underlying_agent_instance(AgentId("name1", "default"), LoopbackAgent)
+    assert worker1_agent.num_calls == 2
+    worker2_agent = await worker2.try_get_underlying_agent_instance(AgentId("name2", "default"), LoopbackAgent)
+    assert worker2_agent.num_calls == 1
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_shared_agent_type_routes_by_key() -> None:
+    host_address = "localhost:50080"
+    host = WorkerAgentRuntimeHost(address=host_address, shared_agent_types=True)
+    host.start()
+
+    created: List[List[str]] = [[], []]
+    workers: List[WorkerAgentRuntime] = []
+    for keys in created:
+
+        def factory(keys: List[str] = keys) -> LoopbackAgent:
+            keys.append(AgentInstantiationContext.current_agent_id().key)
+            return LoopbackAgent()
+
+        worker = WorkerAgentRuntime(host_address=host_address)
+        worker.start()
+        worker.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+        await worker.register_factory(type=AgentType("name1"), agent_factory=factory, expected_class=LoopbackAgent)
+        await worker.add_subscription(TypeSubscription("default", "name1"))
+        workers.append(worker)
+
+    sender = WorkerAgentRuntime(host_address=host_address)
+    sender.start()
+    sender.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    keys = [f"key{i}" for i in range(20)]
+    for _ in range(2):
+        for key in keys:
+            await sender.send_message(MessageType(), recipient=AgentId("name1", key))
+    for key in keys:
+        await sender.publish_message(MessageType(), topic_id=TopicId("default", key))
+    await asyncio.sleep(0.5)
+
+    # Each agent is created once, on one of the workers, and both workers host some of the agents.
+    assert sorted(created[0] + created[1]) == sorted(keys)
+    assert created[0] and created[1]
+    for worker, worker_keys in zip(workers, created, strict=True):
+        for key in worker_keys:
+            agent = await worker.try_get_underlying_agent_instance(AgentId("name1", key), LoopbackAgent)
+            assert agent.num_calls == 3
+
+    await sender.stop()
+    for worker in workers:
+        await worker.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_host_cluster_forwards_messages() -> None:
+    addresses = ["localhost:50081", "localhost:50082"]
+    hosts = [WorkerAgentRuntimeHost(address=address, cluster_addresses=addresses) for address in addresses]
+    for host in hosts:
+        host.start()
+
+    # Find agent types that belong to different hosts.
+    agent_types = [f"name{i}" for i in range(100)]
+    agent_type1 = next(t for t in agent_types if hosts[0].get_host_address(t) == addresses[0])
+    agent_type2 = next(t for t in agent_types if hosts[0].get_host_address(t) == addresses[1])
+    assert hosts[1].get_host_address(agent_type1) == addresses[0]
+
+    worker1 = WorkerAgentRuntime(host_address=addresses[0])
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    worker2 = WorkerAgentRuntime(host_address=addresses[1])
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    # An agent type must be registered at its host.
+    with pytest.raises(RuntimeError):
+        await worker1.register_factory(
+            type=AgentType(agent_type2), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+        )
+    await worker1.register_factory(
+        type=AgentType(agent_type1), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker1.add_subscription(TypeSubscription("default", agent_type1))
+    # Subscriptions are not replicated, so they must be added at the host of their agent type too.
+    with pytest.raises(RuntimeError, match="belongs to host"):
+        await worker1.add_subscription(TypeSubscription("other", agent_type2))
+    await worker2.register_factory(
+        type=AgentType(agent_type2), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker2.add_subscription(TypeSubscription("default", agent_type2))
+
+    # Requests and events cross the hosts.
+    response = await worker2.send_message(MessageType(), recipient=AgentId(agent_type1, "default"))
+    assert response == MessageType()
+    await worker1.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(0.5)
+
+    agent1 = await worker1.try_get_underlying_agent_instance(AgentId(agent_type1, "default"), LoopbackAgent)
+    assert agent1.num_calls == 2
+    agent2 = await worker2.try_get_underlying_agent_instance(AgentId(agent_type2, "default"), LoopbackAgent)
+    assert agent2.num_calls == 1
+
+    await worker1.stop()
+    await worker2.stop()
+    for host in hosts:
+        await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_request_timeout() -> None:
+    host_address = "localhost:50083"
+    host = WorkerAgentRuntimeHost(address=host_address, request_timeout=0.5, reap_interval=0.1)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(type=AgentType("slow"), agent_factory=lambda: SlowAgent(), expected_class=SlowAgent)
+    worker2 = WorkerAgentRuntime(host_address=host_address, reap_interval=0.1)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    # The sender gives up on the request, and the handler is cancelled.
+    with pytest.raises(TimeoutError):
+        await worker2.send_message(MessageType(), recipient=AgentId("slow", "1"), timeout=0.2)
+    agent1 = await worker1.try_get_underlying_agent_instance(AgentId("slow", "1"), SlowAgent)
+    await asyncio.wait_for(agent1.cancelled.wait(), timeout=2)
+
+    # The host gives up on requests without a timeout after its default timeout.
+    with pytest.raises(TimeoutError):
+        await worker2.send_message(MessageType(), recipient=AgentId("slow", "2"))
+    agent2 = await worker1.try_get_underlying_agent_instance(AgentId("slow", "2"), SlowAgent)
+    await asyncio.wait_for(agent2.cancelled.wait(), timeout=2)
+
+    # An agent error with the text of a timeout is not a timeout.
+    await worker1.register_factory(
+        type=AgentType("failing"),
+        agent_factory=lambda: FailingAgent("The request timed out."),
+        expected_class=FailingAgent,
+    )
+    with pytest.raises(Exception, match="The request timed out.") as error:
+        await worker2.send_message(MessageType(), recipient=AgentId("failing", "1"))
+    assert not isinstance(error.value, TimeoutError)
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_request_cancellation() -> None:
+    host_address = "localhost:50084"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(type=AgentType("slow"), agent_factory=lambda: SlowAgent(), expected_class=SlowAgent)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    cancellation_token = CancellationToken()
+    request = asyncio.create_task(
+        worker2.send_message(MessageType(), recipient=AgentId("slow", "1"), cancellation_token=cancellation_token)
+    )
+    agent = await worker1.try_get_underlying_agent_instance(AgentId("slow", "1"), SlowAgent)
+    await asyncio.sleep(0.5)
+    cancellation_token.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+    # The cancellation reaches the handler at the target worker.
+    await asyncio.wait_for(agent.cancelled.wait(), timeout=2)
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_after_host_restart() -> None:
+    host_address = "localhost:50085"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(
+        type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker1.add_subscription(TypeSubscription("default", "name1"))
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker2.send_message(MessageType(), recipient=AgentId("name1", "default"))
+
+    # Stop the host, send and publish while it is down, and start a new host.
+    await host.stop()
+    request = asyncio.create_task(worker2.send_message(MessageType(), recipient=AgentId("name1", "default")))
+    await worker1.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(0.5)
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    restarted = time.perf_counter()
+
+    # The workers reconnect, register their agent types and subscriptions again, and send the pending messages.
+    assert await asyncio.wait_for(request, timeout=10) == MessageType()
+    failover_time = time.perf_counter() - restarted
+    logging.getLogger("autogen_core").info("Request answered %.3f seconds after the host restarted.", failover_time)
+    assert failover_time < 5
+    await asyncio.sleep(0.5)
+    agent = await worker1.try_get_underlying_agent_instance(AgentId("name1", "default"), LoopbackAgent)
+    assert agent.num_calls == 3
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_after_failed_attempt() -> None:
+    host_address = "localhost:50092"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(
+        type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    # The first attempt to reconnect fails in the callback that prepares the messages to send again.
+    connection = worker1._host_connections[0]  # type: ignore[reportPrivateUsage]
+    on_reconnect = connection._on_reconnect  # type: ignore[reportPrivateUsage]
+    assert on_reconnect is not None
+    attempts = 0
+
+    async def fail_once() -> List[agent_worker_pb2.Message]:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("Failed to prepare the messages.")
+        return await on_reconnect()
+
+    connection._on_reconnect = fail_once  # type: ignore[reportPrivateUsage]
+    await host.stop()
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    # The worker keeps reconnecting, and registers its agent type again.
+    response = await asyncio.wait_for(
+        worker2.send_message(MessageType(), recipient=AgentId("name1", "default")), timeout=10
+    )
+    assert response == MessageType()
+    assert attempts >= 2
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_registers_agent_types_registered_directly() -> None:
+    host_address = "localhost:50094"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register("name1", LoopbackAgent, lambda: [TypeSubscription("default", "name1")])
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    await host.stop()
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    # The agent type is registered again after reconnecting, as with register_factory.
+    response = await asyncio.wait_for(
+        worker2.send_message(MessageType(), recipient=AgentId("name1", "default")), timeout=10
+    )
+    assert response == MessageType()
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queues_drop_oldest_for_slow_worker() -> None:
+    host_address = "localhost:50086"
+    host = WorkerAgentRuntimeHost(address=host_address, max_queue_size=10, queue_full_policy="drop_oldest")
+    host.start()
+
+    # The slow worker starts one handler at a time, and its agent is created only once it is unblocked,
+    # so the messages for it wait at the host.
+    unblocked = asyncio.Event()
+
+    async def create_agent() -> CountingAgent:
+        await unblocked.wait()
+        return CountingAgent()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address, max_queue_size=1)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+    await worker1.register_factory(type=AgentType("blocked"), agent_factory=create_agent, expected_class=CountingAgent)
+    await worker1.add_subscription(TypeSubscription("default", "blocked"))
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+
+    # Large messages fill the gRPC stream windows quickly.
+    num_messages = 2000
+    for _ in range(num_messages):
+        await worker2.publish_message(ContentMessage(content="." * 10000), topic_id=TopicId("default", "default"))
+    await asyncio.sleep(1)
+    metrics = host.client_queue_metrics
+    assert all(queue_metrics.depth <= 10 for queue_metrics in metrics.values())
+    assert sum(queue_metrics.dropped for queue_metrics in metrics.values()) > 0
+    assert worker1.receive_queue_metrics.depth <= 1
+
+    # The messages that were not dropped are delivered once the worker catches up.
+    unblocked.set()
+    await asyncio.sleep(1)
+    agent = await worker1.try_get_underlying_agent_instance(AgentId("blocked", "default"), CountingAgent)
+    assert 0 < agent.num_calls < num_messages
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_nested_request_to_same_worker_with_bounded_queues() -> None:
+    host_address = "localhost:50093"
+    host = WorkerAgentRuntimeHost(address=host_address, max_queue_size=1)
+    host.start()
+
+    # Only one received message may wait for its handler to start, but handlers that wait do not hold on to it.
+    worker1 = WorkerAgentRuntime(host_address=host_address, max_queue_size=1)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(
+        type=AgentType("nesting"), agent_factory=lambda: NestingAgent(), expected_class=NestingAgent
+    )
+    await worker1.register_factory(
+        type=AgentType("loopback"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    worker2 = WorkerAgentRuntime(host_address=host_address, max_queue_size=1)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    # The nested request is handled by the same worker while the first handler waits for it.
+    responses = await asyncio.wait_for(
+        asyncio.gather(*[worker2.send_message(MessageType(), recipient=AgentId("nesting", str(i))) for i in range(5)]),
+        timeout=10,
+    )
+    assert responses == [MessageType()] * 5
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_worker_with_several_channels() -> None:
+    host_address = "localhost:50087"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address, num_channels=3)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await worker1.register_factory(
+        type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+    )
+    await worker1.add_subscription(TypeSubscription("default", "name1"))
+    worker2 = WorkerAgentRuntime(host_address=host_address, num_channels=2)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    # Another worker cannot register the agent type of the streams of worker1.
+    with pytest.raises(RuntimeError):
+        await worker2.register_factory(
+            type=AgentType("name1"), agent_factory=lambda: LoopbackAgent(), expected_class=LoopbackAgent
+        )
+    assert len(host.client_queue_metrics) == 5
+
+    # The requests to the agents are spread over the streams, and every agent handles its messages once.
+    keys = [str(i) for i in range(10)]
+    results = await asyncio.gather(
+        *[worker2.send_message(MessageType(), recipient=AgentId("name1", key)) for key in keys]
+    )
+    assert results == [MessageType()] * len(keys)
+    for key in keys:
+        await worker2.publish_message(MessageType(), topic_id=TopicId("default", key))
+    await asyncio.sleep(1)
+    for key in keys:
+        agent = await worker1.try_get_underlying_agent_instance(AgentId("name1", key), LoopbackAgent)
+        assert agent.num_calls == 2
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
+class CheckpointedAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent that counts its messages.")
+        self.count = 0
+
+    @message_handler
+    async def on_message_type(self, message: MessageType, ctx: MessageContext) -> MessageType:
+        self.count += 1
+        return message
+
+    def save_state(self) -> Mapping[str, Any]:
+        return {"count": self.count}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        self.count = state["count"]
+
+
+@pytest.mark.asyncio
+async def test_worker_checkpoints_changed_agents(tmp_path: Path) -> None:
+    host_address = "localhost:50088"
+    host = WorkerAgentRuntimeHost(address=host_address, agent_state_store=SqliteAgentStateStore(tmp_path / "state.db"))
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await CheckpointedAgent.register(worker1, "name1", CheckpointedAgent)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker2.start()
+    worker2.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+
+    for key in ["a", "a", "b"]:
+        await worker2.send_message(MessageType(), recipient=AgentId("name1", key))
+    assert await worker1.checkpoint() == 2
+    # Only the agents that handled a message since the last checkpoint are saved.
+    assert await worker1.checkpoint() == 0
+    await worker2.send_message(MessageType(), recipient=AgentId("name1", "b"))
+    assert await worker1.checkpoint() == 1
+    await worker1.stop()
+
+    # A new worker restores the agents from their checkpoints.
+    worker1 = WorkerAgentRuntime(host_address=host_address, restore_checkpoints=True)
+    worker1.start()
+    worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
+    await CheckpointedAgent.register(worker1, "name1", CheckpointedAgent)
+    await worker2.send_message(MessageType(), recipient=AgentId("name1", "a"))
+    assert await worker1.agent_save_state(AgentId("name1", "a")) == {"count": 3}
+    assert await worker1.agent_save_state(AgentId("name1", "b")) == {"count": 2}
+    assert await worker1.agent_save_state(AgentId("name1", "c")) == {"count": 0}
+
+    await worker1.stop()
+    await worker2.stop()
+    await host.stop()
+
+
 if __name__ == "__main__":
     os.environ["GRPC_VERBOSITY"] = "DEBUG"
     os.environ["GRPC_TRACE"] = "all"
 
     asyncio.run(test_disconnected_agent())
     asyncio.run(test_grpc_max_message_size())
+
+
+@pytest.mark.asyncio
+async def test_host_evicts_least_recently_used_topic_routes() -> None:
+    servicer = WorkerAgentRuntimeHostServicer(max_cached_topics=2)
+    for topic_type in ["a", "b", "a", "c"]:
+        await servicer._process_event(  # type: ignore[reportPrivateUsage]
+            agent_worker_pb2.Event(topic_type=topic_type, topic_source="default"), client_id=1
+        )
+    # "a" was used after "b", so "b" is evicted.
+    assert list(servicer._topic_routes) == [TopicId("a", "default"), TopicId("c", "default")]  # type: ignore[reportPrivateUsage]
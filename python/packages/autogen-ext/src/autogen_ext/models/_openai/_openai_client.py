@@ -19,6 +19,7 @@
     Union,
     cast,
 )
+from weakref import WeakKeyDictionary
 
 import tiktoken
 from autogen_core.application.logging import EVENT_LOGGER_NAME, TRACE_LOGGER_NAME
@@ -41,7 +42,7 @@
     TopLogprob,
     UserMessage,
 )
-from autogen_core.components.tools import Tool, ToolSchema
+from autogen_core.components.tools import BaseTool, Tool, ToolSchema
 from openai import AsyncAzureOpenAI, AsyncOpenAI
 from openai.types.chat import (
     ChatCompletion,
@@ -272,32 +273,55 @@ def _add_usage(usage1: RequestUsage, usage2: RequestUsage) -> RequestUsage:
     )
 
 
+# The converted tools of BaseTool instances, whose schema does not change once they are created.
+_converted_tools: WeakKeyDictionary[BaseTool[Any, Any], ChatCompletionToolParam] = WeakKeyDictionary()
+
+
+def convert_tool_schema(tool_schema: ToolSchema) -> ChatCompletionToolParam:
+    tool_param = ChatCompletionToolParam(
+        type="function",
+        function=FunctionDefinition(
+            name=tool_schema["name"],
+            description=(tool_schema["description"] if "description" in tool_schema else ""),
+            parameters=(cast(FunctionParameters, tool_schema["parameters"]) if "parameters" in tool_schema else {}),
+        ),
+    )
+    # Check if the tool has a valid name.
+    assert_valid_name(tool_param["function"]["name"])
+    return tool_param
+
+
 def convert_tools(
     tools: Sequence[Tool | ToolSchema],
 ) -> List[ChatCompletionToolParam]:
     result: List[ChatCompletionToolParam] = []
     for tool in tools:
-        if isinstance(tool, Tool):
-            tool_schema = tool.schema
+        # Schemas are checked first, since checking for the Tool protocol is slower.
+        if isinstance(tool, dict):
+            result.append(convert_tool_schema(tool))
+            continue
+        assert isinstance(tool, Tool)
+        # The schema of a tool is a new copy on each access, so the converted tools share nothing between calls.
+        result.append(convert_tool_schema(tool.schema))
+    return result
+
+
+def _convert_request_tools(
+    tools: Sequence[Tool | ToolSchema],
+) -> List[ChatCompletionToolParam]:
+    """Convert the tools of a request. Unlike :func:`convert_tools`, the converted tools of :class:`BaseTool` instances
+    are cached and shared between requests, so the result is only passed to the API and must not be modified."""
+    result: List[ChatCompletionToolParam] = []
+    for tool in tools:
+        # Subclasses that override the schema may change it, so they are converted on each call.
+        if isinstance(tool, BaseTool) and type(tool).schema is BaseTool.schema:
+            tool_param = _converted_tools.get(tool)
+            if tool_param is None:
+                tool_param = convert_tool_schema(tool.schema)
+                _converted_tools[tool] = tool_param
+            result.append(tool_param)
         else:
-            assert isinstance(tool, dict)
-            tool_schema = tool
-
-        result.append(
-            ChatCompletionToolParam(
-                type="function",
-                function=FunctionDefinition(
-                    name=tool_schema["name"],
-                    description=(tool_schema["description"] if "description" in tool_schema else ""),
-                    parameters=(
-                        cast(FunctionParameters, tool_schema["parameters"]) if "parameters" in tool_schema else {}
-                    ),
-                ),
-            )
-        )
-    # Check if all tools have valid names.
-    for tool_param in result:
-        assert_valid_name(tool_param["function"]["name"])
+            result.extend(convert_tools([tool]))
     return result
 
 
@@ -419,7 +443,7 @@ async def create(
             raise ValueError("Model does not support function calling")
         future: Union[Task[ParsedChatCompletion[BaseModel]], Task[ChatCompletion]]
         if len(tools) > 0:
-            converted_tools = convert_tools(tools)
+            converted_tools = _convert_request_tools(tools)
             if use_beta_client:
                 # Pass response_format_value if it's not None
                 if response_format_value is not None:
@@ -612,7 +636,7 @@ async def create_stream(
                 create_args["response_format"] = {"type": "text"}
 
         if len(tools) > 0:
-            converted_tools = convert_tools(tools)
+            converted_tools = _convert_request_tools(tools)
             stream_future = asyncio.ensure_future(
                 self._client.chat.completions.create(
                     messages=oai_messages,
@@ -805,7 +829,7 @@ def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | To
         num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
 
         # Tool tokens.
-        oai_tools = convert_tools(tools)
+        oai_tools = _convert_request_tools(tools)
         for tool in oai_tools:
             function = tool["function"]
             tool_tokens = len(encoding.encode(function["name"]))